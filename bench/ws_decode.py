@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+ws 解码基准：各后端 msgs/sec
+
+  python bench/ws_decode.py                       # 内置样例帧
+  python bench/ws_decode.py frames.txt [-n 200000]
+
+frames.txt 每行一帧原始 ws 文本（可直接从线上抓包导出）；
+以 {"stream": 或 {"e": 开头的按 Binance 解码，其余按 OKX。
+"""
+import argparse, pathlib, sys, time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from src.trade.codec import get_codec, available_codecs   # noqa: E402
+
+SAMPLE_FRAMES = [
+    '{"arg":{"channel":"tickers","instId":"ETH-USDT-SWAP"},"data":[{"instType":"SWAP",'
+    '"instId":"ETH-USDT-SWAP","last":"3521.37","lastSz":"12","askPx":"3521.38","askSz":"151",'
+    '"bidPx":"3521.37","bidSz":"34","open24h":"3460.1","high24h":"3555","low24h":"3440.5",'
+    '"volCcy24h":"1423367.2","vol24h":"142336720","ts":"1717000000123","sodUtc0":"3480.2",'
+    '"sodUtc8":"3470.9"}]}',
+    '{"arg":{"channel":"trades","instId":"ETH-USDT-SWAP"},"data":[{"instId":"ETH-USDT-SWAP",'
+    '"tradeId":"1302844710","px":"3521.38","sz":"3","side":"buy","ts":"1717000000150","count":"1"}]}',
+    '{"arg":{"channel":"books5","instId":"ETH-USDT-SWAP"},"data":[{"asks":[["3521.38","151","0","9"],'
+    '["3521.39","30","0","2"],["3521.4","88","0","4"],["3521.41","12","0","1"],["3521.42","70","0","3"]],'
+    '"bids":[["3521.37","34","0","3"],["3521.36","9","0","1"],["3521.35","52","0","5"],'
+    '["3521.34","17","0","2"],["3521.33","40","0","2"]],"instId":"ETH-USDT-SWAP","ts":"1717000000151",'
+    '"seqId":123456789}]}',
+    '{"stream":"ethusdt@aggTrade","data":{"e":"aggTrade","E":1717000000160,"s":"ETHUSDT",'
+    '"a":1849237342,"p":"3520.91","q":"0.412","f":2510934812,"l":2510934813,"T":1717000000159,"m":false}}',
+]
+
+
+def _load(path: str | None) -> list[str]:
+    if not path:
+        return SAMPLE_FRAMES
+    return [l.rstrip("\n") for l in open(path, encoding="utf-8") if l.strip()]
+
+
+def bench(name: str, frames: list[str], n: int) -> float:
+    c = get_codec(name)
+    fns = [c.decode_binance if f.startswith(('{"stream":', '{"e":')) else c.decode_okx
+           for f in frames]
+    m = len(frames)
+    t0 = time.perf_counter()
+    for i in range(n):
+        j = i % m
+        fns[j](frames[j])
+    return n / (time.perf_counter() - t0)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("frames", nargs="?")
+    ap.add_argument("-n", type=int, default=200_000)
+    args = ap.parse_args()
+
+    frames = _load(args.frames)
+    print(f"{len(frames)} frames × {args.n} decodes")
+    rates = {name: bench(name, frames, args.n) for name in available_codecs()}
+    for name, rate in rates.items():
+        print(f"  {name:<8} {rate:>12,.0f} msg/s   x{rate / rates['json']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-import json, time, logging
+import asyncio, json, time, logging
 from typing import Literal, Protocol, Optional
 
 from .position_guard import PositionGuard
@@ -7,19 +7,38 @@ from ..monitor.metrics import (
 )
 from ..monitor.metrics  import trailing_stop_hits_total
 from ..risk.trailing    import trailing_mgr
+from ..risk.dynamic     import trail_pct_from_atr
 from ..storage.ensure_schema import ensure_schema
 from ..storage.weaviate_client import get_client
+from ..utils import clock
 
 Signal = Literal["BUY", "SELL", "HOLD"]
 
 
 class BrokerAPI(Protocol):
+    """open_* 返回下单回执；带成交跟踪时另含 "fill_wait"（Future → OrderState | None）"""
     async def open_long (self, qty: Optional[float] = None, price: float | None = None): ...
     async def open_short(self, qty: Optional[float] = None, price: float | None = None): ...
     async def close_all (self): ...
     symbol: str
 
 
+class OrderGateway(Protocol):
+    """Broker 的下单通道：OkxRest（src/trade/okx_rest.py）/ OkxOrderGateway（私有 ws，src/trade/okx_private_ws.py）"""
+    async def place_order(self, inst_id: str, side: str, sz: str, *, td_mode: str = ...,
+                          pos_side: str | None = None, ord_type: str = ..., px: str | None = None,
+                          reduce_only: bool = False, cl_ord_id: str | None = None) -> dict: ...
+    async def cancel_order(self, inst_id: str, *, ord_id: str | None = None,
+                           cl_ord_id: str | None = None) -> dict: ...
+    async def amend_order(self, inst_id: str, *, ord_id: str | None = None, cl_ord_id: str | None = None,
+                          new_sz: str | None = None, new_px: str | None = None) -> dict: ...
+
+
+class TradeJournal(Protocol):
+    def insert(self, record: dict) -> None: ...
+    def mark_trail_hit(self) -> None: ...
+
+
 _client = None
 ensure_schema()
 def _weaviate():
@@ -29,12 +48,29 @@ def _weaviate():
     return _client
 
 
+class WeaviateJournal:
+    """默认因果日志：Weaviate TradeLog"""
+    def insert(self, record: dict) -> None:
+        _weaviate().collections.get("TradeLog").data.insert(record)
+
+    def mark_trail_hit(self) -> None:
+        col  = _weaviate().collections.get("TradeLog")
+        uuid = col.query.fetch_objects(limit=1)[0].uuid
+        col.data.update(uuid, {"trail_sl_hit": "true"})
+
+
+weaviate_journal = WeaviateJournal()
+
+
 async def agent_decide_and_execute(
     signal: Signal, price: float, broker: BrokerAPI,
     *, qty: Optional[float] = None, prompt: str = "",
     extra: dict | None = None, logger: logging.Logger | None = None,
+    journal: TradeJournal | None = None, features=None,
 ) -> None:
+    """features：src/trade/features.py 快照；配置 risk.trail_atr_k > 0 时追踪止损按 k·ATR 折算"""
     log = logger or logging.getLogger("Agent")
+    journal = journal or weaviate_journal
     curr_dir = await PositionGuard().get()
 
     if signal == "HOLD" or curr_dir == signal:
@@ -49,36 +85,88 @@ async def agent_decide_and_execute(
     res = await (broker.open_long if signal == "BUY" else broker.open_short)(
         qty=qty, price=price
     )
-    order_latency_seconds.observe(time.time() - t0)
+    order_latency_seconds.observe(time.time() - t0)        # 只到下单回执；成交延迟见 okx_fill_latency_seconds
+    if res.get("status") == "SIZE_TOO_SMALL":
+        return
     okx_orders_total.labels(signal).inc()
+    await PositionGuard().update(signal)                   # 回执即记方向；未成交的终态在 _settle 中回滚
+
+    # 实际成交（src/trade/order_tracker.py）在后台等待，到达后再起追踪止损 / 记日志；
+    # 无跟踪（回放 / 未启用）时按信号价同步完成
+    settle = _settle(signal, price, broker, res, qty=qty, prompt=prompt, extra=extra,
+                     log=log, journal=journal, features=features)
+    fill_wait = res.get("fill_wait")
+    if fill_wait is None:
+        await settle
+    else:
+        task = asyncio.get_running_loop().create_task(settle)
+        _settling.add(task)
+        task.add_done_callback(_settling.discard)
+
+
+_settling: set[asyncio.Task] = set()                       # 等待成交中的订单（持有引用防止被回收）
+
+
+async def _settle(
+    signal: Signal, price: float, broker: BrokerAPI, res: dict,
+    *, qty: Optional[float], prompt: str, extra: dict | None,
+    log: logging.Logger, journal: TradeJournal, features,
+) -> None:
+    fill = {}
+    if (fill_wait := res.get("fill_wait")) is not None:
+        try:
+            st = await fill_wait
+        except Exception as e:
+            log.warning("fill wait failed (%s): %s", res.get("cl_ord_id"), e)
+            st = None
+        fill = st.as_dict() if st is not None else {}
+    sig_px, price = price, fill.get("avg_px") or price
+    if fill and not fill.get("filled_sz") and fill.get("state") in ("canceled", "mmp_canceled", "rejected"):
+        log.warning("order %s %s: %s", res.get("cl_ord_id"), fill["state"], fill.get("msg", ""))
+        if await PositionGuard().get() == signal:
+            await PositionGuard().reset()
+        _journal_insert(journal, log, {
+            "timestamp": int(clock.now() * 1000), "symbol": broker.symbol, "signal": signal,
+            "price": sig_px, "size": 0, "order_id": res.get("id", ""), "status": fill["state"],
+            "prompt": prompt, "extra": json.dumps({**(extra or {}), "fill": fill}),
+        })
+        return
 
     from src.utils.config_loader import load as _load_cfg
-    pct = _load_cfg().get("risk", {}).get("trail_sl_pct", 0.0)
-    if pct > 0:
+    risk = _load_cfg().get("risk", {})
+    pct  = risk.get("trail_sl_pct", 0.0)
+    k    = risk.get("trail_atr_k", 0.0)
+    if k > 0 and features is not None and features.atr > 0:
+        pct = trail_pct_from_atr(price, features.atr, k)
+    if pct > 0 and await PositionGuard().get() == signal:     # 等成交期间已反手 → 不再为旧单起止损
         trailing_mgr().start(signal, price, pct)
 
-    await PositionGuard().update(signal)
-
     pnl    = float(extra.get("pnl", 0))    if extra else 0
     equity = float(extra.get("equity", 0)) if extra else 0
     if equity: equity_usdt.set(equity)
 
+    _journal_insert(journal, log, {
+        "timestamp":            int(clock.now() * 1000),
+        "symbol":               broker.symbol,
+        "signal":               signal,
+        "price":                price,
+        "size":                 fill.get("filled_sz") or qty,
+        "leverage":             getattr(broker, "leverage", None),
+        "order_id":             res.get("id", ""),
+        "status":               res.get("status", ""),
+        "prompt":               prompt,
+        "extra":                json.dumps({**(extra or {}),
+                                            **({"features": features.as_dict()} if features else {}),
+                                            **({"signal_price": sig_px, "fill": fill} if fill else {})}),
+        "pnl_realized":         pnl,
+        "equity":               equity,
+        "trail_sl_pct":         pct,
+        "trail_sl_hit":         "false",
+    })
+
+
+def _journal_insert(journal: TradeJournal, log: logging.Logger, record: dict) -> None:
     try:
-        _weaviate().collections.get("TradeLog").data.insert({
-            "timestamp":            int(time.time() * 1000),
-            "symbol":               broker.symbol,
-            "signal":               signal,
-            "price":                price,
-            "size":                 qty,
-            "leverage":             getattr(broker, "leverage", None),
-            "order_id":             res.get("id", ""),
-            "status":               res.get("status", ""),
-            "prompt":               prompt,
-            "extra":                json.dumps(extra or {}),
-            "pnl_realized":         pnl,
-            "equity":               equity,
-            "trail_sl_pct":         pct,
-            "trail_sl_hit":         "false",
-        })
+        journal.insert(record)
     except Exception as e:
-        log.warning("Weaviate insert failed: %s", e)
+        log.warning("TradeLog insert failed: %s", e)
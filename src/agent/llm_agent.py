@@ -5,7 +5,7 @@ LLM 决策 + 动态风控 + 下单 + 因果日志
 只记录真实下单和关键分叉（如风控拒单、极端错误等），保证日志成为高价值因果链。
 """
 
-import os, time, json, random, warnings
+import asyncio, os, time, json, random, warnings
 from typing import Literal, Dict, Any
 
 warnings.filterwarnings("ignore", category=ResourceWarning)
@@ -13,7 +13,7 @@ warnings.filterwarnings("ignore", category=ResourceWarning)
 from storage.weaviate_client import get_client
 from trade.order   import place_order
 from trade.market  import get_latest_price, get_instrument_spec
-from risk.dynamic  import compute_volatility, compute_atr, calc_initial_sl
+from risk.dynamic  import calc_initial_sl
 from risk.manager  import calc_size, calc_sl_tp
 
 def agent_decide_and_execute(
@@ -61,16 +61,16 @@ def agent_decide_and_execute(
         return  # 不写日志，不下单，直接跳过，避免噪声污染因果链
 
     # 3. 取合约规格
-    spec = get_instrument_spec(symbol)   # {ct_val,min_sz,lot_sz,period_sec}
+    spec = get_instrument_spec(symbol)   # {ct_val,min_sz,lot_sz,period_sec,features}
     ct_val, min_sz, lot_sz = spec["ct_val"], spec["min_sz"], spec["lot_sz"]
 
-    # 4. 动态杠杆 & 止损
-    kline = spec["recent_prices"]        # Pandas Series；需由 get_instrument_spec 带回
-    sigma = compute_volatility(kline, spec["period_sec"])
+    # 4. 动态杠杆 & 止损：σ / ATR 取共享特征快照（src/trade/features.py），不再按 K 线数组重算
+    f     = spec["features"]
+    sigma = float(f.sigma)
     leverage = max(1, min(kappa / sigma if sigma else 1, l_max))
     leverage = float(leverage)   # 让 JSON 不带 np.float64
 
-    atr   = compute_atr(spec["recent_high"], spec["recent_low"], kline)
+    atr   = float(f.atr)
     stop  = calc_initial_sl(price, atr, signal)
     stop_dist = abs(price - stop)
 
@@ -103,7 +103,7 @@ def agent_decide_and_execute(
         return
 
     # 6. 下单
-    order = place_order(
+    order = asyncio.run(place_order(
         symbol   = symbol,
         side     = signal,
         qty      = size,
@@ -111,7 +111,7 @@ def agent_decide_and_execute(
         td_mode  = "isolated",
         min_sz   = min_sz,
         lot_sz   = lot_sz,
-    )
+    ))
     status = order.get("status")
 
     # 7. 写日志（只在真实有意义决策分支）
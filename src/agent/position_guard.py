@@ -1,6 +1,8 @@
-import json, os, asyncio, logging, time
+import json, os, asyncio, logging
 from typing import Literal, Optional
 
+from ..utils import clock
+
 Signal = Literal["BUY", "SELL", "HOLD", None]
 
 class PositionGuard:
@@ -41,7 +43,7 @@ class PositionGuard:
 
     async def update(self, direction: Signal) -> None:
         async with self._lock:
-            self.state.update(direction=direction, ts=time.time())
+            self.state.update(direction=direction, ts=clock.now())
             self._save()
 
     async def reset(self) -> None:
@@ -49,7 +51,7 @@ class PositionGuard:
 
     # -------- private -------- #
     def _check_expire(self) -> None:
-        if self.state["direction"] and time.time() - self.state["ts"] > self.expire:
+        if self.state["direction"] and clock.now() - self.state["ts"] > self.expire:
             self.log.info("Position expired, auto-reset.")
             self.state.update(direction=None, ts=0.0)
             self._save()
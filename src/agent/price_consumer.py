@@ -1,60 +1,103 @@
-import asyncio, time, logging
-from typing import Callable, Awaitable
+import asyncio, logging
+from typing import Any, Callable, Awaitable
+
+from ..utils import clock
+from ..monitor.metrics import (price_consumer_ticks_total, price_consumer_pending,
+                               price_consumer_conflation_ratio)
 
 Number  = float | int
 Logger  = logging.Logger
 
 class PriceConsumer:
     """
-    高频行情队列 -> 降频触发。聚合窗口内只取最后一价。
+    高频行情 -> 降频触发（conflation）。每个 symbol 只保留最新一价，旧价直接覆盖。
+
+    • offer(tick)  行情侧调用，O(1)、不阻塞、不 await；决策再慢也不会拖住收包
+    • run()        决策侧循环：首价 / 相对上次 emit 变动 ≥ pct_trigger / 距上次 emit ≥ agg_window
+                   → 回调该 symbol 当前最新价；回调期间到达的价继续覆盖，决策永远拿最新值
+    • poll()       同步取出当前应 emit 的价（回放按 ReplayClock 逐 tick 驱动）
+    agg_window=0 → 纯合并：决策一空闲就拿最新价
     """
     def __init__(
         self,
-        queue: asyncio.Queue[Number],
-        callback: Callable[[Number], Awaitable[None]],
+        callback: Callable[[Any], Awaitable[None]],
         *,
         pct_trigger: float = 0.003,
         agg_window: float = 1.0,
         logger: Logger | None = None,
     ) -> None:
-        self.q = queue
         self.cb = callback
         self.pct_trigger = pct_trigger
         self.agg_window = agg_window
-        self._last_emit_price: Number | None = None
-        self._last_emit_ts:  float = 0.0
+        self._slot: dict[str, Any] = {}                     # symbol → 未消费的最新 tick
+        self._last: dict[str, tuple[Number, float]] = {}    # symbol → 上次 emit (price, ts)
+        self._wake = asyncio.Event()
+        self.n_in = self.n_out = 0
         self.log = logger or logging.getLogger("PriceConsumer")
+        self._m_in   = price_consumer_ticks_total.labels("in")
+        self._m_out  = price_consumer_ticks_total.labels("emitted")
+        self._m_conf = price_consumer_ticks_total.labels("conflated")
 
-    async def run(self) -> None:
-        window_prices: list[Number] = []
-        next_tick = time.time() + self.agg_window
+    # ────────────────────────── 行情侧 ──────────────────────────
+    def offer(self, tick: Any) -> None:
+        sym = getattr(tick, "symbol", "")
+        if sym in self._slot:
+            self._m_conf.inc()
+        self._slot[sym] = tick
+        self.n_in += 1
+        self._m_in.inc()
+        price_consumer_pending.set(len(self._slot))
+        self._wake.set()
 
+    # ────────────────────────── 决策侧 ──────────────────────────
+    async def run(self) -> None:
         while True:
-            try:
-                timeout = max(0.0, next_tick - time.time())
-                price: Number = await asyncio.wait_for(self.q.get(), timeout=timeout)
-                window_prices.append(price)
-                # 价格突变立即 emit
-                if self._should_emit(price):
-                    await self._emit(price)
-                    window_prices.clear()
-                    next_tick = time.time() + self.agg_window
+            self._wake.clear()
+            for tick in self.poll():
+                try:
+                    await self.cb(tick)
+                except Exception as e:
+                    self.log.exception("PriceConsumer error: %s", e)
+            if not self._slot:
+                await self._wake.wait()
+                continue
+            try:                                            # 有未到期的价：等窗口或新价
+                await asyncio.wait_for(self._wake.wait(), self._until_due())
             except asyncio.TimeoutError:
-                # 窗口到期 emit
-                if window_prices:
-                    await self._emit(window_prices[-1])
-                    window_prices.clear()
-                next_tick = time.time() + self.agg_window
-            except Exception as e:
-                self.log.exception("PriceConsumer error: %s", e)
-                await asyncio.sleep(1)
-
-    def _should_emit(self, price: Number) -> bool:
-        if self._last_emit_price is None:
+                pass
+
+    def poll(self) -> list:
+        now = clock.now()
+        out = []
+        for sym, tick in list(self._slot.items()):
+            if self._should_emit(sym, float(tick), now):
+                del self._slot[sym]
+                self._last[sym] = (float(tick), now)
+                out.append(tick)
+        if out:
+            self.n_out += len(out)
+            self._m_out.inc(len(out))
+            price_consumer_pending.set(len(self._slot))
+            price_consumer_conflation_ratio.set(1 - self.n_out / self.n_in)
+        return out
+
+    @property
+    def ratio(self) -> float:
+        """被合并掉的比例"""
+        return 1 - self.n_out / self.n_in if self.n_in else 0.0
+
+    def _should_emit(self, sym: str, price: Number, now: float) -> bool:
+        last = self._last.get(sym)
+        if last is None:
+            return True
+        last_px, last_ts = last
+        if now - last_ts >= self.agg_window:
             return True
-        return abs(price - self._last_emit_price) / self._last_emit_price >= self.pct_trigger
+        return abs(price - last_px) / last_px >= self.pct_trigger
 
-    async def _emit(self, price: Number) -> None:
-        await self.cb(price)
-        self._last_emit_price = price
-        self._last_emit_ts   = time.time()
+    def _until_due(self) -> float:
+        now = clock.now()
+        if any(s not in self._last for s in self._slot):    # 首价在回调期间到达 → 立即到期
+            return 0.0
+        due = min(self._last[s][1] + self.agg_window for s in self._slot)
+        return max(0.0, due - now)
@@ -0,0 +1,199 @@
+"""
+按延迟预算选择 LLM 后端（OpenAI / Ollama / 规则引擎）
+
+• 每个后端保留最近 window 次调用：延迟样本（成功 / deadline 取消时按已耗时计）与成败，
+  给出 p50 / p95 / 错误率（样本不足 min_samples 时用 prior 先验延迟）；
+  hedge 落败被取消的调用按已耗时记为删失样本（真实延迟的下界），不计成败
+• route（significant / quick …）= 按质量排序的后端列表 + 决策 deadline：
+    主后端 = 列表中第一个错误率 ≤ max_error 且 p95 ≤ deadline 的后端；都不满足则取 p50 最小者
+• hedge：主后端超过自身 p95（至少 hedge_min）仍未返回 → 再发剩余预算内预计能完成的下一个后端；
+  下一个是零成本兜底（free，如 rules）时推迟到 deadline 前只留其 p95 余量才发，避免秒答的兜底
+  总是抢先、主后端永远拿不到样本；主后端出错 / 返回无效答案 → 立即改发下一个
+• available：后端就绪检查（如本地模型未预热完成），未就绪的后端不参与本次路由
+• 第一个有效的结构化答案（side ∈ BUY/SELL/HOLD 且无 err）胜出，其余取消；
+  deadline 到期仍无答案 → HOLD
+后端签名：async (price, pos, spec, key) → (side, prompt, extra)
+"""
+import asyncio, collections, logging
+from typing import Awaitable, Callable
+
+import numpy as np
+
+from ..monitor.metrics import (
+    llm_router_wins_total, llm_router_timeouts_total, llm_router_errors_total,
+    llm_router_hedges_total, llm_backend_latency_p95, llm_backend_error_rate,
+)
+
+Backend = Callable[..., Awaitable[tuple[str, str, dict]]]
+SIDES   = ("BUY", "SELL", "HOLD")
+
+
+class _Stats:
+    def __init__(self, window: int, prior: float) -> None:
+        self.lat = collections.deque(maxlen=window)
+        self.ok  = collections.deque(maxlen=window)
+        self.prior = prior
+        self._q: tuple[float, float] | None = None
+
+    def record(self, latency: float, ok: bool | None) -> None:
+        """ok=None：删失样本（hedge 落败被取消），只记延迟下界"""
+        self.lat.append(latency)
+        if ok is not None:
+            self.ok.append(ok)
+        self._q = None
+
+    def quantiles(self, min_samples: int) -> tuple[float, float]:
+        if len(self.lat) < min_samples:
+            return self.prior, self.prior
+        if self._q is None:
+            p50, p95 = np.percentile(np.fromiter(self.lat, float, len(self.lat)), (50, 95))
+            self._q = float(p50), float(p95)
+        return self._q
+
+    @property
+    def error_rate(self) -> float:
+        return 1.0 - sum(self.ok) / len(self.ok) if self.ok else 0.0
+
+
+class LLMRouter:
+    def __init__(
+        self,
+        backends: dict[str, Backend],
+        *,
+        routes: dict[str, dict] | None = None,
+        window: int = 200,
+        min_samples: int = 5,
+        max_error: float = 0.5,
+        hedge: bool = True,
+        hedge_min: float = 0.05,
+        prior: dict[str, float] | None = None,
+        free: tuple[str, ...] | list[str] = ("rules",),
+        available: dict[str, Callable[[], bool]] | None = None,
+        logger: logging.Logger | None = None,
+    ) -> None:
+        self.backends    = backends
+        self.available   = available or {}
+        self.routes      = routes or {"default": {"order": list(backends), "deadline": 6.0}}
+        self.min_samples = min_samples
+        self.max_error   = max_error
+        self.hedge       = hedge
+        self.hedge_min   = hedge_min
+        self.free        = set(free)
+        self.log = logger or logging.getLogger("LLMRouter")
+        prior = prior or {}
+        self.stats = {n: _Stats(window, prior.get(n, 1.0)) for n in backends}
+
+    # ────────────────────────── 选择 ──────────────────────────
+    def p50(self, name: str) -> float:
+        return self.stats[name].quantiles(self.min_samples)[0]
+
+    def p95(self, name: str) -> float:
+        return self.stats[name].quantiles(self.min_samples)[1]
+
+    def rank(self, order, budget: float) -> list[str]:
+        """按本次预算排序：先是预计能完成的（保持质量顺序），再按 p50 从快到慢"""
+        names   = [n for n in order if n in self.backends]
+        names   = [n for n in names if self.available.get(n, _always)()] or names
+        healthy = [n for n in names if self.stats[n].error_rate <= self.max_error] or names
+        fits    = [n for n in healthy if self.p95(n) <= budget]
+        return fits + sorted((n for n in names if n not in fits), key=self.p50)
+
+    # ────────────────────────── 决策 ──────────────────────────
+    async def decide(self, route: str, price: float, pos, spec: dict, *,
+                     key=None, deadline: float | None = None) -> tuple[str, str, dict]:
+        r = self.routes[route]
+        deadline = r.get("deadline", 6.0) if deadline is None else deadline
+        loop  = asyncio.get_running_loop()
+        t_end = loop.time() + deadline
+        queue = self.rank(r.get("order", list(self.backends)), deadline)
+        pending: dict[asyncio.Task, tuple[str, float]] = {}
+
+        def pick(left: float) -> str:
+            # 剩余预算内预计能完成的第一个；都不行则取队首（已按 p50 排序）
+            return next((n for n in queue if self.p95(n) <= left), queue[0])
+
+        def launch() -> None:
+            name = pick(t_end - loop.time())
+            queue.remove(name)
+            pending[loop.create_task(self.backends[name](price, pos, spec, key))] = (name, loop.time())
+
+        launch()
+        try:
+            while pending:
+                now = loop.time()
+                hedge_at = None
+                if self.hedge and queue and len(pending) == 1:
+                    name, t0 = next(iter(pending.values()))
+                    hedge_at = t0 + max(self.p95(name), self.hedge_min)
+                    nxt = pick(t_end - hedge_at)
+                    if nxt in self.free:                         # 零成本兜底：临近 deadline 才发
+                        hedge_at = max(hedge_at, t_end - max(self.p95(nxt), self.hedge_min))
+                wake = min(t_end, hedge_at) if hedge_at is not None else t_end
+                done, _ = await asyncio.wait(pending, timeout=max(0.0, wake - now),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                failed = False
+                for t in done:
+                    name, t0 = pending.pop(t)
+                    res = self._result(t)
+                    self._record(name, loop.time() - t0, res is not None)
+                    if res is not None:
+                        llm_router_wins_total.labels(name).inc()
+                        sig, prompt, extra = res
+                        return sig, prompt, {**extra, "backend": name}
+                    llm_router_errors_total.labels(name).inc()
+                    failed = True
+                if loop.time() >= t_end:
+                    break
+                if queue and ((failed and not pending) or
+                              (not done and hedge_at is not None and loop.time() >= hedge_at)):
+                    if pending:
+                        llm_router_hedges_total.inc()
+                    launch()
+        finally:
+            for t, (name, t0) in pending.items():
+                t.cancel()
+                if loop.time() >= t_end:
+                    llm_router_timeouts_total.labels(name).inc()
+                    self._record(name, loop.time() - t0, False)
+                else:                                            # hedge 落败：已耗时为延迟下界
+                    self._record(name, loop.time() - t0, None)
+        self.log.warning("LLM router: no valid answer within %.2fs (%s)", deadline, route)
+        return "HOLD", "router timeout", {"err": "timeout"}
+
+    # ──────────────────────── private ────────────────────────
+    def _result(self, t: asyncio.Task):
+        if t.cancelled():
+            return None
+        e = t.exception()
+        if e is not None:
+            self.log.warning("LLM backend err: %s", e)
+            return None
+        sig, prompt, extra = t.result()
+        if sig not in SIDES or (extra or {}).get("err"):
+            return None
+        return sig, prompt, extra or {}
+
+    def _record(self, name: str, latency: float, ok: bool | None) -> None:
+        s = self.stats[name]
+        s.record(latency, ok)
+        llm_backend_latency_p95.labels(name).set(self.p95(name))
+        llm_backend_error_rate.labels(name).set(s.error_rate)
+
+
+def _always() -> bool:
+    return True
+
+
+# ───────────────────────────────────────────────────────────────
+async def rule_decide(price: float, pos, spec: dict, key=None) -> tuple[str, str, dict]:
+    """确定性规则：EMA 快 > 慢 且价格在 VWAP 上方 → BUY，反之 SELL，否则 HOLD"""
+    f = spec.get("features")
+    if f is None or f.bars < 2:
+        return "HOLD", "rules", {"side": "HOLD"}
+    if f.ema_fast > f.ema_slow and price > f.vwap:
+        side = "BUY"
+    elif f.ema_fast < f.ema_slow and price < f.vwap:
+        side = "SELL"
+    else:
+        side = "HOLD"
+    return side, "rules", {"side": side, "ema_fast": f.ema_fast, "ema_slow": f.ema_slow, "vwap": f.vwap}
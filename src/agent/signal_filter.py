@@ -1,6 +1,10 @@
-import time, collections
+import collections
 from typing import Deque, Literal
 
+import numpy as np
+
+from ..utils import clock
+
 Signal = Literal["BUY", "SELL", "HOLD"]
 
 class SignalFilter:
@@ -14,7 +18,7 @@ class SignalFilter:
         self._last_emit_ts: float = 0.0
 
     def push(self, sig: Signal) -> Signal | None:
-        now = time.time()
+        now = clock.now()
         if now - self._last_emit_ts < self.throttle:
             return None  # 节流
         if sig == "HOLD":
@@ -30,3 +34,133 @@ class SignalFilter:
     def reset(self) -> None:
         self._buf.clear()
         self._last_emit_ts = 0.0
+
+    def emit_indices(self, ts, signals) -> np.ndarray:
+        """以当前参数、从复位状态批量回放（见 sweep）"""
+        return sweep(ts, signals, self.n_same, self.throttle)[0]
+
+
+# ───────────────────────────────────────────────────────────────
+# 批量版（参数扫描 / 回测）
+#
+# 逐个 push 的状态机等价于：
+#   • 某次输出于 k 后，下一笔被接受的信号是第一个 t[j] - t[k] >= throttle 的 j（> k），
+#     且此时缓冲区为空（输出时清空，节流期间的信号直接丢弃）
+#   • 从空缓冲区的 j 开始，第一个满足 “k-n+1 .. k 都 >= j、同向、非 HOLD” 的 k 即输出
+#     （HOLD 清空缓冲区，方向切换后旧方向永远凑不满 n 个）
+# 于是用 L[k]（截至 k 的同向非 HOLD 连续长度）和 “下一个 L >= n 的位置” 表，
+# 每个参数组合只需按输出次数跳跃；所有组合在同一个向量化循环里一起推进。
+# ───────────────────────────────────────────────────────────────
+_CODES = {"BUY": 1, "SELL": -1, "HOLD": 0}
+
+
+def encode(signals) -> np.ndarray:
+    """"BUY" / "SELL" / "HOLD"（或已编码的 1 / -1 / 0）→ int8 数组"""
+    a = np.asarray(signals)
+    if a.dtype.kind in "USO":
+        return np.array([_CODES[x] for x in a.tolist()], dtype=np.int8)
+    return np.sign(a).astype(np.int8)
+
+
+def run_lengths(codes: np.ndarray) -> np.ndarray:
+    """L[k]：截至 k（含）的同向非 HOLD 连续信号数；HOLD 处为 0"""
+    k = len(codes)
+    i = np.arange(k)
+    new = np.ones(k, dtype=bool)
+    new[1:] = codes[1:] != codes[:-1]
+    start = np.maximum.accumulate(np.where(new, i, 0))
+    return np.where(codes != 0, i - start + 1, 0)
+
+
+def _first_accepted(t: np.ndarray, base: np.ndarray, thr: np.ndarray, lo: np.ndarray) -> np.ndarray:
+    """
+    每个组合下一笔不被节流的下标：j >= lo 中第一个 t[j] - base >= thr
+    （与 push 同一个减法比较，searchsorted 给初值后修正浮点边界）
+    """
+    N = len(t)
+    j = np.maximum(np.searchsorted(t, base + thr, "left"), lo)
+    while True:
+        jc = np.minimum(j, N - 1)
+        up = (j < N) & ~(t[jc] - base >= thr)
+        dn = (j > lo) & (t[np.maximum(j - 1, 0)] - base >= thr)
+        if not (up.any() or dn.any()):
+            return j
+        j = np.where(up, np.searchsorted(t, t[jc], "right"), np.where(dn, j - 1, j))
+
+
+def _orbit(f: np.ndarray, start: int, N: int) -> np.ndarray:
+    """start, f(start), f(f(start)), … 直到哨兵 N；f 严格递增跳跃，倍增 O(N log m)"""
+    seq, g = np.array([start]), f
+    while seq[-1] < N:
+        seq = np.concatenate((seq, g[seq]))
+        if seq[-1] < N:
+            g = g[g]
+    return seq[seq < N]
+
+
+def sweep(ts, signals, n_same, throttle, *, last_emit_ts: float = 0.0) -> list[np.ndarray]:
+    """
+    一次评估多组 (n_same, throttle)
+
+      ts        每次 push 时的 clock.now()，须非降序
+      signals   与 ts 等长的方向（字符串或 1 / -1 / 0）
+      n_same, throttle  标量或数组，按 NumPy 规则广播成组合（网格用 np.meshgrid 后 ravel）
+
+    返回每个组合的输出下标数组（signals[idx] 即输出方向），
+    与新建 SignalFilter(n_same=, throttle=) 逐个 push 的结果完全一致。
+    """
+    t = np.asarray(ts, dtype=float)
+    c = encode(signals)
+    if len(t) != len(c):
+        raise ValueError("ts / signals length mismatch")
+    n, thr = np.broadcast_arrays(np.asarray(n_same, dtype=np.int64),
+                                 np.asarray(throttle, dtype=float))
+    n, thr = n.ravel(), thr.ravel()
+    C, N = len(n), len(t)
+    if N == 0 or C == 0:
+        return [np.zeros(0, dtype=np.int64) for _ in range(C)]
+
+    # 每种 n_same 一张 “>= i 的第一个 L >= n 的下标” 表，末尾补 N 作哨兵
+    L = run_lengths(c)
+    ns, row = np.unique(n, return_inverse=True)
+    nxt = np.empty((len(ns), N + 1), dtype=np.int64)
+    for r, m in enumerate(ns.tolist()):
+        idx = np.where(L >= m, np.arange(N), N) if m > 0 else np.full(N, N)
+        nxt[r, :N] = np.minimum.accumulate(idx[::-1])[::-1]
+        nxt[r, N]  = N
+
+    pos = _first_accepted(t, np.full(C, last_emit_ts), thr, np.zeros(C, dtype=np.int64))
+    live = np.flatnonzero(pos < N)
+    hits_c, hits_k = [], []
+    budget = N // 512 + 64                  # 共享循环每步约等于一次倍增的 1/512 开销
+    while len(live) and budget:
+        budget -= 1
+        k = nxt[row[live], np.minimum(pos[live] + np.maximum(n[live], 1) - 1, N)]
+        ok = k < N
+        live, k = live[ok], k[ok]
+        hits_c.append(live)
+        hits_k.append(k)
+        pos[live] = _first_accepted(t, t[k], thr[live], k + 1)
+        live = live[pos[live] < N]
+
+    # 输出很密的组合（throttle 远小于信号间隔）：按 “输出 → 下一次输出” 映射倍增展开
+    accepted: dict[float, np.ndarray] = {}                # 同一 throttle 的组合共用
+    for ci in live.tolist():
+        m = max(int(n[ci]), 1)
+        th = float(thr[ci])
+        acc = accepted.get(th)
+        if acc is None:
+            acc = accepted[th] = _first_accepted(t, t, np.full(N, th), np.arange(1, N + 1))
+        f = np.empty(N + 1, dtype=np.int64)
+        f[:N] = nxt[row[ci], np.minimum(acc + m - 1, N)]
+        f[N]  = N
+        k = _orbit(f, int(nxt[row[ci], min(int(pos[ci]) + m - 1, N)]), N)
+        hits_c.append(np.full(len(k), ci))
+        hits_k.append(k)
+
+    if not hits_c:
+        return [np.zeros(0, dtype=np.int64) for _ in range(C)]
+    hc, hk = np.concatenate(hits_c), np.concatenate(hits_k)
+    order = np.argsort(hc, kind="stable")               # 同一组合内按输出先后
+    hc, hk = hc[order], hk[order]
+    return np.split(hk, np.searchsorted(hc, np.arange(1, C)))
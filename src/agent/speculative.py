@@ -0,0 +1,140 @@
+"""
+本地 LLM 预测性推理：在 SignalFilter 触发之前，后台为每个合约保持一份新鲜的 Gemma 意见
+
+• observe(tick, features) 由行情侧逐笔调用（同步、不等待）：
+    相对上次发起请求时：价格移动 ≥ zone_bps、EMA 快慢交叉翻转、或 ATR 相对变化 ≥ atr_change 即视为状态变化
+    状态变化 → 取消该合约在途的旧请求，按新状态重发；状态未变但意见已超过 max_age → 刷新
+  每个合约同时最多一个在途请求
+• get(symbol, price) 由决策链调用：
+    价格距意见价不足 zone_bps、未超过 max_age 的意见 → 直接返回（带年龄）；
+    接近当前价的请求仍在途 → 等它完成；否则 None（调用方走同步推理）
+• prompt(price, features) 带上触发刷新的特征，状态变化后的请求输入确实不同
+• ask 以 strict=True 调用：超时 / 出错 / 无法解析直接丢弃，不把兜底 HOLD 当作 Gemma 意见缓存
+• 时间一律取 clock.now()，意见年龄从发起请求时的行情时刻算起
+"""
+import asyncio, logging, math
+from typing import Any, Awaitable, Callable
+
+from ..monitor.metrics import local_spec_total, local_spec_age_seconds
+from ..utils import clock
+
+Ask    = Callable[..., Awaitable[tuple[str, float]]]   # ask(prompt, strict=True)：失败抛出
+Prompt = Callable[[float, Any], str]
+
+
+class _Slot:
+    __slots__ = ("ref", "task", "side", "ts", "price")
+
+    def __init__(self) -> None:
+        self.ref: tuple | None = None             # 在途 / 最近一次请求的状态 (price, trend, atr)
+        self.task: asyncio.Task | None = None
+        self.side: str | None = None              # 最近一次完成的意见
+        self.ts    = 0.0                          # 该意见对应的行情时刻
+        self.price = 0.0                          # 该意见对应的价格
+
+
+class LocalSpeculator:
+    def __init__(
+        self,
+        ask: Ask,
+        prompt: Prompt,
+        *,
+        enabled: bool = True,
+        zone_bps: float = 5.0,
+        atr_change: float = 0.1,
+        max_age: float = 2.0,
+        ready: Callable[[], bool] | None = None,
+        logger: logging.Logger | None = None,
+    ) -> None:
+        self.ask     = ask
+        self.ready   = ready
+        self.prompt  = prompt
+        self.enabled = enabled
+        self.max_age = max_age
+        self._lz     = math.log1p(zone_bps / 1e4)
+        self._la     = math.log1p(atr_change)
+        self.log     = logger or logging.getLogger("Speculator")
+        self._slots: dict[str, _Slot] = {}
+
+    # ────────────────────────── 行情侧 ──────────────────────────
+    def observe(self, tick, features=None) -> None:
+        if not self.enabled or (self.ready is not None and not self.ready()):
+            return
+        slot = self._slots.get(tick.symbol)
+        if slot is None:
+            slot = self._slots[tick.symbol] = _Slot()
+        ref  = (tick.price,) + self._feature_ref(features)
+        now  = clock.now()
+        busy = slot.task is not None and not slot.task.done()
+        if slot.ref is not None and not self._moved(slot.ref, ref):
+            if busy or (slot.side is not None and now - slot.ts < self.max_age):
+                return                            # 同一状态：在途或意见仍新鲜
+        elif busy:
+            slot.task.cancel()                    # 状态已变，旧请求作废
+            local_spec_total.labels("cancelled").inc()
+        slot.ref  = ref
+        slot.task = asyncio.get_running_loop().create_task(self._run(slot, ref, now, features))
+        local_spec_total.labels("launched").inc()
+
+    # ────────────────────────── 决策侧 ──────────────────────────
+    async def get(self, symbol: str, price: float) -> tuple[str, float] | None:
+        """→ (side, 意见年龄秒) 或 None"""
+        slot = self._slots.get(symbol)
+        if not self.enabled or slot is None:
+            local_spec_total.labels("miss").inc()
+            return None
+        if slot.side is not None and self._near(slot.price, price):
+            age = clock.now() - slot.ts
+            if age <= self.max_age:
+                local_spec_total.labels("hit").inc()
+                local_spec_age_seconds.observe(age)
+                return slot.side, age
+        task = slot.task
+        if task is not None and not task.done() and self._near(slot.ref[0], price):
+            local_spec_total.labels("inflight").inc()
+            try:
+                await asyncio.shield(task)
+            except asyncio.CancelledError:
+                if not task.cancelled():
+                    raise                         # 调用方自身被取消
+                return None                       # 等待期间被更新的状态取消
+            if slot.side is not None and self._near(slot.price, price):
+                return slot.side, clock.now() - slot.ts
+        local_spec_total.labels("stale").inc()
+        return None
+
+    def cancel_all(self) -> None:
+        for slot in self._slots.values():
+            if slot.task is not None:
+                slot.task.cancel()
+        self._slots.clear()
+
+    # ──────────────────────── private ────────────────────────
+    async def _run(self, slot: _Slot, ref: tuple, ts: float, features=None) -> None:
+        try:
+            raw, _ = await self.ask(self.prompt(ref[0], features), strict=True)
+        except Exception as e:
+            self.log.warning("speculative ask failed: %s", e)
+            return
+        if slot.ref is ref:
+            slot.side, slot.ts, slot.price = raw.strip().upper()[:4], ts, ref[0]
+
+    def _near(self, p0: float, p: float) -> bool:
+        """相对发起请求时的价格移动不足一个区间宽度（以发起价为锚，不会在分桶边界来回抖动）"""
+        return p0 > 0 and p > 0 and abs(math.log(p / p0)) < self._lz
+
+    def _moved(self, old: tuple, new: tuple) -> bool:
+        if not self._near(old[0], new[0]) or len(old) != len(new):
+            return True
+        if len(new) == 1:
+            return False
+        (_, t0, a0), (_, t1, a1) = old, new
+        if t0 != t1:
+            return True
+        return (a0 > 0) != (a1 > 0) or (a0 > 0 and abs(math.log(a1 / a0)) >= self._la)
+
+    @staticmethod
+    def _feature_ref(f) -> tuple:
+        if f is None:
+            return ()
+        return (f.ema_fast > f.ema_slow) - (f.ema_fast < f.ema_slow), f.atr
@@ -0,0 +1,172 @@
+"""
+LLM 决策缓存（GPT 前置）
+
+键 = 量化后的市场状态：
+  symbol / 持仓方向 / 价格区间（几何分桶，zone_bps）/ ATR 档（ATR / 价格，atr_bps）/ 余额档（几何分桶，balance_pct）
+命中直接返回上次的 side / qty，不再请求 GPT。
+
+• 进程内 LRU + TTL（OrderedDict），按 clock.now() 计时，回放确定性
+• 持仓变化显式失效：observe_position() 发现方向变了即清掉该合约的全部条目
+• redis_url 非空时作为二级缓存跨实例共享（redis.asyncio，SET EX；每合约一个索引集合用于失效）
+"""
+import asyncio, json, logging, math
+from collections import OrderedDict
+
+from .monitor.metrics import (
+    decision_cache_total, decision_cache_hit_ratio, decision_cache_size,
+    decision_cache_invalidations_total,
+)
+from .utils import clock
+
+Key = tuple
+
+
+class DecisionCache:
+    def __init__(
+        self,
+        *,
+        maxsize: int = 1024,
+        ttl: float = 60.0,
+        zone_bps: float = 5.0,
+        atr_bps: float = 2.0,
+        balance_pct: float = 5.0,
+        redis_url: str = "",
+        redis_timeout: float = 0.05,
+        logger: logging.Logger | None = None,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl     = ttl
+        self._lz     = math.log1p(zone_bps / 1e4)
+        self._atr    = atr_bps
+        self._lb     = math.log1p(balance_pct / 100)
+        self.redis_url     = redis_url
+        self.redis_timeout = redis_timeout
+        self.log = logger or logging.getLogger("DecisionCache")
+        self._d: OrderedDict[Key, tuple[float, dict]] = OrderedDict()
+        self._pos: dict[str, str] = {}
+        self._hits = self._lookups = 0
+        self._r = None
+
+    # ────────────────────────── 键 ──────────────────────────
+    def key(self, symbol: str, price: float, pos: str | None, atr: float, balance: float) -> Key:
+        zone = round(math.log(price) / self._lz) if price > 0 else 0
+        atrb = round(atr / price * 1e4 / self._atr) if price > 0 and self._atr else 0
+        balb = round(math.log(balance) / self._lb) if balance > 0 else 0
+        return (symbol, pos or "FLAT", zone, atrb, balb)
+
+    # ────────────────────────── 读写 ──────────────────────────
+    async def get(self, key: Key) -> dict | None:
+        v = self._get_local(key)
+        if v is None and self.redis_url:
+            v = await self._get_redis(key)
+            if v is not None:
+                self._put_local(key, v)
+                decision_cache_total.labels("redis_hit").inc()
+        self._lookups += 1
+        if v is not None:
+            self._hits += 1
+        else:
+            decision_cache_total.labels("miss").inc()
+        decision_cache_hit_ratio.set(self._hits / self._lookups)
+        return v
+
+    async def put(self, key: Key, value: dict) -> None:
+        self._put_local(key, value)
+        if self.redis_url:
+            await self._put_redis(key, value)
+
+    # ────────────────────────── 失效 ──────────────────────────
+    async def observe_position(self, symbol: str, pos: str | None) -> None:
+        """每次读到持仓方向时调用；方向变化 → 失效该合约全部条目"""
+        pos = pos or "FLAT"
+        prev = self._pos.get(symbol)
+        self._pos[symbol] = pos
+        if prev is not None and prev != pos:
+            await self.invalidate(symbol)
+
+    async def invalidate(self, symbol: str | None = None) -> None:
+        dead = [k for k in self._d if symbol is None or k[0] == symbol]
+        for k in dead:
+            del self._d[k]
+        decision_cache_size.set(len(self._d))
+        decision_cache_invalidations_total.inc()
+        if self.redis_url:
+            await self._invalidate_redis(symbol)
+
+    def clear(self) -> None:
+        self._d.clear()
+        self._pos.clear()
+        self._hits = self._lookups = 0
+
+    # ──────────────────────── 进程内 ────────────────────────
+    def _get_local(self, key: Key) -> dict | None:
+        e = self._d.get(key)
+        if e is None:
+            return None
+        if e[0] <= clock.now():
+            del self._d[key]
+            decision_cache_size.set(len(self._d))
+            return None
+        self._d.move_to_end(key)
+        decision_cache_total.labels("hit").inc()
+        return e[1]
+
+    def _put_local(self, key: Key, value: dict) -> None:
+        self._d[key] = (clock.now() + self.ttl, value)
+        self._d.move_to_end(key)
+        while len(self._d) > self.maxsize:
+            self._d.popitem(last=False)
+        decision_cache_size.set(len(self._d))
+
+    # ──────────────────────── Redis ────────────────────────
+    def _redis(self):
+        if self._r is None:
+            import redis.asyncio as aioredis
+            self._r = aioredis.from_url(self.redis_url)
+        return self._r
+
+    @staticmethod
+    def _rkey(key: Key) -> str:
+        return "decision:" + ":".join(map(str, key))
+
+    async def _get_redis(self, key: Key) -> dict | None:
+        try:
+            raw = await asyncio.wait_for(self._redis().get(self._rkey(key)), self.redis_timeout)
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            self.log.debug("redis get failed: %s", e)
+            return None
+
+    async def _put_redis(self, key: Key, value: dict) -> None:
+        idx, ttl = f"decision:idx:{key[0]}", max(1, int(self.ttl))
+        try:
+            async with self._redis().pipeline(transaction=False) as p:
+                p.set(self._rkey(key), json.dumps(value), ex=ttl)
+                p.sadd(idx, self._rkey(key))
+                p.expire(idx, ttl)
+                await asyncio.wait_for(p.execute(), self.redis_timeout)
+        except Exception as e:
+            self.log.debug("redis put failed: %s", e)
+
+    async def _invalidate_redis(self, symbol: str | None) -> None:
+        r = self._redis()
+        try:
+            if symbol is None:
+                idxs = [k async for k in r.scan_iter("decision:idx:*")]
+            else:
+                idxs = [f"decision:idx:{symbol}"]
+            for idx in idxs:
+                keys = await r.smembers(idx)
+                await r.delete(idx, *keys)
+        except Exception as e:
+            self.log.warning("redis invalidate failed: %s", e)
+
+
+# ——— 全局单例 ———
+_cache: DecisionCache | None = None
+def decision_cache(**kw) -> DecisionCache:
+    """首次调用按 kw（configs/config.yaml decision_cache 段）创建"""
+    global _cache
+    if _cache is None:
+        _cache = DecisionCache(**kw)
+    return _cache
@@ -1,33 +1,195 @@
-import collections, statistics, time
+import math
+from collections import deque
+
+import numpy as np
+
+from .utils.rolling import RollingSum
+
+FEATURES = ("pct", "zret", "accel", "vol", "burst", "spread")
 
 class EventClassifier:
-    """窗口内价格与量能特征 → bool 显著事件"""
+    """
+    滚动特征 → 显著性得分
+
+      pct     相邻两价变动 |Δp| / p
+      zret    |收益| / 窗口内收益 RMS（波动率归一）
+      accel   |二阶差分| / 窗口内平均 |一阶差分|
+      vol     本笔量 / 窗口平均量（窗口填满后）
+      burst   短窗口成交笔数速率 / 长窗口速率（笔 / 秒）
+      spread  当前价差 bps / 窗口平均价差（有盘口时）
+
+    各特征先除以对应阈值归一，score = max(pct, zret, √(accel × flow))，flow = max(vol, burst, spread)：
+    大幅价变（绝对 / 波动率归一）单独即可触发；加速度需要量、笔数或价差同时放大才算，
+    过滤纯价格抖动。score ≥ min_score 即显著事件。
+    窗口统计全部增量维护（前缀和环，src/utils/rolling.py），每 tick O(1)；
+    score_many / push_many 对整段数组批量计算，结果与逐个 update 完全一致。
+    take_peak() 只看最近 burst_window 笔的最高分（单调队列），早先的尖峰不会让之后平静的信号被判为显著。
+    """
     def __init__(self,
         price_window=60, vol_window=30,
-        pct_th=0.004, accel_th=2.0, vol_th=3.0):
-        self.prices = collections.deque(maxlen=price_window)
-        self.vols   = collections.deque(maxlen=vol_window)
+        pct_th=0.004, accel_th=2.0, vol_th=3.0,
+        z_th=4.0, burst_th=3.0, spread_th=2.0,
+        burst_window=20, spread_window=100, min_score=1.0):
+        self.price_window = max(2, price_window)
+        self.vol_window   = vol_window
         self.pct_th      = pct_th
         self.accel_th    = accel_th
         self.vol_th_ratio= vol_th
-        self.last_ts = 0
-
-    def push(self, price: float, volume: float = 1.0) -> bool:
-        now = time.time()
-        self.prices.append(price)
-        self.vols.append(volume)
-        # 1) 价差
-        if len(self.prices) >= 2:
-            pct = abs(price - self.prices[-2]) / self.prices[-2]
-            if pct >= self.pct_th: return True
-        # 2) 加速度
-        if len(self.prices) >= 3:
-            accel = (self.prices[-1]-self.prices[-2])-(self.prices[-2]-self.prices[-3])
-            mu = statistics.mean(abs(self.prices[i]-self.prices[i-1]) for i in range(1,len(self.prices)))
-            if mu and abs(accel)/mu >= self.accel_th: return True
-        # 3) 量能
-        if len(self.vols) == self.vols.maxlen:
-            if volume / (sum(self.vols)/len(self.vols)) >= self.vol_th_ratio:
-                return True
-        # fallback
-        return False
+        self.min_score   = min_score
+        # 阈值为 None → 该特征不参与打分
+        self._th = np.array([x if x else math.inf for x in
+                             (pct_th, z_th, accel_th, vol_th, burst_th, spread_th)], dtype=float)
+        self._thl = self._th.tolist()
+        self._absd   = RollingSum(self.price_window - 1)   # |Δp|
+        self._r2     = RollingSum(self.price_window - 1)   # 收益平方
+        self._vols   = RollingSum(vol_window)
+        self._cnt_s  = RollingSum(burst_window)            # 成交笔数 / 时间间隔，短窗口
+        self._dt_s   = RollingSum(burst_window)
+        self._cnt_l  = RollingSum(max(burst_window, self.price_window))
+        self._dt_l   = RollingSum(max(burst_window, self.price_window))
+        self._spread = RollingSum(spread_window)
+        self._p1 = self._p2 = self._t1 = 0.0               # 上一价 / 上上价 / 上一时间
+        self.n = 0
+        self.peak_window = burst_window
+        self._peaks: deque[tuple[int, float]] = deque()   # (序号, 得分) 单调递减，最近 peak_window 笔
+        self.last: dict[str, float] = dict.fromkeys(FEATURES, 0.0)
+
+    # ────────────────────────── 逐笔 ──────────────────────────
+    def update(self, price: float, volume: float = 1.0, ts: float = 0.0,
+               trades: int = 1, spread_bps: float = math.nan) -> float:
+        n, p1, p2, t1 = self.n, self._p1, self._p2, self._t1
+        self.n, self._p2, self._p1, self._t1 = n + 1, p1, price, ts
+        dt = ts - t1 if n else 0.0
+        vsum = self._vols.push(volume)
+        cs, ds = self._cnt_s.push(trades), self._dt_s.push(dt)
+        cl, dl = self._cnt_l.push(trades), self._dt_l.push(dt)
+
+        pct = zr = acc = 0.0
+        if n:
+            d    = abs(price - p1)
+            dsum = self._absd.push(d)
+            pct  = d / p1
+            r2   = self._r2.push(pct * pct)
+            if r2 > 0:
+                zr = pct / math.sqrt(r2 / self._r2.count)
+            if n >= 2:
+                mu = dsum / self._absd.count
+                if mu:
+                    acc = abs((price - p1) - (p1 - p2)) / mu
+        vs = volume / (vsum / self._vols.w) if self._vols.full and vsum > 0 else 0.0
+        burst = (cs / ds) / (cl / dl) if self._cnt_l.full and ds > 0 and dl > 0 and cl > 0 else 0.0
+        sp = 0.0
+        if spread_bps == spread_bps:                        # 非 NaN
+            ssum = self._spread.push(spread_bps)
+            if self._spread.full and ssum > 0:
+                sp = spread_bps / (ssum / self._spread.w)
+
+        f = (pct, zr, acc, vs, burst, sp)
+        th = self._thl
+        flow  = max(vs / th[3], burst / th[4], sp / th[5])
+        score = max(pct / th[0], zr / th[1], math.sqrt(acc / th[2] * flow))
+        self.last = dict(zip(FEATURES, f))
+        self._note_peak(n, score)
+        return score
+
+    def push(self, price: float, volume: float = 1.0, ts: float = 0.0) -> bool:
+        return self.update(price, volume, ts) >= self.min_score
+
+    def observe(self, tick, trades: int = 1, spread_bps: float = math.nan) -> float:
+        """src.trade.tick.Tick（qty 为真实成交量）→ 得分"""
+        return self.update(tick.price, tick.qty, tick.exchange_ts, trades, spread_bps)
+
+    def push_tick(self, tick) -> bool:
+        return self.observe(tick) >= self.min_score
+
+    def take_peak(self) -> float:
+        """上次调用以来、且在最近 peak_window 笔内的最高分（决策链按合并后的节奏取，不漏掉期间的事件）"""
+        q = self._peaks
+        while q and q[0][0] < self.n - self.peak_window:
+            q.popleft()
+        p = q[0][1] if q else 0.0
+        q.clear()
+        return p
+
+    def _note_peak(self, i: int, score: float) -> None:
+        q = self._peaks
+        while q and q[-1][1] <= score:
+            q.pop()
+        q.append((i, score))
+        if q[0][0] < i + 1 - self.peak_window:
+            q.popleft()
+
+    # ────────────────────────── 批量 ──────────────────────────
+    def features_many(self, prices, volumes=None, ts=None, trades=None, spreads=None) -> np.ndarray:
+        """(k, len(FEATURES)) 特征矩阵；状态与逐个 update 相同地推进"""
+        p = np.asarray(prices, dtype=float)
+        k = len(p)
+        F = np.zeros((k, len(FEATURES)))
+        if k == 0:
+            return F
+        v = np.ones(k)      if volumes is None else np.asarray(volumes, dtype=float)
+        T = np.zeros(k)     if ts      is None else np.asarray(ts, dtype=float)
+        c = np.ones(k)      if trades  is None else np.asarray(trades, dtype=float)
+        s = np.full(k, np.nan) if spreads is None else np.asarray(spreads, dtype=float)
+        n0  = self.n
+        cnt = np.arange(n0 + 1, n0 + k + 1)                 # 每次 update 后的累计数
+
+        dt = np.empty(k)
+        dt[0]  = T[0] - self._t1 if n0 else 0.0
+        dt[1:] = np.diff(T)
+        vsum = self._vols.extend(v)
+        cs, ds = self._cnt_s.extend(c), self._dt_s.extend(dt)
+        cl, dl = self._cnt_l.extend(c), self._dt_l.extend(dt)
+
+        prev = [self._p2, self._p1][max(0, 2 - n0):]
+        ext  = np.concatenate((prev, p))
+        h    = len(prev)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ok = (cnt >= self._vols.w) & (vsum > 0)
+            F[:, 3] = np.where(ok, v / (vsum / self._vols.w), 0.0)
+            ok = (cnt >= self._cnt_l.w) & (ds > 0) & (dl > 0) & (cl > 0)
+            F[:, 4] = np.where(ok, (cs / ds) / (cl / dl), 0.0)
+
+            first = 1 if n0 == 0 else 0                     # 全局第一价没有差分
+            if k > first:
+                cur  = ext[h + first:]
+                p1   = ext[h + first - 1:-1]
+                d    = np.abs(cur - p1)
+                idx  = np.arange(max(n0, 1), n0 + k)        # 每个价的全局序号
+                dsum = self._absd.extend(d)
+                pct  = d / p1
+                r2   = self._r2.extend(pct * pct)
+                m    = np.minimum(idx, self._absd.w)
+                mu   = dsum / m
+                F[first:, 0] = pct
+                F[first:, 1] = np.where(r2 > 0, pct / np.sqrt(r2 / m), 0.0)
+                j    = np.arange(len(cur)) + h + first
+                a    = np.abs((ext[j] - ext[j - 1]) - (ext[np.maximum(j - 1, 0)] - ext[np.maximum(j - 2, 0)]))
+                F[first:, 2] = np.where((idx >= 2) & (mu != 0), a / mu, 0.0)
+
+            mask = ~np.isnan(s)
+            if mask.any():
+                ns0  = self._spread.n
+                ssum = self._spread.extend(s[mask])
+                ok   = (np.arange(ns0 + 1, ns0 + mask.sum() + 1) >= self._spread.w) & (ssum > 0)
+                F[mask, 5] = np.where(ok, s[mask] / (ssum / self._spread.w), 0.0)
+
+        self.n = n0 + k
+        self._p1, self._t1 = float(ext[-1]), float(T[-1])
+        if len(ext) >= 2:
+            self._p2 = float(ext[-2])
+        self.last = dict(zip(FEATURES, F[-1].tolist()))
+        return F
+
+    def score_many(self, prices, volumes=None, ts=None, trades=None, spreads=None) -> np.ndarray:
+        N = self.features_many(prices, volumes, ts, trades, spreads) / self._th
+        scores = np.maximum(np.maximum(N[:, 0], N[:, 1]), np.sqrt(N[:, 2] * N[:, 3:].max(axis=1)))
+        k  = len(scores)
+        n0 = self.n - k
+        for j in range(max(0, k - self.peak_window), k):   # 更早的已出窗口
+            self._note_peak(n0 + j, float(scores[j]))
+        return scores
+
+    def push_many(self, prices, volumes=None) -> np.ndarray:
+        """批量判定（回放 / 回测）"""
+        return self.score_many(prices, volumes) >= self.min_score
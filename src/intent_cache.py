@@ -1,17 +1,89 @@
-import hashlib, redis, os, json, time
+"""
+意图去重（同一 symbol / side / 价格区间在 TTL 内只走一次 GPT）
+
+两级：
+  L1 进程内 {key: 过期时刻}（clock.now()），TTL 内重复意图不访问网络
+  L2 Redis（redis.asyncio 连接池），一次 SET NX EX 原子判定，多实例不再 check-then-set 竞争；
+     同一往返里取 PTTL，命中他人写入的键时 L1 按剩余寿命缓存
+Redis 不可用时退化为仅 L1（记 error，不阻塞决策）。
+"""
+import asyncio, logging, os, time
+
+from .monitor.metrics import intent_cache_total, intent_cache_latency_seconds
+from .utils import clock
 
 _REDIS_URL = os.getenv("REDIS_URL", "redis://infra-redis-1:6379/0")
-_redis     = redis.from_url(_REDIS_URL)
 
 TTL_SEC = int(os.getenv("INTENT_TTL", "120"))
 
-def _key(intent: dict) -> str:
-    h = hashlib.sha1(json.dumps(intent, sort_keys=True).encode()).hexdigest()
-    return f"intent:{h}"
 
-def hit_or_set(intent: dict) -> bool:
-    k = _key(intent)
-    if _redis.exists(k):
-        return True
-    _redis.setex(k, TTL_SEC, int(time.time()))
-    return False
+class IntentCache:
+    def __init__(self, **kw) -> None:
+        self.log = logging.getLogger("IntentCache")
+        self._exp: dict[str, float] = {}
+        self._r = None
+        self.configure(**kw)
+
+    def configure(self, *, ttl: float = TTL_SEC, redis_url: str = _REDIS_URL,
+                  timeout: float = 0.05, local_max: int = 4096) -> None:
+        """configs/config.yaml intent 段；redis_url 为空 → 仅进程内"""
+        if redis_url != getattr(self, "redis_url", None):
+            self._r = None
+        self.ttl       = ttl
+        self.redis_url = redis_url
+        self.timeout   = timeout
+        self.local_max = local_max
+
+    @staticmethod
+    def key(intent: dict) -> str:
+        """按插入顺序拼接取值（调用方固定 sym / side / zone 顺序），不做 JSON + 哈希"""
+        return "intent:" + ":".join(map(str, intent.values()))
+
+    async def hit_or_set(self, intent: dict) -> bool:
+        """True = TTL 内已有同一意图；False = 首次出现（已登记）"""
+        k, now = self.key(intent), clock.now()
+        if self._exp.get(k, 0.0) > now:
+            intent_cache_total.labels("local_hit").inc()
+            return True
+        if len(self._exp) >= self.local_max:
+            self._exp = {x: e for x, e in self._exp.items() if e > now}
+
+        ttl = self.ttl
+        if self.redis_url:
+            t0 = time.perf_counter()
+            try:
+                fresh, pttl = await asyncio.wait_for(self._set_nx(k), self.timeout)
+                intent_cache_latency_seconds.observe(time.perf_counter() - t0)
+                if not fresh:
+                    self._exp[k] = now + (pttl / 1000 if pttl and pttl > 0 else ttl)
+                    intent_cache_total.labels("redis_hit").inc()
+                    return True
+            except Exception as e:
+                intent_cache_total.labels("error").inc()
+                self.log.debug("redis SET NX failed: %s", e)
+        self._exp[k] = now + ttl
+        intent_cache_total.labels("miss").inc()
+        return False
+
+    def clear(self) -> None:
+        self._exp.clear()
+
+    async def _set_nx(self, k: str) -> tuple[bool, int]:
+        if self._r is None:
+            import redis.asyncio as aioredis
+            self._r = aioredis.from_url(self.redis_url)
+        async with self._r.pipeline(transaction=False) as p:
+            p.set(k, int(clock.now()), nx=True, ex=max(1, int(self.ttl)))
+            p.pttl(k)
+            fresh, pttl = await p.execute()
+        return bool(fresh), pttl
+
+
+# ——— 全局单例 ———
+_cache = IntentCache()
+def intent_cache() -> IntentCache:
+    return _cache
+
+
+async def hit_or_set(intent: dict) -> bool:
+    return await _cache.hit_or_set(intent)
@@ -1,32 +1,218 @@
-import requests, logging, functools, asyncio, time, os
+"""
+本地 LLM（Ollama）异步客户端
+
+• httpx.AsyncClient 常驻连接池（keep-alive），不经线程池
+• stream=True 逐块读取，一旦解析出 BUY / SELL / HOLD 立即返回；
+  剩余响应在后台读完，连接回到池里复用
+• num_predict + stop 让模型只生成几个 token 就结束
+• deadline（默认 300 ms）到期取消请求，返回 HOLD；出错同样返回 HOLD（不下单）
+• 生命周期（run_lifecycle，启动时作为后台任务）：
+    预加载模型并以 keep_alive 常驻显存；每 warm_interval 秒查 /api/ps 并发一次空 prompt 保温，
+    发现被卸载则重新加载；ready 之前路由器 / 预取不把决策发往本地模型
+"""
+import asyncio, json, logging, os, re, time
 from dotenv import load_dotenv
 
+from .monitor.metrics import (
+    local_llm_requests_total, local_llm_latency_seconds, local_llm_first_token_seconds,
+    local_llm_loaded, local_llm_cold_start_seconds, local_llm_warm_ping_seconds,
+)
+
 # 加载 .env 文件中的环境变量
 load_dotenv()
 
 OLLAMA_URL = os.getenv("OLLAMA_URL", "http://infra-ollama-1:11434/api/generate")
-MODEL      = "gemma:2b-instruct-q4_K_M"    # ← 如果要换模型，只改这里
-
-def _call_ollama(prompt: str, temperature=0.2, read_timeout=300):
-    payload = {
-        "model": MODEL,
-        "prompt": prompt,
-        "temperature": temperature,
-        "stream": False
-    }
-    t0 = time.time()
-    try:
-        # 10s 连接超时，300s 读取超时
-        r = requests.post(OLLAMA_URL, json=payload, timeout=(10, read_timeout))
+MODEL      = "gemma:2b-instruct-q4_K_M"    # ← 如果要换模型，只改这里（或 config local_llm.model）
+
+_TOKEN = re.compile(r"\b(BUY|SELL|HOLD)")
+
+
+class LocalLLMError(RuntimeError):
+    """strict 模式下超时 / 出错 / 无法解析"""
+
+
+class OllamaClient:
+    def __init__(self) -> None:
+        self.log = logging.getLogger("Ollama")
+        self._cli = None
+        self.ready = False
+        self.configure()
+
+    def configure(
+        self,
+        *,
+        url: str = OLLAMA_URL,
+        model: str = MODEL,
+        deadline: float = 0.3,
+        num_predict: int = 4,
+        stop: list[str] | None = None,
+        max_connections: int = 8,
+        connect_timeout: float = 2.0,
+        keep_alive: str | int = "24h",
+        warm_interval: float = 60.0,
+        load_timeout: float = 120.0,
+    ) -> None:
+        self.url         = url
+        self.model       = model
+        self.deadline    = deadline
+        self.num_predict = num_predict
+        self.stop        = stop if stop is not None else ["\n", ".", ","]
+        self.max_conn    = max_connections
+        self.connect_timeout = connect_timeout
+        self.keep_alive    = keep_alive
+        self.warm_interval = warm_interval
+        self.load_timeout  = load_timeout
+        self.base = url.rsplit("/api/", 1)[0]
+
+    # ────────────────────────── API ──────────────────────────
+    async def decide(self, prompt: str, *, temperature: float = 0.2,
+                     deadline: float | None = None, strict: bool = False) -> tuple[str, float]:
+        """
+        → ("BUY" | "SELL" | "HOLD", 耗时秒)；超时 / 出错 / 无法解析均为 HOLD，
+        strict=True 时改为抛 LocalLLMError（路由器据此统计错误率并改走其它后端）
+        """
+        t0 = time.perf_counter()
+        try:
+            side = await asyncio.wait_for(self._stream(prompt, temperature, t0),
+                                          self.deadline if deadline is None else deadline)
+            result = "ok" if side else "noparse"
+        except asyncio.TimeoutError:
+            side, result = None, "timeout"
+        except Exception as e:
+            self.log.warning("Ollama err: %s", e)
+            side, result = None, "error"
+        dt = time.perf_counter() - t0
+        local_llm_requests_total.labels(result).inc()
+        local_llm_latency_seconds.observe(dt)
+        if strict and side is None:
+            raise LocalLLMError(result)
+        return side or "HOLD", dt
+
+    def is_ready(self) -> bool:
+        return self.ready
+
+    # ────────────────────────── 生命周期 ──────────────────────────
+    async def run_lifecycle(self) -> None:
+        """预加载 → 周期保温；模型被卸载或请求失败时重新加载"""
+        while True:
+            try:
+                if not self.ready or not await self._loaded():
+                    await self.preload()
+                else:
+                    await self._ping()
+            except Exception as e:
+                self._set_ready(False)
+                self.log.warning("Ollama warm-keep failed: %s", e)
+            await asyncio.sleep(self.warm_interval if self.ready else min(self.warm_interval, 5.0))
+
+    async def preload(self) -> float:
+        """空 prompt 触发加载并设置 keep_alive；返回冷启动耗时"""
+        self._set_ready(False)
+        t0 = time.perf_counter()
+        r = await self._client().post(f"{self.base}/api/generate", timeout=self.load_timeout,
+                                      json={"model": self.model, "keep_alive": self.keep_alive})
+        r.raise_for_status()
+        dt = time.perf_counter() - t0
+        local_llm_cold_start_seconds.observe(dt)
+        self.log.info("Ollama model %s loaded in %.2fs", self.model, dt)
+        self._set_ready(True)
+        return dt
+
+    async def _ping(self) -> None:
+        t0 = time.perf_counter()
+        r = await self._client().post(f"{self.base}/api/generate", timeout=self.load_timeout,
+                                      json={"model": self.model, "keep_alive": self.keep_alive})
+        r.raise_for_status()
+        local_llm_warm_ping_seconds.observe(time.perf_counter() - t0)
+
+    async def _loaded(self) -> bool:
+        r = await self._client().get(f"{self.base}/api/ps", timeout=5.0)
         r.raise_for_status()
-        resp = r.json().get("response", "ERR")
-    except Exception as e:
-        logging.warning("Ollama timeout/err: %s", e)
-        resp = "ERR"
-    return resp, time.time() - t0
-
-async def ask_local_llm(prompt: str, temperature=0.2):
-    loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(
-        None, functools.partial(_call_ollama, prompt, temperature)
-    )
+        names = {m.get("name") or m.get("model") for m in r.json().get("models", [])}
+        if self.model not in names:
+            self.log.warning("Ollama model %s was unloaded", self.model)
+            return False
+        return True
+
+    def _set_ready(self, ready: bool) -> None:
+        self.ready = ready
+        local_llm_loaded.labels(self.model).set(int(ready))
+
+    async def aclose(self) -> None:
+        if self._cli is not None:
+            await self._cli.aclose()
+            self._cli = None
+
+    # ──────────────────────── private ────────────────────────
+    def _client(self):
+        if self._cli is None:
+            import httpx
+            self._cli = httpx.AsyncClient(
+                timeout=httpx.Timeout(None, connect=self.connect_timeout),   # 总时长由 deadline 控制
+                limits=httpx.Limits(max_connections=self.max_conn,
+                                    max_keepalive_connections=self.max_conn,
+                                    keepalive_expiry=300),
+            )
+        return self._cli
+
+    def _payload(self, prompt: str, temperature: float) -> dict:
+        return {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": True,
+            "keep_alive": self.keep_alive,
+            "options": {"temperature": temperature, "num_predict": self.num_predict,
+                        "stop": self.stop},
+        }
+
+    async def _stream(self, prompt: str, temperature: float, t0: float) -> str | None:
+        cli   = self._client()
+        req   = cli.build_request("POST", self.url, json=self._payload(prompt, temperature))
+        resp  = await cli.send(req, stream=True)
+        lines = resp.aiter_lines()
+        tail  = False
+        try:
+            resp.raise_for_status()
+            text, first = "", True
+            async for line in lines:
+                if not line:
+                    continue
+                if first:
+                    local_llm_first_token_seconds.observe(time.perf_counter() - t0)
+                    first = False
+                chunk = json.loads(line)
+                text += chunk.get("response", "")
+                m = _TOKEN.search(text.upper())
+                if m:
+                    tail = not chunk.get("done", False)
+                    return m.group(1)
+                if chunk.get("done"):
+                    break
+            return None
+        finally:
+            if tail:                              # 提前返回：后台读完剩余几个 token，连接回池
+                asyncio.get_running_loop().create_task(self._drain(resp, lines))
+            else:                                 # 读完 / 出错 / deadline 取消
+                await resp.aclose()
+
+    @staticmethod
+    async def _drain(resp, lines) -> None:
+        async def rest():
+            async for _ in lines:
+                pass
+        try:
+            await asyncio.wait_for(rest(), 5.0)
+        except Exception:
+            pass
+        finally:
+            await resp.aclose()
+
+
+# ——— 全局单例 ———
+_client = OllamaClient()
+def ollama() -> OllamaClient:
+    return _client
+
+
+async def ask_local_llm(prompt: str, temperature=0.2, *, strict: bool = False):
+    return await _client.decide(prompt, temperature=temperature, strict=strict)
@@ -0,0 +1,133 @@
+"""
+OpenAI 异步客户端（llm_decide 用）
+
+• AsyncOpenAI + 常驻 httpx 连接池（keep-alive / TLS 会话复用），不经线程池
+• 每个模型一个并发上限（asyncio.Semaphore），超出的请求排队等待
+• single-flight：同一 key（symbol / side / zone）的请求在途时，后来者共享同一次调用
+• deadline 到期即取消底层 HTTP 请求，调用方收到 asyncio.TimeoutError
+"""
+import asyncio, json, logging, os, time
+from typing import Any, Hashable
+
+from .monitor.metrics import (
+    gpt_requests_total, gpt_latency_seconds,
+    gpt_inflight, gpt_coalesced_total, gpt_timeouts_total,
+)
+
+
+class OpenAIClient:
+    def __init__(self) -> None:
+        self.log = logging.getLogger("OpenAI")
+        self._cli = None
+        self._sem: dict[str, asyncio.Semaphore] = {}
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self.configure()
+
+    def configure(
+        self,
+        *,
+        model: str = "gpt-4o-mini",
+        timeout: float = 6.0,
+        max_connections: int = 20,
+        keepalive: int = 10,
+        concurrency: dict[str, int] | None = None,
+        default_concurrency: int = 4,
+    ) -> None:
+        """连接池参数在下次建连时生效；并发上限立即生效（已在途的请求不受影响）"""
+        self.model       = model
+        self.timeout     = timeout
+        self.max_conn    = max_connections
+        self.keepalive   = keepalive
+        self.concurrency = dict(concurrency or {})
+        self.default_concurrency = default_concurrency
+        self._sem.clear()
+
+    # ────────────────────────── API ──────────────────────────
+    async def chat_json(self, prompt: str, *, model: str | None = None, key: Any = None,
+                        deadline: float | None = None, temperature: float = 0.2) -> dict:
+        """
+        JSON 模式单轮对话 → dict
+        key 非 None 时同 key 在途请求合并；deadline 默认 self.timeout（秒）
+        """
+        model    = model or self.model
+        deadline = self.timeout if deadline is None else deadline
+        k = (model, _hashable(key)) if key is not None else None
+        fut = self._inflight.get(k) if k is not None else None
+        if fut is None:
+            fut = asyncio.ensure_future(self._run(model, prompt, temperature, deadline))
+            if k is not None:
+                self._inflight[k] = fut
+                fut.add_done_callback(lambda f, k=k: self._done(k, f))
+        else:
+            gpt_coalesced_total.inc()
+        # shield：某个调用方自身被取消不影响共享同一请求的其它调用方
+        return await asyncio.wait_for(asyncio.shield(fut), deadline)
+
+    async def aclose(self) -> None:
+        if self._cli is not None:
+            await self._cli.close()
+            self._cli = None
+
+    # ──────────────────────── private ────────────────────────
+    def _client(self):
+        if self._cli is None:
+            import httpx, openai
+            self._cli = openai.AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                max_retries=0,                   # 重试交给上层（deadline 内无意义）
+                timeout=self.timeout,
+                http_client=httpx.AsyncClient(
+                    timeout=self.timeout,
+                    limits=httpx.Limits(max_connections=self.max_conn,
+                                        max_keepalive_connections=self.keepalive,
+                                        keepalive_expiry=60),
+                ),
+            )
+        return self._cli
+
+    def _semaphore(self, model: str) -> asyncio.Semaphore:
+        sem = self._sem.get(model)
+        if sem is None:
+            sem = self._sem[model] = asyncio.Semaphore(
+                self.concurrency.get(model, self.default_concurrency))
+        return sem
+
+    async def _run(self, model: str, prompt: str, temperature: float, deadline: float) -> dict:
+        try:
+            return await asyncio.wait_for(self._call(model, prompt, temperature), deadline)
+        except asyncio.TimeoutError:
+            gpt_timeouts_total.labels(model).inc()
+            raise
+
+    async def _call(self, model: str, prompt: str, temperature: float) -> dict:
+        async with self._semaphore(model):
+            gpt_inflight.labels(model).inc()
+            t0 = time.perf_counter()
+            try:
+                resp = await self._client().chat.completions.create(
+                    model=model,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=temperature,
+                    response_format={"type": "json_object"},
+                )
+            finally:
+                gpt_inflight.labels(model).dec()
+        gpt_latency_seconds.observe(time.perf_counter() - t0)
+        gpt_requests_total.inc()
+        return json.loads(resp.choices[0].message.content)
+
+    def _done(self, k: Hashable, fut: asyncio.Future) -> None:
+        if self._inflight.get(k) is fut:
+            del self._inflight[k]
+        if not fut.cancelled():
+            fut.exception()                      # 所有调用方都已超时离开时，避免 “never retrieved”
+
+
+def _hashable(key: Any) -> Hashable:
+    return tuple(sorted(key.items())) if isinstance(key, dict) else key
+
+
+# ——— 全局单例 ———
+_client = OpenAIClient()
+def gpt_client() -> OpenAIClient:
+    return _client
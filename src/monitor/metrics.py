@@ -18,7 +18,7 @@ except OSError:
 # ── 通用指标 ───────────────────────────────────────────────
 gpt_requests_total    = _counter("gpt_requests_total",   "Total GPT calls")
 okx_orders_total      = _counter("okx_orders_total",     "OKX orders", ["side"])
-okx_fees_usdt_total   = _counter("okx_fees_usdt_total",  "Accumulated OKX fees (USDT)")
+okx_fees_usdt_total   = _counter("okx_fees_usdt_total",  "Accumulated OKX fees (USDT, from order pushes)")
 
 gpt_latency_seconds    = Histogram("gpt_latency_seconds",   "GPT latency (s)")
 order_latency_seconds  = Histogram("order_latency_seconds", "OKX order latency (s)")
@@ -28,3 +28,113 @@ equity_usdt            = Gauge("equity_usdt", "Account equity (USDT)")
 # NEW – 本地 Trailing-SL 触发次数
 trailing_stop_hits_total = _counter("trailing_stop_hits_total",
                                     "Local trailing-stop triggered")
+
+# 行情分发（src/trade/dispatch.py）
+ws_ticks_dropped_total   = _counter("ws_ticks_dropped_total",
+                                    "Ticks dropped by dispatcher backpressure", ["src"])
+ws_ticks_coalesced_total = _counter("ws_ticks_coalesced_total",
+                                    "Ticks coalesced into a newer pending tick", ["src"])
+
+# 跨交易所合成价（src/trade/consolidate.py）
+consolidated_ticks_total = _counter("consolidated_ticks_total",
+                                    "Consolidated reference ticks", ["result"])
+feed_stale               = Gauge("feed_stale", "Venue feed marked stale (1) by consolidator",
+                                 ["venue"])
+
+# 行情连接健康（src/trade/subscriptions.py / health.py）
+ws_msg_lag_seconds    = Histogram("ws_msg_lag_seconds", "Exchange timestamp → local receive (s)",
+                                  ["venue"],
+                                  buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5))
+ws_ping_rtt_seconds   = Histogram("ws_ping_rtt_seconds", "WebSocket ping → pong RTT (s)",
+                                  ["venue"],
+                                  buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1))
+ws_msg_gap_seconds    = Gauge("ws_msg_gap_seconds", "Seconds since last message per connection",
+                              ["link"])
+ws_reconnects_total   = _counter("ws_reconnects_total", "WebSocket reconnects", ["venue", "reason"])
+ws_duplicates_total   = _counter("ws_duplicates_total",
+                                 "Duplicate ticks dropped (standby / resend)", ["venue"])
+
+# 显著事件得分（src/event_classifier.py），每次决策取一次
+event_score = Histogram("event_significance_score", "EventClassifier peak score per decision",
+                        buckets=(.25, .5, .75, 1, 1.5, 2, 3, 5, 10))
+
+# 行情 → 决策合并级（src/agent/price_consumer.py）
+price_consumer_ticks_total      = _counter("price_consumer_ticks_total",
+                                           "Ticks through the conflation stage", ["result"])
+price_consumer_pending          = Gauge("price_consumer_pending",
+                                        "Symbols with an unconsumed latest price")
+price_consumer_conflation_ratio = Gauge("price_consumer_conflation_ratio",
+                                        "Share of ticks overwritten before reaching the decision loop")
+
+# GPT 异步客户端（src/llm_openai_client.py）
+gpt_inflight        = Gauge("gpt_inflight", "GPT requests holding a concurrency slot", ["model"])
+gpt_coalesced_total = _counter("gpt_coalesced_total",
+                               "GPT decisions served by an identical in-flight request")
+gpt_timeouts_total  = _counter("gpt_timeouts_total", "GPT requests cancelled at deadline", ["model"])
+
+# GPT 决策缓存（src/decision_cache.py）
+decision_cache_total               = _counter("decision_cache_total", "Decision cache lookups",
+                                              ["result"])
+decision_cache_hit_ratio           = Gauge("decision_cache_hit_ratio", "Decision cache hit ratio since start")
+decision_cache_size                = Gauge("decision_cache_size", "Entries in the in-process decision cache")
+decision_cache_invalidations_total = _counter("decision_cache_invalidations_total",
+                                              "Decision cache invalidations (position change)")
+
+# 本地 LLM（src/llm_local_client.py）
+local_llm_requests_total      = _counter("local_llm_requests_total", "Local LLM decisions",
+                                         ["result"])
+local_llm_latency_seconds     = Histogram("local_llm_latency_seconds",
+                                          "Local LLM request → parsed decision (s)",
+                                          buckets=(.01, .025, .05, .075, .1, .15, .2, .3, .5, 1))
+local_llm_first_token_seconds = Histogram("local_llm_first_token_seconds",
+                                          "Local LLM request → first streamed chunk (s)",
+                                          buckets=(.005, .01, .025, .05, .075, .1, .2, .3, .5, 1))
+local_llm_loaded              = Gauge("local_llm_loaded", "Local model loaded and warm (1) / cold (0)",
+                                      ["model"])
+local_llm_cold_start_seconds  = Histogram("local_llm_cold_start_seconds", "Local model load time (s)",
+                                          buckets=(.1, .5, 1, 2, 5, 10, 20, 30, 60, 120))
+local_llm_warm_ping_seconds   = Histogram("local_llm_warm_ping_seconds", "Local model warm-keep ping (s)",
+                                          buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 5))
+
+# 本地 LLM 预取（src/agent/speculative.py）
+local_spec_total       = _counter("local_spec_total", "Speculative local-LLM events", ["result"])
+local_spec_age_seconds = Histogram("local_spec_age_seconds",
+                                   "Age of the speculative opinion used at decision time (s)",
+                                   buckets=(.05, .1, .25, .5, 1, 1.5, 2, 3, 5))
+
+# LLM 路由（src/agent/router.py）
+llm_router_wins_total     = _counter("llm_router_wins_total",
+                                     "Decisions answered first by backend", ["backend"])
+llm_router_timeouts_total = _counter("llm_router_timeouts_total",
+                                     "Backend calls cancelled at the decision deadline", ["backend"])
+llm_router_errors_total   = _counter("llm_router_errors_total",
+                                     "Backend calls failed or returned an invalid answer", ["backend"])
+llm_router_hedges_total   = _counter("llm_router_hedges_total",
+                                     "Hedge requests fired after the primary exceeded its p95")
+llm_backend_latency_p95   = Gauge("llm_backend_latency_p95_seconds", "Rolling p95 latency per backend",
+                                  ["backend"])
+llm_backend_error_rate    = Gauge("llm_backend_error_rate", "Rolling error rate per backend", ["backend"])
+
+# 意图去重（src/intent_cache.py）
+intent_cache_total           = _counter("intent_cache_total", "Intent cache lookups", ["result"])
+intent_cache_latency_seconds = Histogram("intent_cache_latency_seconds", "Redis SET NX EX round trip (s)",
+                                         buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1))
+
+# OKX REST（src/trade/okx_rest.py）
+okx_rest_latency_seconds = Histogram("okx_rest_latency_seconds", "OKX REST round trip (s)", ["endpoint"],
+                                     buckets=(.01, .025, .05, .1, .25, .5, 1, 2.5, 5))
+
+# OKX 私有 ws 下单（src/trade/okx_private_ws.py）
+okx_ws_order_latency_seconds = Histogram("okx_ws_order_latency_seconds", "Private ws request → ack (s)",
+                                         ["op"], buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2))
+okx_order_route_total        = _counter("okx_order_route_total",
+                                        "Order requests by transport / outcome (ws | rest | timeout | lost)",
+                                        ["op", "route"])
+okx_ws_logins_total          = _counter("okx_ws_logins_total", "Private ws login attempts", ["result"])
+
+# 订单状态跟踪（src/trade/order_tracker.py）
+okx_fill_slippage_bps    = Histogram("okx_fill_slippage_bps", "Avg fill price vs signal price, adverse > 0 (bps)",
+                                     buckets=(-20, -10, -5, -2, -1, 0, 1, 2, 5, 10, 20, 50))
+okx_fill_latency_seconds = Histogram("okx_fill_latency_seconds", "Order submit → first fill push (s)",
+                                     buckets=(.01, .025, .05, .1, .25, .5, 1, 2, 5))
+okx_order_states_total   = _counter("okx_order_states_total", "Orders reaching a terminal state", ["state"])
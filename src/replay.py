@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+确定性加速回放 – 用录制的 tick 驱动 ws_main.Pipeline（与实盘同一段决策代码）
+
+  python -m src.replay --day 20250101 [--day 20250102] [--path data/ticks]
+                       [--symbol ETH-USDT-SWAP] [--speed 0] [--runs 2]
+
+• 时钟：ReplayClock，按每笔 tick 的 recv_ts 推进（SignalFilter 节流 / PositionGuard 过期等同步加速）
+• 行情：src.trade.recorder.read_day 零拷贝读回，经与实盘相同的 PriceConsolidator 合成、
+        PriceConsumer 合并后送入决策链
+• 桩对象：PaperBroker（按 tick 价成交）、MomentumLLM（GPT / Gemma 确定性替身）、
+          ListJournal（内存 TradeLog）；IntentCache / DecisionCache 仅用进程内一级，按回放时钟过期
+• speed=0 不限速；speed=60 即 60 倍速
+同一输入多次回放，digest 必须一致。
+"""
+import argparse, asyncio, hashlib, json, logging, os, re, tempfile, time
+from dataclasses import dataclass, field
+from typing import Iterator
+
+import numpy as np
+
+from .trade.tick        import Tick
+from .trade.bars        import bar_mgr
+from .trade.features    import feature_mgr
+from .trade.consolidate import PriceConsolidator
+from .trade.recorder    import read_day, load_symbols
+from .utils             import clock
+
+
+# ───────────────────────────────────────────────────────────────
+# 行情源
+def replay_ticks(path: str, days: list[str], symbol: str) -> Iterator[Tick]:
+    """按 recv_ts 升序产出某合约的 Tick（两交易所混合，与实盘入队顺序一致）"""
+    sid = load_symbols(path).get(symbol)
+    if sid is None:
+        return
+    for day in days:
+        arr = read_day(path, day)
+        arr = arr[arr["symbol"] == sid]
+        if len(arr) > 1 and np.any(np.diff(arr["recv_ts"]) < 0):
+            arr = arr[np.argsort(arr["recv_ts"], kind="stable")]
+        for r in arr.tolist():                  # (exchange_ts, recv_ts, price, qty, symbol, venue, pad)
+            yield Tick(r[5], symbol, r[2], r[3], r[0], r[1])
+
+
+# ───────────────────────────────────────────────────────────────
+# 桩对象
+class PaperBroker:
+    """按调用时传入的价格即时成交；单向持仓"""
+    def __init__(self, symbol: str, spec: dict | None = None, capital: float = 1000.0) -> None:
+        self.symbol = symbol
+        self.capital = capital
+        self.meta   = spec or {"ct_val": 0.01, "min_sz": 1, "lot_sz": 1}
+        self.min_sz = self.meta["min_sz"]
+        self.lot_sz = self.meta["lot_sz"]
+        self.side: str | None = None
+        self.entry = 0.0
+        self.qty   = 0.0
+        self.last_px = 0.0
+        self.realized = 0.0
+        self.orders: list[dict] = []
+
+    @property
+    def spec(self) -> dict:
+        """与 get_instrument_spec 同结构，K 线取自回放中构建的 bar_mgr()"""
+        k = bar_mgr().get(self.symbol)["1m"].last(30)
+        return {**self.meta, "period_sec": 60, "recent_prices": k["close"],
+                "recent_high": k["high"], "recent_low": k["low"],
+                "features": feature_mgr().get(self.symbol).snapshot()}
+
+    @property
+    def balance(self) -> float:
+        return self.capital + self.realized
+
+    def mark(self, price: float) -> None:
+        self.last_px = price
+
+    async def _open(self, side: str, qty, price) -> dict:
+        px  = float(price if price is not None else self.last_px)
+        qty = max(qty or 1, self.min_sz)
+        self.side, self.entry, self.qty = side, px, qty
+        oid = f"paper-{len(self.orders) + 1}"
+        self.orders.append({"ts": clock.now(), "id": oid, "side": side, "qty": qty, "px": px})
+        return {"id": oid, "status": "0"}
+
+    async def open_long(self, qty=None, price=None):
+        return await self._open("BUY", qty, price)
+
+    async def open_short(self, qty=None, price=None):
+        return await self._open("SELL", qty, price)
+
+    async def close_all(self):
+        if self.side:
+            sign = 1 if self.side == "BUY" else -1
+            pnl  = sign * (self.last_px - self.entry) * self.qty * self.meta["ct_val"]
+            self.realized += pnl
+            self.orders.append({"ts": clock.now(), "id": f"paper-{len(self.orders) + 1}",
+                                "side": "CLOSE", "qty": self.qty, "px": self.last_px, "pnl": pnl})
+            self.side, self.qty = None, 0.0
+
+
+class MomentumLLM:
+    """GPT / Gemma 的确定性替身：价格高于上次询问 → BUY，低于 → SELL，否则 HOLD"""
+    _PX = re.compile(r"price ([0-9.]+)")
+
+    def __init__(self) -> None:
+        self._last: dict[str, float] = {}
+        self.calls = {"gpt": 0, "local": 0}
+
+    def _side(self, kind: str, price: float) -> str:
+        prev = self._last.get(kind)
+        self._last[kind] = price
+        if prev is None or price == prev:
+            return "HOLD"
+        return "BUY" if price > prev else "SELL"
+
+    async def gpt(self, price: float, pos, spec: dict, *, key: dict | None = None):
+        self.calls["gpt"] += 1
+        side = self._side("gpt", price)
+        return side, "replay gpt", {"side": side, "qty": 1}
+
+    async def local(self, prompt: str, temperature=0.2, *, strict: bool = False):
+        self.calls["local"] += 1
+        m = self._PX.search(prompt)
+        return self._side("local", float(m.group(1)) if m else 0.0), 0.0
+
+
+class ListJournal:
+    def __init__(self) -> None:
+        self.records: list[dict] = []
+
+    def insert(self, record: dict) -> None:
+        self.records.append(record)
+
+    def mark_trail_hit(self) -> None:
+        if self.records:
+            self.records[-1]["trail_sl_hit"] = "true"
+
+
+# ───────────────────────────────────────────────────────────────
+@dataclass
+class ReplayResult:
+    ticks: int = 0
+    steps: int = 0                  # 合成、合并后真正进入决策链的 tick 数
+    wall_sec: float = 0.0
+    sim_sec: float = 0.0
+    orders: list = field(default_factory=list)
+    journal: list = field(default_factory=list)
+    llm_calls: dict = field(default_factory=dict)
+    realized: float = 0.0
+
+    @property
+    def digest(self) -> str:
+        blob = json.dumps({"orders": self.orders, "journal": self.journal},
+                          sort_keys=True, default=str)
+        return hashlib.sha256(blob.encode()).hexdigest()[:16]
+
+
+async def replay(ticks: Iterator[Tick], symbol: str, *, speed: float = 0.0,
+                 llm: MomentumLLM | None = None) -> ReplayResult:
+    import ws_main
+    from .agent.position_guard import PositionGuard
+    from .agent.price_consumer import PriceConsumer
+    from .agent.signal_filter  import SignalFilter
+    from .decision_cache       import DecisionCache
+    from .event_classifier     import EventClassifier
+    from .intent_cache         import IntentCache, TTL_SEC
+    from .risk.trailing        import trailing_mgr
+
+    cfg = ws_main.cfg
+    rc  = clock.ReplayClock()
+    prev_clock = clock.set_clock(rc)
+
+    # 复位全局单例，保证每次回放从同一初始状态开始
+    trailing_mgr().cancel()
+    bar_mgr().reset()
+    feature_mgr().configure(**cfg.get("features", {}))
+    pg = PositionGuard()
+    pg.file  = os.path.join(tempfile.gettempdir(), f"replay_position_{os.getpid()}.json")
+    pg.state = {"direction": None, "ts": 0.0}
+
+    llm     = llm or MomentumLLM()
+    broker  = PaperBroker(symbol)
+    journal = ListJournal()
+    pipe = ws_main.Pipeline(
+        broker, gpt=llm.gpt, local=llm.local,
+        intent=IntentCache(ttl=cfg.get("intent", {}).get("ttl", TTL_SEC), redis_url="").hit_or_set,
+        journal=journal,
+        filt=SignalFilter(**cfg["signal"]),
+        events=EventClassifier(**cfg["event_cls"]),
+        decisions=DecisionCache(**{**cfg.get("decision_cache", {}), "redis_url": ""}),
+    )
+
+    consol   = PriceConsolidator(ct_val={symbol: broker.meta["ct_val"]}, **cfg.get("consolidate", {}))
+    consumer = PriceConsumer(pipe.step, **cfg.get("price_consumer", {}))
+
+    res = ReplayResult()
+    t_wall0, t_sim0 = time.perf_counter(), None
+    try:
+        for t in ticks:
+            if t_sim0 is None:
+                t_sim0 = t.recv_ts
+            rc.advance(t.recv_ts)
+            if speed > 0:
+                lag = (t.recv_ts - t_sim0) / speed - (time.perf_counter() - t_wall0)
+                if lag > 0:
+                    await asyncio.sleep(lag)
+            res.ticks += 1
+            fused = consol.update(t)
+            if fused is None:
+                continue
+            broker.mark(fused.price)
+            bar_mgr().on_tick(fused)
+            feature_mgr().on_tick(fused)
+            pipe.events.observe(fused, consol.trades)
+            pipe.speculate(fused)
+            await asyncio.sleep(0)              # 让后台预取任务推进，与实盘事件循环的交错一致
+            consumer.offer(fused)
+            for tick in consumer.poll():        # 与实盘同一合并规则，按回放时钟到期
+                await pipe.step(tick)
+                res.steps += 1
+    finally:
+        clock.set_clock(prev_clock)
+        try:
+            os.remove(pg.file)
+        except OSError:
+            pass
+
+    res.wall_sec  = time.perf_counter() - t_wall0
+    res.sim_sec   = rc.now() - (t_sim0 or rc.now())
+    res.orders    = broker.orders
+    res.journal   = journal.records
+    res.llm_calls = dict(llm.calls)
+    res.realized  = broker.realized
+    return res
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="replay recorded ticks through ws_main.Pipeline")
+    ap.add_argument("--path", default="data/ticks")
+    ap.add_argument("--day", action="append", required=True, help="YYYYMMDD，可重复")
+    ap.add_argument("--symbol", default=None)
+    ap.add_argument("--speed", type=float, default=0.0, help="0 = 不限速")
+    ap.add_argument("--runs", type=int, default=1, help=">1 时校验多次结果一致")
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)s] %(message)s")
+    from .utils.config_loader import load as load_cfg
+    symbol = args.symbol or load_cfg()["trade"]["symbol"]
+
+    digests = []
+    for i in range(args.runs):
+        res = asyncio.run(replay(replay_ticks(args.path, args.day, symbol), symbol, speed=args.speed))
+        digests.append(res.digest)
+        x = res.sim_sec / res.wall_sec if res.wall_sec else 0
+        print(f"run {i + 1}: ticks={res.ticks} steps={res.steps} sim={res.sim_sec:.0f}s wall={res.wall_sec:.1f}s "
+              f"(x{x:.0f}) orders={len(res.orders)} pnl={res.realized:.4f} "
+              f"llm={res.llm_calls} digest={res.digest}")
+    if len(set(digests)) > 1:
+        raise SystemExit("❌ replay is not deterministic: " + ", ".join(digests))
+
+
+if __name__ == "__main__":
+    main()
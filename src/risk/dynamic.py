@@ -1,8 +1,10 @@
 """
-动态风控工具 – Trailing Stop-Loss（A-lite）
+动态风控工具 – Trailing Stop-Loss（A-lite）+ ATR / 波动率 / 杠杆
 """
 from typing import Literal
 
+import numpy as np
+
 Signal = Literal["BUY", "SELL"]
 
 def build_trailing_sl_params(
@@ -23,3 +25,61 @@ def build_trailing_sl_params(
         "tpTriggerPx" : "",
         "slTriggerPx" : "",
     }
+
+
+# ----------------------------------------------------------------------
+# 数组版指标（回测 / 离线脚本 / llm_agent 用）
+#   实盘决策读 src/trade/features.py 的增量快照，两者公式一致
+# ----------------------------------------------------------------------
+def compute_volatility(closes, period_sec: int = 60, n: int = 30) -> float:
+    """最近 n 个 bar 对数收益的样本标准差（每 bar 口径）；period_sec 仅用于标注周期"""
+    c = np.asarray(closes, dtype=float)
+    c = c[c > 0][-(n + 1):]
+    if len(c) < 3:
+        return 0.0
+    return float(np.std(np.diff(np.log(c)), ddof=1))
+
+
+def compute_atr(high, low, close, n: int = 14) -> float:
+    """Wilder ATR：前 n 根 TR 取均值，之后 (ATR·(n-1) + TR) / n"""
+    h, l, c = (np.asarray(x, dtype=float) for x in (high, low, close))
+    if not len(c):
+        return 0.0
+    tr = h - l
+    if len(c) > 1:
+        pc = c[:-1]
+        tr[1:] = np.maximum.reduce([h[1:] - l[1:], np.abs(h[1:] - pc), np.abs(l[1:] - pc)])
+    atr = float(tr[:n].mean())
+    for x in tr[n:].tolist():
+        atr = (atr * (n - 1) + x) / n
+    return atr
+
+
+def calc_initial_sl(price: float, atr: float, side: Signal, k: float = 1.5) -> float:
+    """初始止损：开仓价 ∓ k·ATR"""
+    return price - k * atr if side == "BUY" else price + k * atr
+
+
+def calc_leverage(sigma: float, kappa: float = 1.5, l_max: float = 100) -> float:
+    """波动越大杠杆越低：kappa / sigma，限制在 [1, l_max]"""
+    return float(max(1.0, min(kappa / sigma if sigma else 1.0, l_max)))
+
+
+def calc_trailing_sl(entry_price: float, price: float, atr: float, size: float = 0.0,
+                     *, side: Signal = "BUY", k: float = 2.0) -> tuple[float | None, float]:
+    """
+    ATR 追踪止损：价格 ∓ k·ATR，只在已越过开仓价（保本以上）时给出
+    返回 (新止损价 | None, 锁定盈亏 = (止损 - 开仓) × size，按方向取号)
+    """
+    if atr <= 0:
+        return None, 0.0
+    sl = price - k * atr if side == "BUY" else price + k * atr
+    locked = (sl - entry_price) if side == "BUY" else (entry_price - sl)
+    if locked <= 0:
+        return None, 0.0
+    return sl, locked * size
+
+
+def trail_pct_from_atr(price: float, atr: float, k: float) -> float:
+    """k·ATR 折算成本地 TrailingStop 的回撤百分比"""
+    return k * atr / price if price > 0 and atr > 0 else 0.0
@@ -7,6 +7,8 @@
 import math
 from typing import Literal, Tuple
 
+from .dynamic import calc_initial_sl
+
 # ----------------------------------------------------------------------
 # 1. 仓位计算 — 风险单位法
 # ----------------------------------------------------------------------
@@ -39,6 +41,25 @@ def calc_size(
     # 最终张数，若不够最小张数则为 0
     return contracts if contracts >= min_sz else 0
 
+def calc_size_atr(
+    capital: float,
+    risk_pct: float,
+    entry_price: float,
+    side: Literal["BUY", "SELL"],
+    atr: float,
+    *,
+    ct_val: float,
+    min_sz: float,
+    lot_sz: float,
+    k_atr: float = 1.5,
+) -> float:
+    """止损 = 开仓价 ∓ k_atr·ATR（ATR 取自 src/trade/features.py 快照），再按风险单位算张数"""
+    if atr <= 0:
+        return 0
+    return calc_size(capital, risk_pct, entry_price,
+                     calc_initial_sl(entry_price, atr, side, k_atr),
+                     ct_val=ct_val, min_sz=min_sz, lot_sz=lot_sz)
+
 # ----------------------------------------------------------------------
 # 2. 固定百分比 SL / TP（如需动态请用 risk.dynamic）
 # ----------------------------------------------------------------------
@@ -0,0 +1,136 @@
+"""
+流式 OHLCV K 线（多周期）
+
+• BarSeries   单周期；当前未收盘的 bar 用 Python 标量维护，收盘时写入预分配 NumPy 环形缓冲
+                缺失的周期用上一收盘价补平（volume = 0），保证时间轴等距
+• BarBuilder  单合约多周期（默认 1s / 1m / 5m / 1h），on_tick 一次更新全部周期
+• Bars        多合约管理 + 启动时一次性 REST 回填（src/trade/market.py 调用）
+
+bar 按 exchange_ts 对齐到 UTC 整周期（与 OKX candles 一致）；晚于当前 bar 的旧 tick 丢弃。
+"""
+import numpy as np
+
+from .tick import Tick
+
+TIMEFRAMES: dict[str, int] = {"1s": 1, "1m": 60, "5m": 300, "1h": 3600}
+CAPACITY:   dict[str, int] = {"1s": 3600, "1m": 1440, "5m": 864, "1h": 720}
+OKX_BAR:    dict[str, str] = {"1s": "1s", "1m": "1m", "5m": "5m", "1h": "1H"}
+
+BAR_DTYPE = np.dtype([
+    ("ts",     "f8"),                   # bar 开始时间（秒）
+    ("open",   "f8"),
+    ("high",   "f8"),
+    ("low",    "f8"),
+    ("close",  "f8"),
+    ("volume", "f8"),
+    ("trades", "u4"),
+])
+
+
+class BarSeries:
+    def __init__(self, sec: int, capacity: int) -> None:
+        self.sec = sec
+        self.cap = capacity
+        self.buf = np.zeros(capacity, dtype=BAR_DTYPE)
+        self.n   = 0                        # 累计收盘 bar 数
+        self.t   = -1.0                     # 当前 bar 开始时间；-1 = 尚无数据
+        self.o = self.h = self.l = self.c = self.v = 0.0
+        self.k = 0
+
+    def __len__(self) -> int:
+        return min(self.n, self.cap) + (self.t >= 0)
+
+    def update(self, price: float, qty: float, ts: float) -> None:
+        t = ts - ts % self.sec
+        if t != self.t:
+            if t < self.t:
+                return                      # 迟到 tick
+            if self.t >= 0:
+                self._close(t)
+            self.t = t
+            self.o = self.h = self.l = self.c = price
+            self.v, self.k = qty, 1
+            return
+        if price > self.h:
+            self.h = price
+        elif price < self.l:
+            self.l = price
+        self.c = price
+        self.v += qty
+        self.k += 1
+
+    def _close(self, next_t: float) -> None:
+        self.buf[self.n % self.cap] = (self.t, self.o, self.h, self.l, self.c, self.v, self.k)
+        self.n += 1
+        gap = min(int(round((next_t - self.t) / self.sec)) - 1, self.cap)
+        if gap > 0:                         # 无成交周期：平盘补齐（超过容量只补最近 cap 根）
+            ts  = next_t - self.sec * np.arange(gap, 0, -1)
+            idx = np.arange(self.n, self.n + gap) % self.cap
+            self.buf[idx] = [(x, self.c, self.c, self.c, self.c, 0.0, 0) for x in ts.tolist()]
+            self.n += gap
+
+    def seed(self, rows: np.ndarray) -> None:
+        """REST 回填（BAR_DTYPE，时间升序）；最后一根视为未收盘。仅在尚无数据时生效"""
+        if self.t >= 0 or not len(rows):
+            return
+        closed = rows[:-1][-self.cap:]
+        self.buf[:len(closed)] = closed
+        self.n = len(closed)
+        last = rows[-1]
+        self.t = float(last["ts"])
+        self.o, self.h, self.l, self.c = (float(last[f]) for f in ("open", "high", "low", "close"))
+        self.v, self.k = float(last["volume"]), int(last["trades"])
+
+    def last(self, k: int | None = None, *, partial: bool = True) -> np.ndarray:
+        """最近 k 根（时间升序，拷贝）；partial=True 时包含当前未收盘 bar"""
+        cur  = partial and self.t >= 0
+        size = min(self.n, self.cap) + cur
+        k = size if k is None else min(k, size)
+        n_closed = k - cur
+        out = np.empty(k, dtype=BAR_DTYPE)
+        if n_closed > 0:
+            out[:n_closed] = self.buf[np.arange(self.n - n_closed, self.n) % self.cap]
+        if cur and k:
+            out[-1] = (self.t, self.o, self.h, self.l, self.c, self.v, self.k)
+        return out
+
+
+class BarBuilder:
+    def __init__(self, symbol: str, timeframes: tuple[str, ...] = tuple(TIMEFRAMES),
+                 capacity: dict[str, int] | None = None) -> None:
+        cap = {**CAPACITY, **(capacity or {})}
+        self.symbol = symbol
+        self.series = {tf: BarSeries(TIMEFRAMES[tf], cap[tf]) for tf in timeframes}
+        self._all   = list(self.series.values())
+        self.backfilled = False
+
+    def on_tick(self, t: Tick) -> None:
+        for s in self._all:
+            s.update(t.price, t.qty, t.exchange_ts)
+
+    def __getitem__(self, tf: str) -> BarSeries:
+        return self.series[tf]
+
+
+# ───────────────────────────────────────────────────────────────
+class Bars:
+    def __init__(self) -> None:
+        self._b: dict[str, BarBuilder] = {}
+
+    def get(self, symbol: str) -> BarBuilder:
+        b = self._b.get(symbol)
+        if b is None:
+            b = self._b[symbol] = BarBuilder(symbol)
+        return b
+
+    def on_tick(self, t: Tick) -> None:
+        self.get(t.symbol).on_tick(t)
+
+    def reset(self) -> None:
+        self._b.clear()
+
+
+# ——— 全局单例 ———
+_bars = Bars()
+def bar_mgr() -> Bars:
+    return _bars
@@ -0,0 +1,283 @@
+"""
+增量 L2 订单簿
+
+• OrderBook   单合约单交易所；bids/asks 各一组预分配 NumPy 数组（按价优排序）
+                best_bid / best_ask / mid / spread  O(1)
+                depth_bps / impact_price           searchsorted + 缓存 cumsum
+• Books       多合约簿管理：
+                OKX   books / books5 / bbo-tbt，seqId 连续性 + CRC32 校验，失败由订阅方重订阅拿快照
+                Binance depth 增量，REST 快照 + lastUpdateId 对齐，断档自动重拉快照
+
+数组约定：side 0 = bids（key = -px），side 1 = asks（key = px），两侧 key 都升序，
+index 0 永远是最优价。
+"""
+import asyncio, logging, math, time, zlib
+import numpy as np
+import requests
+
+from .codec import BookUpdate
+from .tick  import VENUE_BINANCE, VENUE_OKX
+from ..utils import clock
+
+BID, ASK = 0, 1
+
+_BINANCE_DEPTH_REST = "https://api.binance.com/api/v3/depth"
+_OKX_CHECKSUM_LEVELS = 25
+
+
+class OrderBook:
+    def __init__(self, symbol: str, venue: int, depth: int = 400) -> None:
+        self.symbol = symbol
+        self.venue  = venue
+        self.depth  = depth
+        self.keys   = np.full((2, depth), np.inf)
+        self.size   = np.zeros((2, depth))
+        self.n      = [0, 0]
+        self.seq    = -1
+        self.ts     = 0.0                       # 交易所时间
+        self.recv_ts = 0.0
+        self._raw: tuple[dict, dict] = ({}, {})  # key → (px_str, sz_str)，OKX 校验和用
+        self._cum: list[np.ndarray | None] = [None, None]
+
+    # ────────────────────────── 写 ──────────────────────────
+    def clear(self) -> None:
+        self.keys.fill(np.inf)
+        self.size.fill(0.0)
+        self.n = [0, 0]
+        self.seq = -1
+        self._raw[BID].clear(); self._raw[ASK].clear()
+        self._cum = [None, None]
+
+    def snapshot(self, bids: list, asks: list, seq: int = -1, ts: float = 0.0) -> None:
+        self.clear()
+        self.update(bids, asks, seq, ts)
+
+    def update(self, bids: list, asks: list, seq: int = -1, ts: float = 0.0) -> None:
+        for lvl in bids:
+            self._apply(BID, lvl[0], lvl[1])
+        for lvl in asks:
+            self._apply(ASK, lvl[0], lvl[1])
+        self.seq, self.ts, self.recv_ts = seq, ts, clock.now()
+        self._cum = [None, None]
+
+    def _apply(self, side: int, px_s: str, sz_s: str) -> None:
+        px, sz = float(px_s), float(sz_s)
+        key = -px if side == BID else px
+        k, s, n = self.keys[side], self.size[side], self.n[side]
+        raw = self._raw[side]
+        i = int(np.searchsorted(k[:n], key))
+        if i < n and k[i] == key:
+            if sz == 0.0:                       # 删档
+                k[i:n - 1] = k[i + 1:n]; s[i:n - 1] = s[i + 1:n]
+                k[n - 1], s[n - 1] = np.inf, 0.0
+                self.n[side] = n - 1
+                raw.pop(key, None)
+            else:
+                s[i] = sz
+                raw[key] = (px_s, sz_s)
+            return
+        if sz == 0.0 or i >= self.depth:
+            return
+        if n == self.depth:                     # 满：挤掉最差一档
+            raw.pop(k[n - 1], None)
+            n -= 1
+        k[i + 1:n + 1] = k[i:n]; s[i + 1:n + 1] = s[i:n]
+        k[i], s[i] = key, sz
+        self.n[side] = n + 1
+        raw[key] = (px_s, sz_s)
+
+    # ────────────────────────── 读 ──────────────────────────
+    @property
+    def best_bid(self) -> float:
+        return -self.keys[BID, 0] if self.n[BID] else math.nan
+
+    @property
+    def best_ask(self) -> float:
+        return self.keys[ASK, 0] if self.n[ASK] else math.nan
+
+    @property
+    def mid(self) -> float:
+        return (self.best_bid + self.best_ask) / 2
+
+    @property
+    def spread(self) -> float:
+        return self.best_ask - self.best_bid
+
+    @property
+    def spread_bps(self) -> float:
+        return self.spread / self.mid * 1e4
+
+    def levels(self, side: int, k: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """(px, sz) 前 k 档"""
+        n = self.n[side] if k is None else min(k, self.n[side])
+        px = self.keys[side, :n]
+        return (-px if side == BID else px.copy()), self.size[side, :n].copy()
+
+    def _cumsum(self, side: int) -> np.ndarray:
+        c = self._cum[side]
+        if c is None:
+            c = self._cum[side] = np.cumsum(self.size[side, :self.n[side]])
+        return c
+
+    def depth_bps(self, bps: float, side: int) -> float:
+        """距 mid bps 基点以内该侧挂单总量"""
+        mid = self.mid
+        if math.isnan(mid):
+            return 0.0
+        band = mid * bps / 1e4
+        limit = -(mid - band) if side == BID else mid + band
+        i = int(np.searchsorted(self.keys[side, :self.n[side]], limit, side="right"))
+        return float(self._cumsum(side)[i - 1]) if i else 0.0
+
+    def impact_price(self, qty: float, side: int) -> float:
+        """市价吃 qty 的成交均价；side=ASK 表示买入吃卖盘。深度不足返回 nan"""
+        cum = self._cumsum(side)
+        n = len(cum)
+        if n == 0 or cum[-1] < qty:
+            return math.nan
+        i = int(np.searchsorted(cum, qty))
+        px = np.abs(self.keys[side, :i + 1])
+        sz = self.size[side, :i + 1].copy()
+        sz[i] -= cum[i] - qty
+        return float((px * sz).sum() / qty)
+
+    def slippage_bps(self, qty: float, side: int) -> float:
+        """相对 mid 的预估滑点（bps，正数为不利）"""
+        px = self.impact_price(qty, side)
+        return abs(px - self.mid) / self.mid * 1e4
+
+    def checksum(self) -> int:
+        """OKX CRC32：bid/ask 交替取前 25 档原始字符串，'px:sz' 以 ':' 拼接，结果取有符号 32 位"""
+        parts: list[str] = []
+        nb, na = self.n[BID], self.n[ASK]
+        for i in range(_OKX_CHECKSUM_LEVELS):
+            if i < nb:
+                parts.extend(self._raw[BID][self.keys[BID, i]])
+            if i < na:
+                parts.extend(self._raw[ASK][self.keys[ASK, i]])
+        crc = zlib.crc32(":".join(parts).encode())
+        return crc - (1 << 32) if crc >= (1 << 31) else crc
+
+
+# ───────────────────────────────────────────────────────────────
+class Books:
+    """多合约订单簿；on_update 返回 False 表示本簿已失效、需重新订阅拿快照（OKX）"""
+    def __init__(self, *, depth: int = 400, binance_rest: str = _BINANCE_DEPTH_REST,
+                 logger: logging.Logger | None = None) -> None:
+        self.depth = depth
+        self.binance_rest = binance_rest
+        self.log = logger or logging.getLogger("Books")
+        self._books: dict[tuple[int, str], OrderBook] = {}
+        self._bn_pending: dict[str, list[BookUpdate]] = {}  # 等待快照期间缓存的增量
+        self._okx_resync: set[str] = set()                  # 已请求重订阅、等快照
+
+    def get(self, symbol: str, venue: int = VENUE_OKX) -> OrderBook | None:
+        return self._books.get((venue, symbol))
+
+    def mid(self, symbol: str, venue: int = VENUE_OKX, max_age: float = 2.0) -> float | None:
+        """簿新鲜且两侧都有 → mid，否则 None（调用方回退到成交价）"""
+        b = self._books.get((venue, symbol))
+        if b is None or not (b.n[BID] and b.n[ASK]) or clock.now() - b.recv_ts > max_age:
+            return None
+        return b.mid
+
+    def spread_bps(self, symbol: str, venue: int = VENUE_OKX, max_age: float = 2.0) -> float:
+        """簿新鲜 → 价差 bps，否则 nan"""
+        b = self._books.get((venue, symbol))
+        if b is None or not (b.n[BID] and b.n[ASK]) or clock.now() - b.recv_ts > max_age:
+            return math.nan
+        return b.spread_bps
+
+    def _book(self, venue: int, symbol: str) -> OrderBook:
+        b = self._books.get((venue, symbol))
+        if b is None:
+            b = self._books[(venue, symbol)] = OrderBook(symbol, venue, self.depth)
+        return b
+
+    def on_update(self, u: BookUpdate) -> bool:
+        if u.venue == VENUE_OKX:
+            return self._on_okx(u)
+        self._on_binance(u)
+        return True
+
+    # ---------- OKX ----------
+    def _on_okx(self, u: BookUpdate) -> bool:
+        b = self._book(VENUE_OKX, u.symbol)
+        if self._okx_stale(b, u):
+            return True                         # 主备连接的重复推送 / 重连后的旧快照
+        if u.action == "snapshot":
+            self._okx_resync.discard(u.symbol)
+            b.snapshot(u.bids, u.asks, u.seq, u.ts)
+        elif u.symbol in self._okx_resync:
+            return True                         # 等快照期间的增量直接丢弃
+        elif b.seq < 0 or (u.prev_seq >= 0 and u.prev_seq != b.seq):
+            self.log.warning("[OKX] %s seq gap %s→%s, resync", u.symbol, b.seq, u.prev_seq)
+            return self._okx_invalidate(b)
+        else:
+            b.update(u.bids, u.asks, u.seq, u.ts)
+        if u.checksum is not None and b.checksum() != u.checksum:
+            self.log.warning("[OKX] %s checksum mismatch, resync", u.symbol)
+            return self._okx_invalidate(b)
+        return True
+
+    def _okx_stale(self, b: OrderBook, u: BookUpdate) -> bool:
+        """seq 与交易所时间都不比当前簿新；prev_seq 恰好衔接的（seqId 重置）不算"""
+        if b.seq < 0 or u.seq < 0 or u.symbol in self._okx_resync:
+            return False
+        return u.seq <= b.seq and u.ts <= b.ts and u.prev_seq != b.seq
+
+    def _okx_invalidate(self, b: OrderBook) -> bool:
+        b.clear()
+        self._okx_resync.add(b.symbol)
+        return False
+
+    # ---------- Binance ----------
+    @staticmethod
+    def _bn_links(b: OrderBook, u: BookUpdate) -> bool:
+        """现货 U <= seq+1 <= u；合约 pu == 上一条 u"""
+        return u.prev_seq == b.seq or u.first_seq <= b.seq + 1 <= u.seq
+
+    def _on_binance(self, u: BookUpdate) -> None:
+        pend = self._bn_pending.get(u.symbol)
+        if pend is not None:                    # 快照拉取中
+            pend.append(u)
+            return
+        b = self._book(VENUE_BINANCE, u.symbol)
+        if b.seq >= 0 and u.seq <= b.seq:
+            return                              # 旧消息
+        if b.seq < 0 or not self._bn_links(b, u):
+            if b.seq >= 0:
+                self.log.warning("[Binance] %s depth gap %s→%s, resync", u.symbol, b.seq, u.first_seq)
+            b.clear()
+            self._bn_pending[u.symbol] = [u]
+            asyncio.get_running_loop().create_task(self._binance_resync(u.symbol))
+            return
+        b.update(u.bids, u.asks, u.seq, u.ts)
+
+    async def _binance_resync(self, symbol: str) -> None:
+        from .subscriptions import binance_symbol
+        try:
+            snap = await asyncio.to_thread(
+                lambda: requests.get(self.binance_rest, timeout=4,
+                                     params={"symbol": binance_symbol(symbol),
+                                             "limit": min(self.depth, 1000)}).json())
+            last_id = int(snap["lastUpdateId"])
+        except Exception as e:
+            self.log.warning("[Binance] %s depth snapshot failed: %s", symbol, e)
+            self._bn_pending.pop(symbol, None)  # 下一条增量会再次触发
+            return
+        b = self._book(VENUE_BINANCE, symbol)
+        b.snapshot(snap.get("bids", []), snap.get("asks", []), last_id, time.time())
+        for u in self._bn_pending.pop(symbol, []):
+            if u.seq <= b.seq:
+                continue
+            if not self._bn_links(b, u):
+                b.clear()                       # 快照与增量未衔接，下一条增量重拉
+                return
+            b.update(u.bids, u.asks, u.seq, u.ts)
+
+
+# ——— 全局单例 ———
+_books = Books()
+def book_mgr() -> Books:
+    return _books
@@ -0,0 +1,275 @@
+"""
+行情 JSON 解码（ws 热路径）
+
+后端按可用性自动选择：msgspec > orjson > json（标准库兜底）
+环境变量 WS_JSON_BACKEND=json|orjson|msgspec 可强制指定。
+
+统一出口：
+  decode_okx(raw)     → (channel, payload)
+  decode_binance(raw) → (event,   payload)
+    tickers / trades / aggTrade     → list[Tick]
+    books* / bbo-tbt / depthUpdate  → list[BookUpdate]
+    其它数据频道                     → list[dict]
+    控制帧（event/op/ping/订阅回执）  → ("", dict)
+"""
+import json, os, time
+from typing import Any
+
+from .tick import Tick, VENUE_BINANCE, VENUE_OKX
+
+
+class BookUpdate:
+    """深度增量/快照（价格、数量保持交易所原始字符串，OKX 校验和需要）"""
+    __slots__ = ("venue", "symbol", "channel", "action", "bids", "asks", "ts",
+                 "checksum", "seq", "prev_seq", "first_seq", "recv_ts")
+
+    def __init__(self, venue: int, symbol: str, action: str,
+                 bids: list, asks: list, ts: float, *, channel: str = "",
+                 checksum: int | None = None, seq: int = -1,
+                 prev_seq: int = -1, first_seq: int = -1) -> None:
+        self.venue     = venue
+        self.symbol    = symbol
+        self.channel   = channel
+        self.action    = action          # snapshot | update
+        self.bids      = bids            # [[px, sz, ...], ...]
+        self.asks      = asks
+        self.ts        = ts
+        self.checksum  = checksum
+        self.seq       = seq
+        self.prev_seq  = prev_seq
+        self.first_seq = first_seq       # Binance U
+        self.recv_ts   = time.time()
+
+
+_OKX_BOOK_CH = ("books", "books5", "bbo-tbt", "books-l2-tbt", "books50-l2-tbt")
+
+
+# ───────────────────────── 字典后端 ─────────────────────────
+class JsonCodec:
+    name = "json"
+
+    def loads(self, raw: str | bytes) -> Any:
+        return json.loads(raw)
+
+    def dumps(self, obj: Any) -> str:
+        return json.dumps(obj, separators=(",", ":"))
+
+    def decode_okx(self, raw: str | bytes) -> tuple[str, Any]:
+        if raw == "pong" or raw == b"pong":
+            return "", {"op": "pong"}
+        msg  = self.loads(raw)
+        arg  = msg.get("arg")
+        data = msg.get("data")
+        if arg is None or data is None:
+            return "", msg
+        ch   = arg.get("channel", "")
+        inst = arg.get("instId", "")
+        if ch == "tickers":
+            now = time.time()
+            return ch, [Tick(VENUE_OKX, d.get("instId", inst), float(d["last"]),
+                             float(d.get("lastSz") or 0), int(d["ts"]) / 1000, now)
+                        for d in data]
+        if ch == "trades":
+            now = time.time()
+            return ch, [Tick(VENUE_OKX, d.get("instId", inst), float(d["px"]),
+                             float(d["sz"]), int(d["ts"]) / 1000, now, int(d.get("tradeId") or -1))
+                        for d in data]
+        if ch in _OKX_BOOK_CH:
+            action = msg.get("action", "snapshot")
+            return ch, [BookUpdate(VENUE_OKX, inst, action, d.get("bids", []), d.get("asks", []),
+                                   int(d["ts"]) / 1000, channel=ch, checksum=d.get("checksum"),
+                                   seq=int(d.get("seqId", -1)), prev_seq=int(d.get("prevSeqId", -1)))
+                        for d in data]
+        return ch, data
+
+    def decode_binance(self, raw: str | bytes) -> tuple[str, Any]:
+        msg = self.loads(raw)
+        d   = msg.get("data", msg) if "stream" in msg else msg
+        ev  = d.get("e", "") if isinstance(d, dict) else ""
+        if ev == "aggTrade":
+            return ev, [Tick(VENUE_BINANCE, d["s"], float(d["p"]), float(d["q"]),
+                             int(d["T"]) / 1000, time.time(), int(d.get("a", -1)))]
+        if ev == "depthUpdate":
+            return ev, [BookUpdate(VENUE_BINANCE, d["s"], "update", d.get("b", []), d.get("a", []),
+                                   int(d.get("T") or d["E"]) / 1000, channel="depth", seq=int(d["u"]),
+                                   prev_seq=int(d.get("pu", d["U"] - 1)), first_seq=int(d["U"]))]
+        if not ev:
+            return "", msg
+        return ev, [d]
+
+
+class OrjsonCodec(JsonCodec):
+    name = "orjson"
+
+    def __init__(self) -> None:
+        import orjson
+        self._orjson = orjson
+
+    def loads(self, raw: str | bytes) -> Any:
+        return self._orjson.loads(raw)
+
+    def dumps(self, obj: Any) -> str:
+        return self._orjson.dumps(obj).decode()
+
+
+# ───────────────────────── msgspec 强类型 ─────────────────────────
+def _msgspec_codec():
+    import msgspec
+    from msgspec import Struct, Raw
+
+    class OkxArg(Struct):
+        channel: str
+        instId:  str = ""
+
+    class OkxFrame(Struct):
+        arg:    OkxArg | None = None
+        action: str = "snapshot"
+        data:   Raw = Raw()
+
+    class OkxTickerRow(Struct):
+        last:   str
+        ts:     str
+        lastSz: str = "0"
+        instId: str = ""
+
+    class OkxTradeRow(Struct):
+        px:      str
+        sz:      str
+        ts:      str
+        instId:  str = ""
+        tradeId: str = ""
+        side:    str = ""
+
+    class OkxBookRow(Struct):
+        ts:        str
+        asks:      list[list[str]] = []
+        bids:      list[list[str]] = []
+        checksum:  int | None = None
+        seqId:     int = -1
+        prevSeqId: int = -1
+
+    class BnAggTrade(Struct, tag_field="e", tag="aggTrade"):
+        s: str
+        p: str
+        q: str
+        T: int
+        a: int = -1
+
+    class BnDepthUpdate(Struct, tag_field="e", tag="depthUpdate"):
+        s:  str
+        E:  int
+        U:  int
+        u:  int
+        b:  list[list[str]] = []
+        a:  list[list[str]] = []
+        T:  int = 0
+        pu: int | None = None
+
+    class BnFrame(Struct):
+        stream: str = ""
+        data:   Raw = Raw()
+
+    class MsgspecCodec(JsonCodec):
+        name = "msgspec"
+
+        def __init__(self) -> None:
+            self._enc     = msgspec.json.Encoder()
+            self._any     = msgspec.json.Decoder()
+            self._okx     = msgspec.json.Decoder(OkxFrame)
+            self._tickers = msgspec.json.Decoder(list[OkxTickerRow])
+            self._trades  = msgspec.json.Decoder(list[OkxTradeRow])
+            self._books   = msgspec.json.Decoder(list[OkxBookRow])
+            self._bn      = msgspec.json.Decoder(BnFrame)
+            self._bn_ev   = msgspec.json.Decoder(BnAggTrade | BnDepthUpdate)
+
+        def loads(self, raw: str | bytes) -> Any:
+            return self._any.decode(raw)
+
+        def dumps(self, obj: Any) -> str:
+            return self._enc.encode(obj).decode()
+
+        def decode_okx(self, raw: str | bytes) -> tuple[str, Any]:
+            if raw == "pong" or raw == b"pong":
+                return "", {"op": "pong"}
+            f = self._okx.decode(raw)
+            if f.arg is None or not f.data:
+                return "", self._any.decode(raw)
+            ch, inst = f.arg.channel, f.arg.instId
+            if ch == "tickers":
+                now = time.time()
+                return ch, [Tick(VENUE_OKX, d.instId or inst, float(d.last), float(d.lastSz or 0),
+                                 int(d.ts) / 1000, now) for d in self._tickers.decode(f.data)]
+            if ch == "trades":
+                now = time.time()
+                return ch, [Tick(VENUE_OKX, d.instId or inst, float(d.px), float(d.sz),
+                                 int(d.ts) / 1000, now, int(d.tradeId or -1))
+                            for d in self._trades.decode(f.data)]
+            if ch in _OKX_BOOK_CH:
+                return ch, [BookUpdate(VENUE_OKX, inst, f.action, d.bids, d.asks, int(d.ts) / 1000,
+                                       channel=ch, checksum=d.checksum,
+                                       seq=d.seqId, prev_seq=d.prevSeqId)
+                            for d in self._books.decode(f.data)]
+            return ch, self._any.decode(f.data)
+
+        def decode_binance(self, raw: str | bytes) -> tuple[str, Any]:
+            body = raw
+            if raw[:10] in ('{"stream":', b'{"stream":'):
+                body = self._bn.decode(raw).data
+            try:
+                d = self._bn_ev.decode(body)
+            except msgspec.ValidationError:
+                return super().decode_binance(raw)      # 订阅回执 / 其它事件
+            if isinstance(d, BnAggTrade):
+                return "aggTrade", [Tick(VENUE_BINANCE, d.s, float(d.p), float(d.q),
+                                         d.T / 1000, time.time(), d.a)]
+            return "depthUpdate", [BookUpdate(VENUE_BINANCE, d.s, "update", d.b, d.a,
+                                              (d.T or d.E) / 1000, channel="depth", seq=d.u,
+                                              prev_seq=d.U - 1 if d.pu is None else d.pu,
+                                              first_seq=d.U)]
+
+    return MsgspecCodec()
+
+
+# ───────────────────────── 选择后端 ─────────────────────────
+_FACTORIES = {
+    "msgspec": _msgspec_codec,
+    "orjson":  OrjsonCodec,
+    "json":    JsonCodec,
+}
+
+
+def get_codec(name: str | None = None) -> JsonCodec:
+    """name=None → 按 msgspec > orjson > json 取第一个可用"""
+    names = [name] if name else list(_FACTORIES)
+    for n in names:
+        try:
+            return _FACTORIES[n]()
+        except ImportError:
+            continue
+    return JsonCodec()
+
+
+def available_codecs() -> list[str]:
+    out = []
+    for n, f in _FACTORIES.items():
+        try:
+            f()
+            out.append(n)
+        except ImportError:
+            pass
+    return out
+
+
+# 解码失败时可能抛出的异常（msgspec 的异常不继承 ValueError）
+DECODE_ERRORS: tuple[type[BaseException], ...] = (KeyError, IndexError, TypeError, ValueError)
+try:
+    import msgspec as _msgspec
+    DECODE_ERRORS += (_msgspec.DecodeError,)
+except ImportError:
+    pass
+
+codec          = get_codec(os.getenv("WS_JSON_BACKEND") or None)
+loads          = codec.loads
+dumps          = codec.dumps
+decode_okx     = codec.decode_okx
+decode_binance = codec.decode_binance
@@ -0,0 +1,148 @@
+"""
+跨交易所合成参考价
+
+每个交易所保留最新一笔报价 + 接收延迟 EWMA，按 mode 合成：
+  primary   主交易所（默认 OKX）；主交易所 stale 时退到最新鲜的其它交易所
+  latency   各交易所按 1/超额延迟（延迟 EWMA − 基线）加权，结果始终在各报价之间
+  median    非 stale 交易所中位数
+只有合成价变化（≥ min_change_bps）才输出一笔 FUSED tick，qty 为期间各交易所成交量之和
+（OKX 合约张数按 ct_val 折成币数，与 Binance 同口径），trades 属性为该笔合并的原始 tick 数。
+
+stale：距上次收到消息超过 stale_sec（硬条件）。
+slow ：延迟 EWMA 减去该交易所基线（近期最小延迟，吸收本机 / 交易所时钟偏差）超过 max_latency；
+       有不慢的交易所时不参与合成，全部都慢时照常使用。
+全部 stale → 退到主交易所（否则最新鲜的）最后报价，记 consolidated_ticks_total{result="fallback"} 并告警，
+行情不会因此断流。
+"""
+import logging, statistics
+from typing import Literal
+
+from .tick import Tick, VENUES, VENUE_FUSED, VENUE_OKX
+from ..monitor.metrics import consolidated_ticks_total, feed_stale
+from ..utils import clock
+
+Mode = Literal["primary", "latency", "median"]
+
+
+class _Quote:
+    __slots__ = ("price", "exchange_ts", "recv_ts", "latency", "base")
+
+    def __init__(self) -> None:
+        self.price = 0.0
+        self.exchange_ts = self.recv_ts = 0.0
+        self.latency: float | None = None       # EWMA（秒），含时钟偏差
+        self.base:    float | None = None       # 基线：近期最小延迟，缓慢上浮跟随偏差变化
+
+    @property
+    def excess(self) -> float:
+        return (self.latency or 0.0) - (self.base or 0.0)
+
+
+class PriceConsolidator:
+    def __init__(
+        self,
+        *,
+        mode: Mode = "primary",
+        primary: str = "OKX",
+        stale_sec: float = 2.0,
+        max_latency: float = 1.0,
+        min_change_bps: float = 0.0,
+        lat_alpha: float = 0.1,
+        base_beta: float = 0.001,
+        ct_val: dict[str, float] | None = None,
+        logger: logging.Logger | None = None,
+    ) -> None:
+        """ct_val：OKX instId → 合约面值（币 / 张），用于把 sz 折成币数；未给出的按 1"""
+        if mode not in ("primary", "latency", "median"):
+            raise ValueError(f"unknown consolidate mode: {mode}")
+        self.mode        = mode
+        self.primary     = VENUES.index(primary.upper())
+        self.stale_sec   = stale_sec
+        self.max_latency = max_latency
+        self.min_change  = min_change_bps / 1e4
+        self.alpha       = lat_alpha
+        self.beta        = base_beta
+        self.ct_val      = dict(ct_val or {})
+        self.log         = logger or logging.getLogger("Consolidator")
+        self._quotes: dict[int, _Quote] = {}
+        self._stale:  dict[int, bool]   = {}
+        self._last: float | None = None
+        self._fallback = False
+        self._qty = 0.0
+        self._n   = 0
+        self.trades = 0                          # 最近一笔 FUSED tick 合并的原始 tick 数
+
+    # ────────────────────────── API ──────────────────────────
+    def update(self, t: Tick) -> Tick | None:
+        q = self._quotes.get(t.venue)
+        if q is None:
+            q = self._quotes[t.venue] = _Quote()
+        lat = t.recv_ts - t.exchange_ts
+        q.latency = lat if q.latency is None else q.latency + self.alpha * (lat - q.latency)
+        q.base    = lat if q.base is None or lat < q.base else q.base + self.beta * (lat - q.base)
+        q.price, q.exchange_ts, q.recv_ts = t.price, t.exchange_ts, t.recv_ts
+        self._qty += t.qty * self.ct_val.get(t.symbol, 1.0) if t.venue == VENUE_OKX else t.qty
+        self._n   += 1
+
+        px = self.price()
+        if px is None:
+            return None
+        if self._last is not None and abs(px - self._last) <= self._last * self.min_change:
+            consolidated_ticks_total.labels("suppressed").inc()
+            return None
+        self._last = px
+        qty, self._qty = self._qty, 0.0
+        self.trades, self._n = self._n, 0
+        consolidated_ticks_total.labels("emitted").inc()
+        return Tick(VENUE_FUSED, t.symbol, px, qty, t.exchange_ts, t.recv_ts)
+
+    def price(self) -> float | None:
+        live = self._live()
+        if not live:
+            return self._fallback_price()
+        if self._fallback:
+            self._fallback = False
+            self.log.info("feeds recovered: %s", ", ".join(VENUES[v] for v in live))
+        if self.mode == "primary":
+            q = live.get(self.primary)
+            if q is None:                        # 主交易所 stale → 最新鲜的其它交易所
+                q = max(live.values(), key=lambda x: x.recv_ts)
+            return q.price
+        if self.mode == "median":
+            return statistics.median(q.price for q in live.values())
+        w = {v: 1.0 / (max(q.excess, 0.0) + 1e-3) for v, q in live.items()}   # 去掉时钟偏差，权重恒正
+        return sum(live[v].price * w[v] for v in live) / sum(w.values())
+
+    def is_stale(self, venue: str) -> bool:
+        return self._stale.get(VENUES.index(venue.upper()), True)
+
+    def set_ct_val(self, symbol: str, ct_val: float) -> None:
+        self.ct_val[symbol] = ct_val
+
+    # ──────────────────────── private ────────────────────────
+    def _live(self) -> dict[int, _Quote]:
+        """未 stale 的交易所；其中延迟超标的只在没有更快交易所时保留"""
+        now, live, fast = clock.now(), {}, {}
+        for v, q in self._quotes.items():
+            stale = now - q.recv_ts > self.stale_sec
+            if stale != self._stale.get(v):
+                self._stale[v] = stale
+                feed_stale.labels(VENUES[v]).set(int(stale))
+                if stale:
+                    self.log.warning("%s feed stale (age %.2fs)", VENUES[v], now - q.recv_ts)
+            if not stale:
+                live[v] = q
+                if q.excess <= self.max_latency:
+                    fast[v] = q
+        return fast or live
+
+    def _fallback_price(self) -> float | None:
+        if not self._quotes:
+            return None
+        q = self._quotes.get(self.primary) or max(self._quotes.values(), key=lambda x: x.recv_ts)
+        consolidated_ticks_total.labels("fallback").inc()
+        if not self._fallback:
+            self._fallback = True
+            self.log.error("all feeds stale – falling back to last %s quote",
+                           "primary" if self.primary in self._quotes else "freshest")
+        return q.price
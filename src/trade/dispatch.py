@@ -0,0 +1,105 @@
+"""
+行情分发层 – 替代「每个 tick 一个 create_task」
+
+• 每个 source 一条有序通道（lane）：同一来源的 tick 严格按到达顺序交给回调
+• 每条通道有界缓冲 max_pending；满了按 policy 处理：
+    drop_oldest  丢弃最旧的一笔
+    drop_newest  丢弃新来的一笔
+    coalesce     用新 tick 覆盖缓冲尾部（只保留最新价）
+• batch_size > 1 时微批：回调拿到 list[tick]
+• 同步回调直接在 lane 内调用（不再走默认线程池）
+"""
+import asyncio, collections, logging
+from typing import Any, Callable, Deque, Literal
+
+from ..monitor.metrics import ws_ticks_dropped_total, ws_ticks_coalesced_total
+
+Policy = Literal["drop_oldest", "drop_newest", "coalesce"]
+
+
+class _Lane:
+    __slots__ = ("buf", "wake", "task")
+
+    def __init__(self) -> None:
+        self.buf:  Deque[Any]          = collections.deque()
+        self.wake: asyncio.Event        = asyncio.Event()
+        self.task: asyncio.Task | None  = None
+
+
+class TickDispatcher:
+    def __init__(
+        self,
+        callback: Callable[..., Any],
+        *,
+        max_pending: int = 256,
+        batch_size: int = 1,
+        policy: Policy = "coalesce",
+        logger: logging.Logger | None = None,
+    ) -> None:
+        if policy not in ("drop_oldest", "drop_newest", "coalesce"):
+            raise ValueError(f"unknown dispatch policy: {policy}")
+        self.cb          = callback
+        self.is_async    = asyncio.iscoroutinefunction(callback)
+        self.max_pending = max(1, int(max_pending))
+        self.batch_size  = max(1, int(batch_size))
+        self.policy      = policy
+        self.log         = logger or logging.getLogger("TickDispatcher")
+        self._lanes: dict[str, _Lane] = {}
+
+    # ────────────────────────── API ──────────────────────────
+    def submit(self, src: str, item: Any) -> None:
+        """非阻塞投递；由 ws 读循环直接调用"""
+        lane = self._lanes.get(src)
+        if lane is None:
+            lane = self._lanes[src] = _Lane()
+            lane.task = asyncio.get_running_loop().create_task(self._run(src, lane))
+
+        buf = lane.buf
+        if len(buf) >= self.max_pending:
+            if self.policy == "coalesce":
+                buf[-1] = item
+                ws_ticks_coalesced_total.labels(src).inc()
+            elif self.policy == "drop_oldest":
+                buf.popleft()
+                buf.append(item)
+                ws_ticks_dropped_total.labels(src).inc()
+            else:                                       # drop_newest
+                ws_ticks_dropped_total.labels(src).inc()
+        else:
+            buf.append(item)
+        lane.wake.set()
+
+    def pending(self, src: str) -> int:
+        lane = self._lanes.get(src)
+        return len(lane.buf) if lane else 0
+
+    async def close(self) -> None:
+        tasks = [l.task for l in self._lanes.values() if l.task]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._lanes.clear()
+
+    # ──────────────────────── private ────────────────────────
+    async def _run(self, src: str, lane: _Lane) -> None:
+        buf = lane.buf
+        while True:
+            if not buf:
+                lane.wake.clear()
+                await lane.wake.wait()
+                continue
+            if self.batch_size == 1:
+                payload = buf.popleft()
+            else:
+                n = min(self.batch_size, len(buf))
+                payload = [buf.popleft() for _ in range(n)]
+            await self._invoke(payload, src)
+
+    async def _invoke(self, payload: Any, src: str) -> None:
+        try:
+            if self.is_async:
+                await self.cb(payload, src)
+            else:
+                self.cb(payload, src)
+        except Exception:
+            self.log.exception("Callback error (%s)", src)
@@ -0,0 +1,151 @@
+"""
+单合约增量指标引擎（决策 / 风控共用）
+
+• 每根 bar 收盘（默认 1m，取自 src/trade/bars.py）O(1) 更新：
+    ATR（Wilder）、已实现波动率（对数收益样本标准差）、EMA 快 / 慢、bar 收益
+• 每 tick 更新：最新价、当日 VWAP（UTC 日重置）
+• snapshot() 返回缓存的 Features；两次调用之间没有新数据就是同一个对象
+
+llm_decide 的 payload、RealBroker 自动算张数（risk.manager.calc_size_atr）、
+ATR 追踪止损都读同一个快照。公式与 src/risk/dynamic.py 的数组版
+compute_atr / compute_volatility 一致（回测 / 离线脚本用数组版）。
+"""
+import math
+import numpy as np
+
+from .bars import bar_mgr
+from .tick import Tick
+from ..utils.rolling import RollingSum
+
+
+class Features:
+    __slots__ = ("symbol", "ts", "price", "atr", "sigma", "ema_fast", "ema_slow",
+                 "vwap", "ret", "period_sec", "bars")
+
+    def __init__(self, **kw) -> None:
+        for k in self.__slots__:
+            setattr(self, k, kw.get(k, 0.0))
+
+    def as_dict(self) -> dict:
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def __repr__(self) -> str:
+        return (f"Features({self.symbol} px={self.price} atr={self.atr:.4f} "
+                f"sigma={self.sigma:.5f} vwap={self.vwap:.2f} bars={self.bars})")
+
+
+class FeatureEngine:
+    def __init__(self, symbol: str, *, tf: str = "1m", atr_n: int = 14, vol_n: int = 30,
+                 ema_fast: int = 12, ema_slow: int = 26) -> None:
+        self.symbol = symbol
+        self.series = bar_mgr().get(symbol)[tf]
+        self.atr_n  = atr_n
+        self._a_f   = 2 / (ema_fast + 1)
+        self._a_s   = 2 / (ema_slow + 1)
+        self._seen  = 0                         # 已消费的收盘 bar 数（BarSeries.n）
+        self._prev_c: float | None = None
+        self._atr = 0.0
+        self._tr_n = 0
+        self._r   = RollingSum(vol_n)
+        self._r2  = RollingSum(vol_n)
+        self._ema_f = self._ema_s = 0.0
+        self._ret = 0.0
+        self._day = -1
+        self._pv = self._v = 0.0
+        self._price = self._ts = 0.0
+        self._snap: Features | None = None
+
+    # ────────────────────────── 写 ──────────────────────────
+    def on_tick(self, t: Tick) -> None:
+        """需在 bar_mgr().on_tick(t) 之后调用"""
+        day = int(t.exchange_ts // 86400)
+        if day != self._day:
+            self._day, self._pv, self._v = day, 0.0, 0.0
+        self._pv += t.price * t.qty
+        self._v  += t.qty
+        self._price, self._ts = t.price, t.exchange_ts
+        if self.series.n != self._seen:
+            self._roll()
+        self._snap = None
+
+    def _roll(self) -> None:
+        s = self.series
+        start = max(self._seen, s.n - s.cap)
+        if start < s.n:
+            rows = s.buf[np.arange(start, s.n) % s.cap]
+            for h, l, c in zip(rows["high"].tolist(), rows["low"].tolist(), rows["close"].tolist()):
+                self._on_bar(h, l, c)
+        self._seen = s.n
+        self._snap = None
+
+    def _on_bar(self, h: float, l: float, c: float) -> None:
+        pc = self._prev_c
+        if pc is None:
+            tr = h - l
+            self._ema_f = self._ema_s = c
+        else:
+            tr = max(h - l, abs(h - pc), abs(l - pc))
+            r  = math.log(c / pc) if pc > 0 and c > 0 else 0.0
+            self._ret = r
+            self._r.push(r)
+            self._r2.push(r * r)
+            self._ema_f += self._a_f * (c - self._ema_f)
+            self._ema_s += self._a_s * (c - self._ema_s)
+        n = self.atr_n
+        if self._tr_n < n:                      # 前 n 根：TR 均值
+            self._tr_n += 1
+            self._atr += (tr - self._atr) / self._tr_n
+        else:                                   # Wilder 平滑
+            self._atr = (self._atr * (n - 1) + tr) / n
+        self._prev_c = c
+
+    # ────────────────────────── 读 ──────────────────────────
+    @property
+    def sigma(self) -> float:
+        k = self._r.count
+        if k < 2:
+            return 0.0
+        s, s2 = self._r.sum, self._r2.sum
+        return math.sqrt(max(0.0, (s2 - s * s / k) / (k - 1)))
+
+    def snapshot(self) -> Features:
+        if self.series.n != self._seen:
+            self._roll()
+        if self._snap is None:
+            self._snap = Features(
+                symbol=self.symbol, ts=self._ts, price=self._price, atr=self._atr,
+                sigma=self.sigma, ema_fast=self._ema_f, ema_slow=self._ema_s,
+                vwap=self._pv / self._v if self._v else self._price, ret=self._ret,
+                period_sec=self.series.sec, bars=self._seen,
+            )
+        return self._snap
+
+
+# ───────────────────────────────────────────────────────────────
+class FeatureEngines:
+    def __init__(self) -> None:
+        self._kw: dict = {}
+        self._e: dict[str, FeatureEngine] = {}
+
+    def configure(self, **kw) -> None:
+        """参数变更后已有引擎重建（从 K 线环形缓冲回放，不丢历史）"""
+        self._kw = kw
+        self._e.clear()
+
+    def get(self, symbol: str) -> FeatureEngine:
+        e = self._e.get(symbol)
+        if e is None:
+            e = self._e[symbol] = FeatureEngine(symbol, **self._kw)
+        return e
+
+    def on_tick(self, t: Tick) -> None:
+        self.get(t.symbol).on_tick(t)
+
+    def reset(self) -> None:
+        self._e.clear()
+
+
+# ——— 全局单例 ———
+_engines = FeatureEngines()
+def feature_mgr() -> FeatureEngines:
+    return _engines
@@ -0,0 +1,68 @@
+"""
+行情连接健康
+
+• Backoff   抖动指数退避：首次重连几十毫秒，逐次翻倍到上限；收到数据即复位
+• Deduper   主备双连接（A/B）仲裁：同一笔成交只放行先到的那条
+              有成交 id（Binance a / OKX tradeId）→ 按 id 高水位
+              无 id（OKX tickers）           → 按 (exchange_ts, price, qty) 近期指纹
+• LinkState 单条物理连接的最后收包时间，供看门狗判定静默
+
+看门狗、ping RTT、交易所→本地延迟直方图见 src/trade/subscriptions.py。
+"""
+import random
+from collections import deque
+
+from .tick import Tick
+
+
+class Backoff:
+    def __init__(self, base: float = 0.05, cap: float = 5.0, factor: float = 2.0) -> None:
+        self.base   = base
+        self.cap    = cap
+        self.factor = factor
+        self.n      = 0
+
+    def next(self) -> float:
+        """等抖动：[d/2, d]，d = min(cap, base * factor^n)"""
+        d = min(self.cap, self.base * self.factor ** self.n)
+        self.n += 1
+        return d / 2 + random.random() * d / 2
+
+    def reset(self) -> None:
+        self.n = 0
+
+
+class Deduper:
+    def __init__(self, window: int = 64) -> None:
+        self.window = window
+        self._hwm: dict[tuple[int, str], int] = {}
+        self._recent: dict[tuple[int, str], tuple[deque, set]] = {}
+
+    def fresh(self, t: Tick) -> bool:
+        key = (t.venue, t.symbol)
+        if t.seq >= 0:
+            if t.seq <= self._hwm.get(key, -1):
+                return False
+            self._hwm[key] = t.seq
+            return True
+        r = self._recent.get(key)
+        if r is None:
+            r = self._recent[key] = (deque(), set())
+        order, seen = r
+        sig = (t.exchange_ts, t.price, t.qty)
+        if sig in seen:
+            return False
+        if len(order) == self.window:
+            seen.discard(order.popleft())
+        order.append(sig)
+        seen.add(sig)
+        return True
+
+
+class LinkState:
+    __slots__ = ("name", "last_msg", "reason")
+
+    def __init__(self, name: str, now: float) -> None:
+        self.name     = name
+        self.last_msg = now             # loop.time()
+        self.reason   = "closed"        # 本次断线原因：closed | error | gap | ping
@@ -1,12 +1,21 @@
 # ----------------------------------------------------------------------
 # OKX-SWAP 规格查询 & 行情工具
-#   - 60 s 本地缓存，打印 hit/失效
+#   - 合约规格拉取成功后常驻内存，失败则先用默认值，cache_seconds 后由后台线程重试（调用方不阻塞）
+#   - recent_prices / high / low 取自内存 K 线（src/trade/bars.py，行情流实时更新），
+#     首次查询某合约时 REST 回填一次，之后决策路径零网络请求
+#   - features 为增量指标快照（src/trade/features.py：ATR / σ / EMA / VWAP）
 #   - 自动处理 minSz / lotSz 为小数时的取整
 # ----------------------------------------------------------------------
-import time, math, requests, pandas as pd
+import time, math, threading, requests
+import numpy as np
+
+from .bars     import bar_mgr, BAR_DTYPE, OKX_BAR, CAPACITY
+from .features import feature_mgr
 
 _OKX_REST = "https://www.okx.com"
-_CACHE: dict[tuple, tuple[float, dict]] = {}          # key -> (timestamp, spec)
+_CACHE: dict[str, tuple[float, dict]] = {}            # symbol -> (timestamp, 合约规格)
+_DEFAULT_SPEC = {"ct_val": 0.01, "min_sz": 1, "lot_sz": 1}
+_RETRYING: set[str] = set()                             # 后台重试中的 symbol
 
 # ---------- REST helpers ----------
 def _fetch_instrument_raw(symbol: str) -> dict:
@@ -20,14 +29,48 @@ def _fetch_instrument_raw(symbol: str) -> dict:
             return it
     raise RuntimeError(f"instrument not found: {symbol}")
 
-def _fetch_candles(symbol: str, bar: str = "1m", limit: int = 30) -> pd.DataFrame:
-    """最近 N 根 K 线（按时间升序）"""
+def _fetch_candles(symbol: str, bar: str = "1m", limit: int = 300) -> np.ndarray:
+    """最近 N 根 K 线（BAR_DTYPE，按时间升序）"""
     url = f"{_OKX_REST}/api/v5/market/candles?instId={symbol}&bar={bar}&limit={limit}"
     data = requests.get(url, timeout=4).json().get("data", [])
-    df = pd.DataFrame(
-        data, columns=["ts", "o", "h", "l", "c", "vol", "volCcy", "volCcyQuote", "confirm"]
-    ).astype({"o": float, "h": float, "l": float, "c": float})
-    return df.iloc[::-1].reset_index(drop=True)
+    out = np.zeros(len(data), dtype=BAR_DTYPE)
+    for i, r in enumerate(reversed(data)):    # [ts, o, h, l, c, vol, ...]
+        out[i] = (int(r[0]) / 1000, float(r[1]), float(r[2]), float(r[3]), float(r[4]),
+                  float(r[5]), 0)
+    return out
+
+def backfill_bars(symbol: str) -> None:
+    """每个周期 REST 回填一次（OKX 单次最多 300 根）；失败的周期只靠实时 tick 累积"""
+    bars = bar_mgr().get(symbol)
+    if bars.backfilled:
+        return
+    bars.backfilled = True
+    for tf, series in bars.series.items():
+        try:
+            series.seed(_fetch_candles(symbol, OKX_BAR[tf], min(CAPACITY[tf], 300)))
+        except Exception as e:
+            print(f"⚠️  K 线回填失败 {symbol} {tf}:", e)
+
+def _load_spec(symbol: str) -> dict:
+    """拉取合约规格；失败返回 _DEFAULT_SPEC"""
+    try:
+        raw = _fetch_instrument_raw(symbol)
+        return {
+            "ct_val": float(raw["ctVal"]),
+            # minSz / lotSz 可能是 "0.01" → 转成 float
+            "min_sz": math.ceil(float(raw["minSz"])),
+            "lot_sz": float(raw["lotSz"]),  # 保留小数，不转 int
+        }
+    except Exception as e:
+        print("⚠️  get_instrument_spec 拉取失败，用默认值:", e)
+        return _DEFAULT_SPEC
+
+def _retry_spec(symbol: str) -> None:
+    """后台线程：重试期间 _CACHE 仍是默认值，成功后替换"""
+    try:
+        _CACHE[symbol] = (time.time(), _load_spec(symbol))
+    finally:
+        _RETRYING.discard(symbol)
 
 # ---------- main ----------
 def get_instrument_spec(
@@ -40,50 +83,33 @@ def get_instrument_spec(
     """
     返回 dict 字段：
       ct_val, min_sz, lot_sz, period_sec,
-      recent_prices, recent_high, recent_low
+      recent_prices, recent_high, recent_low   （np.ndarray，最近 limit 根，含未收盘 bar）
+      features                                 （Features 快照）
     """
-    key = (symbol, bar, limit)
     now = time.time()
 
-    # 1. cache
-    ts_cached, spec_cached = _CACHE.get(key, (0, None))
-    hit = spec_cached and now - ts_cached < cache_seconds
-    print(f"[spec-cache] {symbol} hit={bool(hit)} ts={int(ts_cached)} now={int(now)}")
-    if hit:
-        return spec_cached
-
-    # 2. pull fresh
-    try:
-        raw = _fetch_instrument_raw(symbol)
-        df = _fetch_candles(symbol, bar, limit)
-        ct_val = float(raw["ctVal"])
-        # minSz / lotSz 可能是 "0.01" → 转成 float
-        min_sz = math.ceil(float(raw["minSz"]))
-        lot_sz = float(raw["lotSz"])  # 保留小数，不转 int
-        spec = {
-            "ct_val": ct_val,
-            "min_sz": min_sz,
-            "lot_sz": lot_sz,
-            "period_sec": 60,
-            "recent_prices": df["c"],
-            "recent_high": df["h"],
-            "recent_low": df["l"],
-        }
-    except Exception as e:
-        print("⚠️  get_instrument_spec 拉取失败，用默认值:", e)
-        spec = {
-            "ct_val": 0.01,
-            "min_sz": 1,
-            "lot_sz": 1,
-            "period_sec": 60,
-            "recent_prices": pd.Series([0]),
-            "recent_high": pd.Series([0]),
-            "recent_low": pd.Series([0]),
-        }
+    # 1. 合约规格：首次同步拉取 + 回填 K 线；失败用默认值，cache_seconds 后后台重试（不再回填）
+    ts_cached, meta = _CACHE.get(symbol, (0, None))
+    if meta is None:
+        meta = _load_spec(symbol)
+        _CACHE[symbol] = (now, meta)
+        backfill_bars(symbol)
+    elif meta is _DEFAULT_SPEC and now - ts_cached >= cache_seconds and symbol not in _RETRYING:
+        _RETRYING.add(symbol)
+        threading.Thread(target=_retry_spec, args=(symbol,), name=f"spec-retry-{symbol}",
+                         daemon=True).start()
 
-    # 3. store cache
-    _CACHE[key] = (now, spec)
-    return spec
+    # 2. K 线：内存读取
+    series = bar_mgr().get(symbol)[bar]
+    k = series.last(limit)
+    return {
+        **meta,
+        "period_sec": series.sec,
+        "recent_prices": k["close"],
+        "recent_high": k["high"],
+        "recent_low": k["low"],
+        "features": feature_mgr().get(symbol).snapshot(),
+    }
 
 # ----------------------------------------------------------------------
 # 简易 ticker
@@ -1,72 +1,69 @@
-import asyncio, json, os, logging
+import asyncio, os, logging
 from dotenv import load_dotenv
 
+from .dispatch      import TickDispatcher
+from .book          import book_mgr
+from .subscriptions import OkxSubscriptions, BinanceSubscriptions, okx_inst_id
+
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
 
-async def _safe_callback(cb, price, src=""):
-    try:
-        if asyncio.iscoroutinefunction(cb):
-            await cb(price, src)
-        else:
-            await asyncio.get_running_loop().run_in_executor(None, cb, price, src)
-    except Exception:
-        logging.exception("Callback error")
+# 运行中的订阅管理器（venue → manager），供 subscribe()/unsubscribe() 动态增删
+_MANAGERS: dict[str, tuple] = {}
+
+def _dispatcher(callback, dispatcher):
+    if dispatcher is None and callback is not None:
+        dispatcher = TickDispatcher(callback)
+    return dispatcher
 
-async def binance_ws_price(symbol="ETHUSDT", callback=None, backoff=5):
-    from binance import AsyncClient, BinanceSocketManager
-    while True:
-        client = await AsyncClient.create()
-        bm = BinanceSocketManager(client)
-        try:
-            async with bm.aggtrade_socket(symbol.upper()) as stream:
-                logging.info(f"[Binance] Connected {symbol.upper()}")
-                while True:
-                    msg = await stream.recv()
-                    price = float(msg.get("p", 0))
-                    if callback:
-                        asyncio.create_task(_safe_callback(callback, price, "BINANCE"))
-        except Exception:
-            logging.exception("[Binance] ws error")
-            await asyncio.sleep(backoff)
-        finally:
-            await client.close_connection()
+async def binance_ws_price(symbol="ETHUSDT", callback=None, backoff=5, dispatcher=None):
+    """单合约兼容入口；symbol 可为 ETHUSDT 或 ETH-USDT-SWAP"""
+    inst = symbol if "-" in symbol else okx_inst_id(symbol)
+    mgr = BinanceSubscriptions(_dispatcher(callback, dispatcher), backoff_max=backoff)
+    mgr.add([inst], ["aggTrade"])
+    await mgr.run()
 
-async def okx_ws_ticker(symbol="ETH-USDT-SWAP", callback=None, backoff=5):
-    import websockets, time
-    OKX_WS_URL = "wss://ws.okx.com:8443/ws/v5/public"
-    while True:
-        try:
-            async with websockets.connect(OKX_WS_URL) as ws:
-                await ws.send(json.dumps({
-                    "op": "subscribe",
-                    "args": [{"channel": "tickers", "instType": "SWAP", "instId": symbol}]
-                }))
-                logging.info(f"[OKX] Connected {symbol}")
-                async for msg in ws:
-                    data = json.loads(msg)
-                    if data.get("op") == "ping":
-                        await ws.send(json.dumps({"op": "pong"}))
-                        continue
-                    if "data" not in data:
-                        continue
-                    try:
-                        price = float(data["data"][0]["last"])
-                        if callback:
-                            asyncio.create_task(_safe_callback(callback, price, "OKX"))
-                    except (KeyError, IndexError, ValueError) as e:
-                        logging.warning(f"[OKX] Invalid ticker data: {data}")
-                        continue
-        except Exception:
-            logging.exception("[OKX] ws error")
-            await asyncio.sleep(backoff)
+async def okx_ws_ticker(symbol="ETH-USDT-SWAP", callback=None, backoff=5, dispatcher=None):
+    """单合约兼容入口"""
+    mgr = OkxSubscriptions(_dispatcher(callback, dispatcher), backoff_max=backoff)
+    mgr.add([symbol], ["tickers"])
+    await mgr.run()
 
-async def run_ws_main(ws_callback):
-    await asyncio.gather(
-        binance_ws_price(callback=ws_callback),
-        okx_ws_ticker(callback=ws_callback),
-    )
+def subscribe(symbols, venue=None):
+    """运行中追加合约（OKX instId 口径），不重连"""
+    for v, (mgr, channels) in _MANAGERS.items():
+        if venue in (None, v):
+            mgr.add(symbols, channels)
+
+def unsubscribe(symbols, venue=None):
+    for v, (mgr, channels) in _MANAGERS.items():
+        if venue in (None, v):
+            mgr.remove(symbols, channels)
+
+async def run_ws_main(ws_callback, *, symbols=("ETH-USDT-SWAP",),
+                      okx_channels=("tickers",), binance_streams=("aggTrade",),
+                      okx_books=(), binance_depth=(), health=None, **dispatch_kw):
+    """
+    okx_books     books / books5 / bbo-tbt（每个合约选一个）
+    binance_depth 例如 depth@100ms
+    health        连接健康参数（standby / backoff_* / max_gap / ping_*），见 subscriptions.py
+    深度数据进 book_mgr()；dispatch_kw → TickDispatcher(max_pending / batch_size / policy)
+    """
+    health = health or {}
+    disp = TickDispatcher(ws_callback, **dispatch_kw)
+    okx = OkxSubscriptions(disp, books=book_mgr(), **health)
+    bn  = BinanceSubscriptions(disp, books=book_mgr(), **health)
+    okx_ch = (*okx_channels, *okx_books)
+    bn_ch  = (*binance_streams, *binance_depth)
+    okx.add(symbols, okx_ch)
+    bn.add(symbols, bn_ch)
+    _MANAGERS.update(OKX=(okx, okx_ch), BINANCE=(bn, bn_ch))
+    try:
+        await asyncio.gather(okx.run(), bn.run())
+    finally:
+        _MANAGERS.clear()
+        await disp.close()
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
-    def demo_cb(price, src): print(f"DEMO: {src}: {price}")
+    def demo_cb(tick, src): print(f"DEMO: {src}: {tick}")
     asyncio.run(run_ws_main(demo_cb))
@@ -0,0 +1,245 @@
+"""
+OKX 私有 ws 下单通道（order / batch-orders / cancel-order / amend-order）
+
+• 常驻一条已登录的私有连接：建连 → login（签名复用 OkxRest 的 HMAC 键对象）→ 就绪；
+  断线 / 登录失败 / 交易所 notice 按抖动指数退避重连并重新登录
+• 每个请求带自增 id，回执按 id 对应到在途 future；回执与 REST 响应同构（code / msg / data）
+• 下单 args 复用 OkxRest.order_body 的预序列化模板，整帧直接拼字符串发送
+• 连接未就绪或发送失败（请求未离开本机）→ 改走 REST；
+  已发出但回执超时 / 连接中断 → 不重发（避免重复下单），返回 code=-1，由调用方按 clOrdId 对账
+• 保活：空闲 ping_interval 秒发文本 "ping"，ping_timeout 内无任何消息即断开重连
+• subscribe()：同一连接上的私有频道（orders / fills …），每次登录后自动重订阅，推送交给 handler
+方法签名与 OkxRest 一致，RealBroker(gateway=...) 二选一。
+"""
+import asyncio, itertools, logging, os, time
+from typing import Any, Awaitable, Callable
+
+from .codec    import loads, dumps
+from .health   import Backoff
+from .okx_rest import OkxRest, okx_rest, order_ids
+from ..monitor.metrics import (okx_ws_order_latency_seconds, okx_order_route_total,
+                               okx_ws_logins_total, ws_reconnects_total)
+
+OKX_PRIVATE_WS      = "wss://ws.okx.com:8443/ws/v5/private"
+OKX_PRIVATE_WS_DEMO = "wss://wspap.okx.com:8443/ws/v5/private"
+
+
+class OkxOrderGateway:
+    def __init__(self, rest: OkxRest | None = None, **kw) -> None:
+        self.rest  = rest or okx_rest()
+        self.log   = logging.getLogger("OkxOrderWS")
+        self.ready = False
+        self._ws   = None
+        self._ids  = itertools.count(1)
+        self._pending: dict[str, asyncio.Future] = {}
+        self._last = 0.0
+        self._subs: list[dict] = []
+        self._push: dict[str, Callable[[dict, list], Any]] = {}
+        self._on_login: list[Callable[[], Any]] = []
+        self.configure(**kw)
+
+    def configure(
+        self,
+        *,
+        url: str | None = None,
+        ack_timeout: float = 2.0,
+        login_timeout: float = 5.0,
+        ping_interval: float = 20.0,
+        ping_timeout: float = 5.0,
+        backoff_base: float = 0.05,
+        backoff_max: float = 5.0,
+    ) -> None:
+        """configs/config.yaml order_ws 段；url 为空 → 按 OKX_API_FLAG 选实盘 / 模拟盘地址"""
+        self.url = url or os.getenv("OKX_PRIVATE_WS") or \
+            (OKX_PRIVATE_WS_DEMO if self.rest.simulated else OKX_PRIVATE_WS)
+        self.ack_timeout   = ack_timeout
+        self.login_timeout = login_timeout
+        self.ping_interval = ping_interval
+        self.ping_timeout  = ping_timeout
+        self.backoff_base  = backoff_base
+        self.backoff_max   = backoff_max
+
+    def is_ready(self) -> bool:
+        return self.ready
+
+    # ────────────────────────── 交易 ──────────────────────────
+    async def place_order(
+        self, inst_id: str, side: str, sz: str, *,
+        td_mode: str = "isolated", pos_side: str | None = None, ord_type: str = "market",
+        px: str | None = None, reduce_only: bool = False, cl_ord_id: str | None = None,
+    ) -> dict:
+        kw = dict(td_mode=td_mode, pos_side=pos_side, ord_type=ord_type, px=px,
+                  reduce_only=reduce_only, cl_ord_id=cl_ord_id)
+        return await self._request("order", lambda: f"[{self.rest.order_body(inst_id, side, sz, **kw)}]",
+                                   lambda: self.rest.place_order(inst_id, side, sz, **kw))
+
+    async def batch_orders(self, orders: list[dict]) -> dict:
+        return await self._request("batch-orders", lambda: dumps(orders),
+                                   lambda: self.rest.batch_orders(orders))
+
+    async def cancel_order(self, inst_id: str, *, ord_id: str | None = None,
+                           cl_ord_id: str | None = None) -> dict:
+        arg = order_ids({"instId": inst_id}, ord_id, cl_ord_id)
+        return await self._request("cancel-order", lambda: dumps([arg]),
+                                   lambda: self.rest.cancel_order(inst_id, ord_id=ord_id, cl_ord_id=cl_ord_id))
+
+    async def amend_order(self, inst_id: str, *, ord_id: str | None = None, cl_ord_id: str | None = None,
+                          new_sz: str | None = None, new_px: str | None = None) -> dict:
+        arg = order_ids({"instId": inst_id}, ord_id, cl_ord_id)
+        if new_sz is not None:
+            arg["newSz"] = new_sz
+        if new_px is not None:
+            arg["newPx"] = new_px
+        return await self._request("amend-order", lambda: dumps([arg]),
+                                   lambda: self.rest.amend_order(inst_id, ord_id=ord_id, cl_ord_id=cl_ord_id,
+                                                                 new_sz=new_sz, new_px=new_px))
+
+    # ────────────────────────── 订阅 ──────────────────────────
+    def subscribe(self, args: list[dict], handler: Callable[[dict, list], Any],
+                  on_login: Callable[[], Any] | None = None) -> None:
+        """
+        args     [{"channel": "orders", "instType": "SWAP"}, …]
+        handler  (arg, data) ← 每条推送
+        on_login 每次（重新）登录并订阅后调用，供订阅方补齐断线期间漏掉的推送
+        """
+        for a in args:
+            self._subs.append(a)
+            self._push[a["channel"]] = handler
+        if on_login is not None:
+            self._on_login.append(on_login)
+        if self._ws is not None and self.ready:
+            asyncio.get_running_loop().create_task(self._ws.send(dumps({"op": "subscribe", "args": args})))
+
+    # ────────────────────────── 连接 ──────────────────────────
+    async def run(self) -> None:
+        """常驻任务：建连 + 登录 + 收回执；断线自动重连重登"""
+        import websockets
+        loop    = asyncio.get_running_loop()
+        backoff = Backoff(self.backoff_base, self.backoff_max)
+        while True:
+            reason = "closed"
+            try:
+                async with websockets.connect(self.url, ping_interval=None) as ws:
+                    await self._login(ws)
+                    backoff.reset()
+                    self._ws, self.ready, self._last = ws, True, loop.time()
+                    self.log.info("private ws logged in (%s)", self.url)
+                    if self._subs:
+                        await ws.send(dumps({"op": "subscribe", "args": self._subs}))
+                    for cb in self._on_login:
+                        cb()
+                    dog = loop.create_task(self._keepalive(ws))
+                    try:
+                        async for raw in ws:
+                            self._last = loop.time()
+                            if self._on_message(raw):
+                                reason = "notice"
+                                break
+                    finally:
+                        dog.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                reason = "error"
+                self.log.warning("private ws error: %s", e)
+            finally:
+                self._ws, self.ready = None, False
+                self._fail_pending()
+            ws_reconnects_total.labels("OKX-private", reason).inc()
+            delay = backoff.next()
+            self.log.warning("private ws disconnected (%s), reconnecting in %.0f ms", reason, delay * 1000)
+            await asyncio.sleep(delay)
+
+    # ──────────────────────── private ────────────────────────
+    async def _request(self, op: str, args: Callable[[], str],
+                       fallback: Callable[[], Awaitable[dict]]) -> dict:
+        ws = self._ws
+        if ws is None or not self.ready:
+            okx_order_route_total.labels(op, "rest").inc()
+            return await fallback()
+        rid = str(next(self._ids))
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[rid] = fut
+        t0 = time.perf_counter()
+        try:
+            try:
+                await ws.send(f'{{"id":"{rid}","op":"{op}","args":{args()}}}')
+            except Exception as e:                # 未发出 → REST 重发是安全的
+                self.log.warning("private ws send failed (%s), falling back to REST", e)
+                okx_order_route_total.labels(op, "rest").inc()
+                return await fallback()
+            try:
+                res = await asyncio.wait_for(fut, self.ack_timeout)
+            except asyncio.TimeoutError:
+                okx_order_route_total.labels(op, "timeout").inc()
+                return {"code": "-1", "msg": "ws ack timeout", "data": []}
+            except ConnectionError as e:
+                okx_order_route_total.labels(op, "lost").inc()
+                return {"code": "-1", "msg": str(e), "data": []}
+        finally:
+            self._pending.pop(rid, None)
+        okx_ws_order_latency_seconds.labels(op).observe(time.perf_counter() - t0)
+        okx_order_route_total.labels(op, "ws").inc()
+        return res
+
+    async def _login(self, ws) -> None:
+        await ws.send(dumps({"op": "login", "args": [self.rest.ws_login_args()]}))
+        msg = loads(await asyncio.wait_for(ws.recv(), self.login_timeout))
+        ok  = msg.get("event") == "login" and str(msg.get("code", "0")) == "0"
+        okx_ws_logins_total.labels("ok" if ok else "error").inc()
+        if not ok:
+            raise PermissionError(f"login failed: {msg}")
+
+    def _on_message(self, raw) -> bool:
+        """→ True 表示交易所要求断开（notice：服务升级等），由 run 重连"""
+        if raw == "pong":
+            return False
+        msg = loads(raw)
+        rid = msg.get("id")
+        if rid:
+            fut = self._pending.get(rid)
+            if fut is not None and not fut.done():
+                fut.set_result(msg)
+            return False
+        ev = msg.get("event")
+        if ev is None and "data" in msg:
+            arg = msg.get("arg") or {}
+            handler = self._push.get(arg.get("channel"))
+            if handler is not None:
+                handler(arg, msg["data"])
+            return False
+        if ev == "notice":
+            self.log.warning("private ws notice: %s", msg)
+            return True
+        if ev == "error":
+            self.log.warning("private ws error frame: %s", msg)
+        return False
+
+    async def _keepalive(self, ws) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(max(0.0, self._last + self.ping_interval - loop.time()))
+            if loop.time() - self._last < self.ping_interval:
+                continue
+            sent = loop.time()
+            await ws.send("ping")
+            await asyncio.sleep(self.ping_timeout)
+            if self._last < sent:
+                self.log.warning("private ws pong timeout")
+                await ws.close()
+                return
+
+    def _fail_pending(self) -> None:
+        for fut in self._pending.values():
+            if not fut.done():
+                fut.set_exception(ConnectionError("ws closed before ack"))
+        self._pending.clear()
+
+
+# ——— 全局单例 ———
+_gateway: OkxOrderGateway | None = None
+def order_gateway() -> OkxOrderGateway:
+    global _gateway
+    if _gateway is None:
+        _gateway = OkxOrderGateway()
+    return _gateway
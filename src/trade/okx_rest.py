@@ -0,0 +1,212 @@
+"""
+OKX v5 REST 异步客户端（下单 / 批量下单 / 撤单 / 改单 / 查单 / 策略单 / 持仓 / 余额）
+
+• httpx.AsyncClient 常驻连接池（keep-alive；装了 h2 时走 HTTP/2 单连接多路复用）
+• 签名：HMAC-SHA256 键对象只建一次，每次请求 copy() 后追加 ts + method + path + body
+• 下单体按 (instId, side, tdMode, posSide, ordType, reduceOnly) 预先序列化成 JSON 前缀，
+  每单只拼接 sz / px / clOrdId
+• OKX_API_FLAG=1（默认）→ 模拟盘（x-simulated-trading: 1）
+返回 OKX 原始 JSON（{"code", "msg", "data"}）；网络异常直接抛出，由调用方处理。
+"""
+import asyncio, base64, hashlib, hmac, json, logging, os, time
+from typing import Any
+from urllib.parse import urlencode
+
+from .codec import loads
+from ..monitor.metrics import okx_rest_latency_seconds
+
+OKX_REST_URL = os.getenv("OKX_REST_URL", "https://www.okx.com")
+
+
+def _has_h2() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class OkxRest:
+    def __init__(
+        self,
+        *,
+        base_url: str = OKX_REST_URL,
+        api_key: str | None = None,
+        secret: str | None = None,
+        passphrase: str | None = None,
+        flag: str | None = None,
+        timeout: float = 5.0,
+        max_connections: int = 10,
+        http2: bool | None = None,
+        logger: logging.Logger | None = None,
+    ) -> None:
+        self.base_url = base_url
+        self.timeout  = timeout
+        self.max_conn = max_connections
+        self.http2    = _has_h2() if http2 is None else http2
+        self.log = logger or logging.getLogger("OkxRest")
+        secret = os.getenv("OKX_API_SECRET", "") if secret is None else secret
+        self._mac = hmac.new(secret.encode(), digestmod=hashlib.sha256)
+        self._hdr = {
+            "OK-ACCESS-KEY":        os.getenv("OKX_API_KEY", "") if api_key is None else api_key,
+            "OK-ACCESS-PASSPHRASE": os.getenv("OKX_API_PASSPHRASE", "") if passphrase is None else passphrase,
+            "Content-Type":         "application/json",
+        }
+        self.simulated = (os.getenv("OKX_API_FLAG", "1") if flag is None else flag) == "1"
+        if self.simulated:
+            self._hdr["x-simulated-trading"] = "1"
+        self._tpl: dict[tuple, str] = {}
+        self._sec = -1
+        self._sec_str = ""
+        self._cli = None
+        self._loop = None
+
+    # ────────────────────────── 交易 ──────────────────────────
+    async def place_order(
+        self, inst_id: str, side: str, sz: str, *,
+        td_mode: str = "isolated", pos_side: str | None = None, ord_type: str = "market",
+        px: str | None = None, reduce_only: bool = False, cl_ord_id: str | None = None,
+    ) -> dict:
+        """side: buy / sell；sz / px 为 OKX 口径字符串"""
+        body = self.order_body(inst_id, side, sz, td_mode=td_mode, pos_side=pos_side,
+                               ord_type=ord_type, px=px, reduce_only=reduce_only, cl_ord_id=cl_ord_id)
+        return await self.request("POST", "/api/v5/trade/order", body=body)
+
+    async def batch_orders(self, orders: list[dict]) -> dict:
+        """orders: OKX 下单字段（instId / tdMode / side / ordType / sz …），单批最多 20"""
+        return await self.post("/api/v5/trade/batch-orders", orders)
+
+    async def cancel_order(self, inst_id: str, *, ord_id: str | None = None,
+                           cl_ord_id: str | None = None) -> dict:
+        return await self.post("/api/v5/trade/cancel-order",
+                               order_ids({"instId": inst_id}, ord_id, cl_ord_id))
+
+    async def amend_order(self, inst_id: str, *, ord_id: str | None = None, cl_ord_id: str | None = None,
+                          new_sz: str | None = None, new_px: str | None = None) -> dict:
+        d = order_ids({"instId": inst_id}, ord_id, cl_ord_id)
+        if new_sz is not None:
+            d["newSz"] = new_sz
+        if new_px is not None:
+            d["newPx"] = new_px
+        return await self.post("/api/v5/trade/amend-order", d)
+
+    async def get_order(self, inst_id: str, *, ord_id: str | None = None,
+                        cl_ord_id: str | None = None) -> dict:
+        return await self.request("GET", "/api/v5/trade/order",
+                                  params=order_ids({"instId": inst_id}, ord_id, cl_ord_id))
+
+    async def place_algo_order(self, **params: Any) -> dict:
+        """params 与 OKX /trade/order-algo 字段同名（instId / tdMode / side / ordType / …）"""
+        return await self.post("/api/v5/trade/order-algo", params)
+
+    async def cancel_algo_orders(self, orders: list[dict]) -> dict:
+        """orders: [{"algoId": ..., "instId": ...}, …]"""
+        return await self.post("/api/v5/trade/cancel-algos", orders)
+
+    # ────────────────────────── 账户 ──────────────────────────
+    async def positions(self, inst_id: str | None = None, inst_type: str = "SWAP") -> dict:
+        p = {"instType": inst_type}
+        if inst_id:
+            p["instId"] = inst_id
+        return await self.request("GET", "/api/v5/account/positions", params=p)
+
+    async def balance(self, ccy: str | None = None) -> dict:
+        return await self.request("GET", "/api/v5/account/balance",
+                                  params={"ccy": ccy} if ccy else None)
+
+    # ────────────────────────── 底层 ──────────────────────────
+    async def post(self, path: str, payload: Any) -> dict:
+        return await self.request("POST", path, body=json.dumps(payload, separators=(",", ":")))
+
+    async def request(self, method: str, path: str, *, body: str = "",
+                      params: dict | None = None) -> dict:
+        if params:
+            path = f"{path}?{urlencode(params)}"             # 签名覆盖 query
+        ts = self._timestamp()
+        headers = {**self._hdr, "OK-ACCESS-TIMESTAMP": ts,
+                   "OK-ACCESS-SIGN": self.sign(ts, method, path, body)}
+        t0 = time.perf_counter()
+        r = await self._client().request(method, path, content=body or None, headers=headers)
+        okx_rest_latency_seconds.labels(path.split("?", 1)[0].rsplit("/", 1)[-1]).observe(
+            time.perf_counter() - t0)
+        return loads(r.content)
+
+    def order_body(
+        self, inst_id: str, side: str, sz: str, *,
+        td_mode: str = "isolated", pos_side: str | None = None, ord_type: str = "market",
+        px: str | None = None, reduce_only: bool = False, cl_ord_id: str | None = None,
+    ) -> str:
+        """下单 JSON（REST body 与私有 ws order 的 args 元素通用）"""
+        k = (inst_id, side, td_mode, pos_side, ord_type, reduce_only)
+        head = self._tpl.get(k)
+        if head is None:
+            d = {"instId": inst_id, "tdMode": td_mode, "side": side, "ordType": ord_type, "ccy": "USDT"}
+            if pos_side:
+                d["posSide"] = pos_side
+            if reduce_only:
+                d["reduceOnly"] = "true"
+            head = self._tpl[k] = json.dumps(d, separators=(",", ":"))[:-1]
+        body = f'{head},"sz":"{sz}"'
+        if px is not None:
+            body += f',"px":"{px}"'
+        if cl_ord_id:
+            body += f',"clOrdId":"{cl_ord_id}"'
+        return body + "}"
+
+    def ws_login_args(self) -> dict:
+        """私有 ws login 参数：timestamp 为 Unix 秒，签名串 ts + GET + /users/self/verify"""
+        ts = str(int(time.time()))
+        return {"apiKey": self._hdr["OK-ACCESS-KEY"], "passphrase": self._hdr["OK-ACCESS-PASSPHRASE"],
+                "timestamp": ts, "sign": self.sign(ts, "GET", "/users/self/verify")}
+
+    def sign(self, ts: str, method: str, path: str, body: str = "") -> str:
+        m = self._mac.copy()
+        m.update(f"{ts}{method}{path}{body}".encode())
+        return base64.b64encode(m.digest()).decode()
+
+    async def aclose(self) -> None:
+        if self._cli is not None:
+            await self._cli.aclose()
+            self._cli = None
+
+    # ──────────────────────── private ────────────────────────
+    def _client(self):
+        loop = asyncio.get_running_loop()
+        if self._cli is None or self._loop is not loop:   # 连接池绑定事件循环（脚本里 asyncio.run 多次）
+            import httpx
+            self._loop = loop
+            self._cli = httpx.AsyncClient(
+                base_url=self.base_url, http2=self.http2, timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_conn,
+                                    max_keepalive_connections=self.max_conn,
+                                    keepalive_expiry=120),
+            )
+        return self._cli
+
+    def _timestamp(self) -> str:
+        """ISO-8601 毫秒（2020-12-08T09:08:57.715Z）；秒级前缀缓存"""
+        t = time.time()
+        s = int(t)
+        if s != self._sec:
+            self._sec, self._sec_str = s, time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(s))
+        return f"{self._sec_str}.{int((t - s) * 1000):03d}Z"
+
+
+def order_ids(d: dict, ord_id: str | None, cl_ord_id: str | None) -> dict:
+    if ord_id:
+        d["ordId"] = ord_id
+    elif cl_ord_id:
+        d["clOrdId"] = cl_ord_id
+    else:
+        raise ValueError("ord_id or cl_ord_id required")
+    return d
+
+
+# ——— 全局单例 ———
+_client: OkxRest | None = None
+def okx_rest() -> OkxRest:
+    """首次调用时按环境变量（OKX_API_KEY / SECRET / PASSPHRASE / FLAG）创建"""
+    global _client
+    if _client is None:
+        _client = OkxRest()
+    return _client
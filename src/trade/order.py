@@ -1,38 +1,10 @@
 from dotenv import load_dotenv; load_dotenv()
-import os, threading
 from typing import Optional, Literal, Dict, Any
-import okx.Trade   as _okx_trade
-import okx.Account as _okx_acct
-from ..monitor.metrics import okx_fees_usdt_total         # Prometheus
+from .okx_rest import okx_rest                             # 异步 REST（连接池 + 预序列化下单体）
+# gateway：OkxRest 或 OkxOrderGateway（src/trade/okx_private_ws.py，私有 ws，断线回落 REST）；默认 REST
+# tracker：OrderTracker（src/trade/order_tracker.py），成交价 / 手续费 / 滑点以私有 orders 推送为准
 
-_trade_lock, _acct_lock = threading.Lock(), threading.Lock()
-_trade_cli = _acct_cli = None
-
-def _trade() -> _okx_trade.TradeAPI:
-    global _trade_cli
-    with _trade_lock:
-        if _trade_cli is None:
-            _trade_cli = _okx_trade.TradeAPI(
-                api_key=os.getenv("OKX_API_KEY", ""),
-                api_secret_key=os.getenv("OKX_API_SECRET", ""),
-                passphrase=os.getenv("OKX_API_PASSPHRASE", ""),
-                flag=os.getenv("OKX_API_FLAG", "1"),
-            )
-        return _trade_cli
-
-def _acct() -> _okx_acct.AccountAPI:
-    global _acct_cli
-    with _acct_lock:
-        if _acct_cli is None:
-            _acct_cli = _okx_acct.AccountAPI(
-                api_key=os.getenv("OKX_API_KEY", ""),
-                api_secret_key=os.getenv("OKX_API_SECRET", ""),
-                passphrase=os.getenv("OKX_API_PASSPHRASE", ""),
-                flag=os.getenv("OKX_API_FLAG", "1"),
-            )
-        return _acct_cli
-
-def place_order(
+async def place_order(
     symbol: str,
     side: Literal["BUY", "SELL"],
     qty: float,
@@ -42,35 +14,61 @@ def place_order(
     min_sz: float,
     lot_sz: float,
     reduce_only: bool = False,
+    cl_ord_id: Optional[str] = None,
+    gateway=None,
+    tracker=None,
+    ref_px: Optional[float] = None,
 ) -> Dict[str, Any]:
     if qty < min_sz or abs((qty / lot_sz) - round(qty / lot_sz)) > 1e-8:
         return {"id": "", "status": "SIZE_TOO_SMALL", "api_response": {}}
+    if tracker is not None:
+        cl_ord_id = cl_ord_id or tracker.new_cl_ord_id()
+        tracker.track(cl_ord_id, symbol, side, qty, ref_px)
+
+    try:
+        res = await (gateway or okx_rest()).place_order(
+            symbol, side.lower(), str(qty),
+            td_mode     = td_mode,
+            pos_side    = "long" if side == "BUY" else "short",
+            reduce_only = reduce_only,
+            cl_ord_id   = cl_ord_id,
+        )
+    except Exception as e:
+        res = {"code": "-1", "msg": str(e), "data": []}        # 结果未知，tracker 按 clOrdId 查单
+        if tracker is not None:
+            tracker.acked(cl_ord_id, res)
+        return {"id": "", "cl_ord_id": cl_ord_id or "", "status": "EXCEPTION", "error": str(e)}
+    if tracker is not None:
+        tracker.acked(cl_ord_id, res)
+    data0 = (res.get("data") or [{}])[0]
+    return {"id": data0.get("ordId", ""), "cl_ord_id": cl_ord_id or "",
+            "status": res.get("code", "X"), "api_response": res}
 
-    params: Dict[str, Any] = dict(
-        instId   = symbol,
-        tdMode   = td_mode,
-        ordType  = "market",
-        side     = side.lower(),
-        sz       = str(qty),
-        ccy      = "USDT",
-        posSide  = "long" if side == "BUY" else "short",
-    )
-    if reduce_only:
-        params["reduceOnly"] = "true"
 
+async def cancel_order(symbol: str, *, ord_id: str = "", cl_ord_id: str = "",
+                       gateway=None) -> Dict[str, Any]:
     try:
-        res = _trade().place_order(**params)
-        data0 = (res.get("data") or [{}])[0]
-        fee = abs(float(data0.get("fee", 0)))
-        okx_fees_usdt_total.inc(fee)
-        return {"id": data0.get("ordId", ""), "status": res.get("code", "X"), "api_response": res}
+        return await (gateway or okx_rest()).cancel_order(symbol, ord_id=ord_id or None, cl_ord_id=cl_ord_id or None)
     except Exception as e:
-        return {"id": "", "status": "EXCEPTION", "error": str(e)}
+        return {"code": "-1", "msg": str(e)}
+
+
+async def amend_order(symbol: str, *, ord_id: str = "", cl_ord_id: str = "",
+                      new_sz: Optional[float] = None, new_px: Optional[float] = None,
+                      gateway=None) -> Dict[str, Any]:
+    try:
+        return await (gateway or okx_rest()).amend_order(
+            symbol, ord_id=ord_id or None, cl_ord_id=cl_ord_id or None,
+            new_sz=None if new_sz is None else str(new_sz),
+            new_px=None if new_px is None else str(new_px),
+        )
+    except Exception as e:
+        return {"code": "-1", "msg": str(e)}
 
 # ─────────────────────────────────────────────────────────────
 # Trailing-Stop Algo Order（OKX 原生）
 # ----------------------------------------------------------------
-def place_algo_order_trailing_sl(
+async def place_algo_order_trailing_sl(
     symbol: str,
     side: Literal["BUY", "SELL"],          # 仍按开仓方向传进来
     trigger_px: str,
@@ -96,8 +94,7 @@ def place_algo_order_trailing_sl(
         "callbackRatio": callback_rate,       # "0.5" → 0.5 %
     }
     try:
-        res = _trade().place_algo_order(**params)
-        return res
+        return await okx_rest().place_algo_order(**params)
     except Exception as e:
         print("❌ place_algo_order_trailing_sl 异常:", e)
         return {"code": "-1", "msg": str(e)}
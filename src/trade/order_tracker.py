@@ -0,0 +1,213 @@
+"""
+订单状态跟踪（私有 orders / fills 频道）
+
+• 下单前 track(clOrdId) 登记，回执后 acked() 绑定 ordId（或记为拒单）；表内以 ordId / clOrdId 双键索引
+• orders 推送：state / accFillSz / avgPx / 累计 fee 逐条更新；fills 推送（VIP 频道）只用于更早拿到首笔成交时刻
+• 终态（filled / canceled / mmp_canceled / rejected）→ 解析 wait() 的 future，
+  记滑点（相对下单时参考价，按不利方向为正）、成交延迟、真实手续费
+• 回执不确定（ws 已发出未回执）或（重新）登录后 → REST 查单补齐断线期间漏掉的推送
+• 终态订单保留最近 retain 条，之后从表中移除
+"""
+import asyncio, collections, itertools, logging, time
+
+from .okx_rest import OkxRest, okx_rest
+from ..monitor.metrics import (okx_fees_usdt_total, okx_fill_slippage_bps, okx_fill_latency_seconds,
+                               okx_order_states_total)
+
+TERMINAL = ("filled", "canceled", "mmp_canceled", "rejected")
+
+
+class OrderState:
+    __slots__ = ("cl_ord_id", "ord_id", "inst_id", "side", "sz", "ref_px", "state", "filled",
+                 "avg_px", "fee", "msg", "t_submit", "t_fill", "done", "_trades")
+
+    def __init__(self, cl_ord_id: str, inst_id: str, side: str, sz: float, ref_px: float | None) -> None:
+        self.cl_ord_id = cl_ord_id
+        self.ord_id    = ""
+        self.inst_id   = inst_id
+        self.side      = side                     # BUY / SELL
+        self.sz        = sz
+        self.ref_px    = ref_px or 0.0            # 下单时的信号价
+        self.state     = "submitted"
+        self.filled    = 0.0                      # accFillSz
+        self.avg_px    = 0.0
+        self.fee       = 0.0                      # OKX 口径：负数 = 支出
+        self.msg       = ""
+        self.t_submit  = time.perf_counter()
+        self.t_fill    = 0.0
+        self.done: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._trades: set[str] = set()
+
+    @property
+    def slippage_bps(self) -> float:
+        """成交均价相对参考价，不利方向为正"""
+        if not (self.avg_px and self.ref_px):
+            return 0.0
+        sign = 1 if self.side == "BUY" else -1
+        return sign * (self.avg_px / self.ref_px - 1) * 1e4
+
+    def as_dict(self) -> dict:
+        return {
+            "ord_id": self.ord_id, "cl_ord_id": self.cl_ord_id, "state": self.state,
+            "filled_sz": self.filled, "avg_px": self.avg_px, "fee": self.fee,
+            "slippage_bps": round(self.slippage_bps, 3),
+            "fill_latency": round(self.t_fill - self.t_submit, 4) if self.t_fill else None,
+            **({"msg": self.msg} if self.msg else {}),
+        }
+
+
+class OrderTracker:
+    def __init__(self, rest: OkxRest | None = None, **kw) -> None:
+        self.rest = rest or okx_rest()
+        self.log  = logging.getLogger("OrderTracker")
+        self._orders: dict[str, OrderState] = {}
+        self._seq = itertools.count(1)
+        self.configure(**kw)
+
+    def configure(self, *, fills: bool = True, fill_timeout: float = 2.0, retain: int = 1024,
+                  inst_type: str = "SWAP", fee_ccy: str = "USDT") -> None:
+        """configs/config.yaml order_tracker 段"""
+        self.fills        = fills
+        self.fill_timeout = fill_timeout
+        self.inst_type    = inst_type
+        self.fee_ccy      = fee_ccy
+        self._done: collections.deque[OrderState] = collections.deque(getattr(self, "_done", ()),
+                                                                      maxlen=retain)
+
+    def attach(self, gateway) -> None:
+        """在私有 ws（src/trade/okx_private_ws.py）上订阅 orders / fills，重登后自动补查"""
+        args = [{"channel": "orders", "instType": self.inst_type}]
+        if self.fills:
+            args.append({"channel": "fills"})
+        gateway.subscribe(args, self.on_push, on_login=self.resync)
+
+    # ────────────────────────── 下单侧 ──────────────────────────
+    def new_cl_ord_id(self) -> str:
+        """字母数字 ≤ 32 位"""
+        return f"t{int(time.time() * 1000)}n{next(self._seq)}"
+
+    def track(self, cl_ord_id: str, inst_id: str, side: str, sz: float,
+              ref_px: float | None = None) -> OrderState:
+        st = self._orders[cl_ord_id] = OrderState(cl_ord_id, inst_id, side, sz, ref_px)
+        return st
+
+    def acked(self, cl_ord_id: str, res: dict) -> OrderState | None:
+        """下单回执（REST / ws 同构）；code=-1 为本地未知结果（ack 超时 / 连接中断）→ 查单"""
+        st = self._orders.get(cl_ord_id)
+        if st is None:
+            return None
+        d0 = (res.get("data") or [{}])[0]
+        if str(res.get("code")) == "0" and str(d0.get("sCode", "0")) == "0":
+            self._bind(st, d0.get("ordId", ""))
+        elif str(res.get("code")) == "-1":
+            asyncio.get_running_loop().create_task(self._query(st))
+        else:
+            st.msg = d0.get("sMsg") or res.get("msg", "")
+            st.state = "rejected"
+            self._finish(st)
+        return st
+
+    def get(self, key: str) -> OrderState | None:
+        return self._orders.get(key)
+
+    async def wait(self, key: str, timeout: float | None = None) -> OrderState | None:
+        """等到终态；超时先 REST 查一次再返回当前状态（可能仍是 live / partially_filled）"""
+        st = self._orders.get(key)
+        if st is None:
+            return None
+        try:
+            await asyncio.wait_for(asyncio.shield(st.done), self.fill_timeout if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            await self._query(st)
+        return st
+
+    # ────────────────────────── 推送侧 ──────────────────────────
+    def on_push(self, arg: dict, data: list) -> None:
+        ch = arg.get("channel")
+        for d in data:
+            if ch == "orders":
+                self._on_order(d)
+            elif ch == "fills":
+                self._on_fill(d)
+
+    def resync(self) -> None:
+        """（重新）登录后：未到终态的订单逐个 REST 查单"""
+        loop = asyncio.get_running_loop()
+        for st in {id(s): s for s in self._orders.values() if not s.done.done()}.values():
+            loop.create_task(self._query(st))
+
+    # ──────────────────────── private ────────────────────────
+    def _lookup(self, d: dict) -> OrderState | None:
+        return self._orders.get(d.get("ordId", "")) or self._orders.get(d.get("clOrdId", ""))
+
+    def _bind(self, st: OrderState, ord_id: str) -> None:
+        if ord_id and not st.ord_id:
+            st.ord_id = ord_id
+            self._orders[ord_id] = st
+
+    def _on_order(self, d: dict) -> None:
+        st = self._lookup(d)
+        if st is None or st.done.done():
+            return                                # 非本进程下的单 / 已终态
+        self._bind(st, d.get("ordId", ""))
+        st.filled = float(d.get("accFillSz") or 0)
+        st.avg_px = float(d.get("avgPx") or 0)
+        if d.get("feeCcy", self.fee_ccy) == self.fee_ccy:
+            fee = float(d.get("fee") or 0)
+            if fee < st.fee:                      # 累计值，只记新增支出
+                okx_fees_usdt_total.inc(st.fee - fee)
+            st.fee = fee
+        if d.get("tradeId") and float(d.get("fillSz") or 0) > 0:
+            self._trade(st, d["tradeId"])
+        st.state = d.get("state", st.state)
+        if st.state in TERMINAL:
+            self._finish(st)
+
+    def _on_fill(self, d: dict) -> None:
+        st = self._lookup(d)
+        if st is not None and d.get("tradeId"):
+            self._trade(st, d["tradeId"])
+
+    def _trade(self, st: OrderState, trade_id: str) -> None:
+        if trade_id in st._trades:
+            return
+        st._trades.add(trade_id)
+        if not st.t_fill:
+            st.t_fill = time.perf_counter()
+            okx_fill_latency_seconds.observe(st.t_fill - st.t_submit)
+
+    def _finish(self, st: OrderState) -> None:
+        if st.done.done():
+            return
+        st.done.set_result(st)
+        okx_order_states_total.labels(st.state).inc()
+        if st.filled and st.avg_px and st.ref_px:
+            okx_fill_slippage_bps.observe(st.slippage_bps)
+        if len(self._done) == self._done.maxlen:
+            old = self._done[0]
+            for k in (old.cl_ord_id, old.ord_id):
+                if self._orders.get(k) is old:
+                    del self._orders[k]
+        self._done.append(st)
+
+    async def _query(self, st: OrderState) -> None:
+        try:
+            res = await self.rest.get_order(st.inst_id, ord_id=st.ord_id or None,
+                                            cl_ord_id=None if st.ord_id else st.cl_ord_id)
+        except Exception as e:
+            self.log.warning("order query failed (%s): %s", st.cl_ord_id, e)
+            return
+        if str(res.get("code")) == "0" and res.get("data"):
+            self._on_order(res["data"][0])
+        elif not st.ord_id and str(res.get("code")) == "51603":    # 订单不存在：从未到达交易所
+            st.msg, st.state = res.get("msg", ""), "rejected"
+            self._finish(st)
+
+
+# ——— 全局单例 ———
+_tracker: OrderTracker | None = None
+def order_tracker() -> OrderTracker:
+    global _tracker
+    if _tracker is None:
+        _tracker = OrderTracker()
+    return _tracker
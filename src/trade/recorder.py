@@ -0,0 +1,196 @@
+"""
+行情录制 – 内存映射定长二进制，按天滚动
+
+文件：<dir>/ticks-YYYYMMDD.bin   （UTC 日，按 recv_ts 切分）
+      <dir>/symbols.json          symbol → id（跨天共用）
+布局：64 字节头（magic / 版本 / 记录长度 / 记录数）+ N × RECORD_DTYPE（40 字节）
+
+• append(tick) 只在事件循环里往预分配的暂存数组写一行
+• 满 batch 或每 flush_sec 把整批交给后台写线程，mmap 写盘不占事件循环
+• read_day() 以 np.memmap 零拷贝读回结构化数组
+"""
+import asyncio, datetime as dt, json, logging, mmap, os, queue, struct, threading
+import numpy as np
+
+from .tick import Tick
+
+RECORD_DTYPE = np.dtype([
+    ("exchange_ts", "<f8"),
+    ("recv_ts",     "<f8"),
+    ("price",       "<f8"),
+    ("qty",         "<f8"),
+    ("symbol",      "<u2"),
+    ("venue",       "u1"),
+    ("_pad",        "V5"),
+])
+
+_MAGIC   = b"KKTICK01"
+_HDR     = struct.Struct("<8sIIQ")          # magic, version, rec_size, count
+_HDR_LEN = 64
+_VERSION = 1
+
+
+def _day_of(ts: float) -> str:
+    return dt.datetime.fromtimestamp(ts, dt.timezone.utc).strftime("%Y%m%d")
+
+
+def day_path(directory: str, day: str) -> str:
+    return os.path.join(directory, f"ticks-{day}.bin")
+
+
+class _DayFile:
+    """单日文件；仅由写线程访问"""
+    def __init__(self, path: str, grow: int) -> None:
+        self.grow = grow
+        new = not os.path.exists(path) or os.path.getsize(path) < _HDR_LEN
+        self.f = open(path, "w+b" if new else "r+b")
+        if new:
+            self.count = 0
+            self._resize(grow)
+            _HDR.pack_into(self.mm, 0, _MAGIC, _VERSION, RECORD_DTYPE.itemsize, 0)
+        else:
+            self.mm = mmap.mmap(self.f.fileno(), 0)
+            magic, _, rec, self.count = _HDR.unpack_from(self.mm, 0)
+            if magic != _MAGIC or rec != RECORD_DTYPE.itemsize:
+                raise ValueError(f"bad tick file: {path}")
+        self.cap = (len(self.mm) - _HDR_LEN) // RECORD_DTYPE.itemsize
+
+    def _resize(self, records: int) -> None:
+        if getattr(self, "mm", None) is not None:
+            self.mm.close()
+        self.f.truncate(_HDR_LEN + records * RECORD_DTYPE.itemsize)
+        self.mm  = mmap.mmap(self.f.fileno(), 0)
+        self.cap = records
+
+    def write(self, arr: np.ndarray) -> None:
+        need = self.count + len(arr)
+        if need > self.cap:
+            self._resize(max(need, self.cap + self.grow))
+        view = np.frombuffer(self.mm, dtype=RECORD_DTYPE, count=self.cap, offset=_HDR_LEN)
+        view[self.count:need] = arr
+        del view                                  # 释放 buffer 引用，否则 mmap 无法 resize/close
+        self.count = need
+        _HDR.pack_into(self.mm, 0, _MAGIC, _VERSION, RECORD_DTYPE.itemsize, self.count)
+
+    def close(self) -> None:
+        self.mm.flush()
+        self.mm.close()
+        self.f.truncate(_HDR_LEN + self.count * RECORD_DTYPE.itemsize)
+        self.f.close()
+
+
+class TickRecorder:
+    def __init__(
+        self,
+        path: str = "data/ticks",
+        *,
+        batch: int = 4096,
+        flush_sec: float = 1.0,
+        grow: int = 1 << 20,                      # 文件每次扩容的记录数
+        logger: logging.Logger | None = None,
+    ) -> None:
+        os.makedirs(path, exist_ok=True)
+        self.dir       = path
+        self.batch     = batch
+        self.flush_sec = flush_sec
+        self.grow      = grow
+        self.log       = logger or logging.getLogger("TickRecorder")
+        self._stage    = np.zeros(batch, dtype=RECORD_DTYPE)
+        self._n        = 0
+        self._symbols  = load_symbols(path)
+        self._sym_dirty = False
+        self._q: queue.Queue = queue.Queue()
+        self._thread   = threading.Thread(target=self._writer, name="tick-recorder", daemon=True)
+        self._thread.start()
+
+    # ────────────────────────── API ──────────────────────────
+    def append(self, t: Tick) -> None:
+        sid = self._symbols.get(t.symbol)
+        if sid is None:
+            sid = self._symbols[t.symbol] = len(self._symbols)
+            self._sym_dirty = True
+        self._stage[self._n] = (t.exchange_ts, t.recv_ts, t.price, t.qty, sid, t.venue, b"")
+        self._n += 1
+        if self._n == self.batch:
+            self._handoff()
+
+    async def run(self) -> None:
+        """定时把不满一批的数据也交给写线程"""
+        try:
+            while True:
+                await asyncio.sleep(self.flush_sec)
+                self._handoff()
+        finally:
+            self._handoff()
+
+    def close(self) -> None:
+        self._handoff()
+        self._q.put(None)
+        self._thread.join()
+
+    # ──────────────────────── private ────────────────────────
+    def _handoff(self) -> None:
+        if not self._n and not self._sym_dirty:
+            return
+        syms = dict(self._symbols) if self._sym_dirty else None
+        self._q.put((self._stage[:self._n], syms))
+        self._stage = np.zeros(self.batch, dtype=RECORD_DTYPE)
+        self._n, self._sym_dirty = 0, False
+
+    def _writer(self) -> None:
+        files: dict[str, _DayFile] = {}
+        while True:
+            job = self._q.get()
+            if job is None:
+                break
+            arr, syms = job
+            try:
+                if syms is not None:
+                    _save_symbols(self.dir, syms)
+                if not len(arr):
+                    continue
+                first, last = _day_of(arr["recv_ts"][0]), _day_of(arr["recv_ts"][-1])
+                if first == last:
+                    groups = [(first, arr)]
+                else:                             # 跨天批次：逐条分组
+                    per = np.array([_day_of(ts) for ts in arr["recv_ts"]])
+                    groups = [(d, arr[per == d]) for d in np.unique(per)]
+                for day, part in groups:
+                    f = files.get(day)
+                    if f is None:
+                        for old in [d for d in files if d < day]:
+                            files.pop(old).close()   # 日切：关闭并截断旧文件
+                        f = files[day] = _DayFile(day_path(self.dir, day), self.grow)
+                    f.write(part)
+            except Exception:
+                self.log.exception("tick recorder write failed")
+        for f in files.values():
+            f.close()
+
+
+# ───────────────────────────────────────────────────────────────
+def load_symbols(directory: str) -> dict[str, int]:
+    try:
+        with open(os.path.join(directory, "symbols.json")) as f:
+            return {k: int(v) for k, v in json.load(f).items()}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_symbols(directory: str, syms: dict[str, int]) -> None:
+    tmp = os.path.join(directory, "symbols.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(syms, f)
+    os.replace(tmp, os.path.join(directory, "symbols.json"))
+
+
+def read_day(directory: str, day: str) -> np.ndarray:
+    """零拷贝读回某日记录（np.memmap，只读）；day 形如 20250101"""
+    path = day_path(directory, day)
+    with open(path, "rb") as f:
+        magic, _, rec, count = _HDR.unpack(f.read(_HDR.size))
+    if magic != _MAGIC or rec != RECORD_DTYPE.itemsize:
+        raise ValueError(f"bad tick file: {path}")
+    if count == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=_HDR_LEN, shape=(count,))
@@ -0,0 +1,346 @@
+"""
+多合约 ws 订阅管理
+
+• OKX      一条连接多 args（op=subscribe/unsubscribe），每连接最多 max_args 个
+• Binance  combined stream（/stream + method=SUBSCRIBE/UNSUBSCRIBE），每连接最多 max_args 个
+• 运行中 add()/remove() 直接在已有连接上增删订阅，不重连
+• 解码后的 tick 统一改写为 OKX instId 口径（ETH-USDT-SWAP），
+  以 "<venue>:<instId>" 为 key 投递到 sink（TickDispatcher），即每个合约一条有序通道
+
+sink 只需实现 submit(key, item)；深度频道（books*/bbo-tbt/depth）的 BookUpdate
+交给 books（src.trade.book.Books），OKX 簿失效时自动重订阅拿快照。
+
+连接健康：断线按抖动指数退避重连（毫秒级起步）；看门狗按 max_gap / ping_interval
+发 ping 测 RTT，pong 超时或长时间无推送即断开重连；standby=True 时每组订阅开
+主备两条连接，tick 按成交 id 去重（src.trade.health）。
+"""
+import asyncio, itertools, logging
+from typing import Any, Iterable, Protocol
+
+from .codec  import decode_okx, decode_binance, dumps, DECODE_ERRORS, BookUpdate
+from .health import Backoff, Deduper, LinkState
+from .tick   import Tick
+from ..monitor.metrics import (ws_msg_lag_seconds, ws_ping_rtt_seconds, ws_msg_gap_seconds,
+                               ws_reconnects_total, ws_duplicates_total)
+
+OKX_PUBLIC_WS  = "wss://ws.okx.com:8443/ws/v5/public"
+BINANCE_WS     = "wss://stream.binance.com:9443/stream"
+
+_BN_QUOTES = ("USDT", "USDC", "FDUSD", "BUSD", "BTC", "ETH")
+
+
+class Sink(Protocol):
+    def submit(self, key: str, item: Any) -> None: ...
+
+
+def binance_symbol(inst_id: str) -> str:
+    """ETH-USDT-SWAP → ETHUSDT"""
+    base, quote = inst_id.split("-")[:2]
+    return base + quote
+
+
+def okx_inst_id(bn_symbol: str, inst_type: str = "SWAP") -> str:
+    """ETHUSDT → ETH-USDT-SWAP（按常见计价币拆分）"""
+    s = bn_symbol.upper()
+    for q in _BN_QUOTES:
+        if s.endswith(q) and len(s) > len(q):
+            return f"{s[:-len(q)]}-{q}-{inst_type}"
+    raise ValueError(f"unknown binance symbol: {bn_symbol}")
+
+
+# ───────────────────────────────────────────────────────────────
+class _Conn:
+    __slots__ = ("idx", "subs", "ws", "tasks")
+
+    def __init__(self, idx: int, replicas: int) -> None:
+        self.idx   = idx
+        self.subs: dict[str, Any] = {}      # key → 订阅参数
+        self.ws:   list = [None] * replicas  # 每条物理连接（主 / 备）
+        self.tasks: list[asyncio.Task | None] = [None] * replicas
+
+    def live(self) -> list:
+        return [ws for ws in self.ws if ws is not None]
+
+
+class _SubscriptionManager:
+    venue     = ""
+    url       = ""
+    max_args  = 100
+    chunk     = 50                          # 单条订阅请求最多携带的参数
+    chunk_gap = 0.0                         # 连续订阅请求间隔（秒）
+
+    def __init__(self, sink: Sink, *, books=None, url: str | None = None,
+                 max_args: int | None = None, standby: bool = False,
+                 backoff_base: float = 0.05, backoff_max: float = 5.0,
+                 max_gap: float = 5.0, stall_sec: float = 30.0,
+                 ping_interval: float = 10.0, ping_timeout: float = 3.0,
+                 logger: logging.Logger | None = None) -> None:
+        """
+        standby       True → 每组订阅开主备两条连接，消息按成交 id 去重，任一条卡住不断流
+        max_gap       静默超过该秒数 → 立即 ping，pong 超时即重连
+        stall_sec     静默超过该秒数 → 无论 pong 与否都重连（交易所侧推送卡死）
+        """
+        self.sink     = sink
+        self.books    = books
+        self.url      = url or self.url
+        self.max_args = max_args or self.max_args
+        self.replicas = 2 if standby else 1
+        self.backoff_base  = backoff_base
+        self.backoff_max   = backoff_max
+        self.max_gap       = max_gap
+        self.stall_sec     = stall_sec
+        self.ping_interval = ping_interval
+        self.ping_timeout  = ping_timeout
+        self.log      = logger or logging.getLogger(f"{self.venue}Subs")
+        self._conns: list[_Conn] = []
+        self._running = False
+        self._dedup   = Deduper()
+        self._lag     = ws_msg_lag_seconds.labels(self.venue)
+        self._rtt     = ws_ping_rtt_seconds.labels(self.venue)
+        self._dups    = ws_duplicates_total.labels(self.venue)
+
+    # ────────────────────────── API ──────────────────────────
+    def add(self, symbols: Iterable[str], channels: Iterable[str]) -> None:
+        """symbols 为 OKX instId 口径；运行中调用会立即在已有连接上订阅"""
+        pending: dict[_Conn, list] = {}
+        for sym in symbols:
+            for ch in channels:
+                key, arg = self._arg(sym, ch)
+                if any(key in c.subs for c in self._conns):
+                    continue
+                conn = self._conn_with_room()
+                conn.subs[key] = arg
+                pending.setdefault(conn, []).append(arg)
+        for conn, args in pending.items():
+            self._send_later(conn, args, True)
+
+    def remove(self, symbols: Iterable[str], channels: Iterable[str]) -> None:
+        pending: dict[_Conn, list] = {}
+        for sym in symbols:
+            for ch in channels:
+                key, _ = self._arg(sym, ch)
+                for conn in self._conns:
+                    arg = conn.subs.pop(key, None)
+                    if arg is not None:
+                        pending.setdefault(conn, []).append(arg)
+        for conn, args in pending.items():
+            self._send_later(conn, args, False)
+
+    def resync(self, symbol: str, channel: str) -> None:
+        """退订再订阅，交易所会重新推送快照"""
+        key, arg = self._arg(symbol, channel)
+        loop = asyncio.get_running_loop()
+        for conn in self._conns:
+            if key in conn.subs:
+                for ws in conn.live():
+                    loop.create_task(self._resubscribe(conn, ws, key, arg))
+
+    def subscriptions(self) -> list[str]:
+        return [k for c in self._conns for k in c.subs]
+
+    async def run(self) -> None:
+        self._running = True
+        try:
+            for c in self._conns:
+                self._start(c)
+            while True:
+                await asyncio.sleep(3600)
+        finally:
+            self._running = False
+            tasks = [t for c in self._conns for t in c.tasks if t]
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    # ──────────────────────── 子类实现 ────────────────────────
+    def _arg(self, symbol: str, channel: str) -> tuple[str, Any]:
+        raise NotImplementedError
+
+    def _sub_msg(self, args: list, on: bool) -> str:
+        raise NotImplementedError
+
+    async def _on_message(self, ws: Any, raw: Any) -> None:
+        raise NotImplementedError
+
+    # ──────────────────────── private ────────────────────────
+    def _conn_with_room(self) -> _Conn:
+        for c in self._conns:
+            if len(c.subs) < self.max_args:
+                return c
+        c = _Conn(len(self._conns), self.replicas)
+        self._conns.append(c)
+        if self._running:
+            self._start(c)
+        return c
+
+    def _start(self, conn: _Conn) -> None:
+        loop = asyncio.get_running_loop()
+        for i, t in enumerate(conn.tasks):
+            if t is None or t.done():
+                conn.tasks[i] = loop.create_task(self._conn_loop(conn, i))
+
+    def _send_later(self, conn: _Conn, args: list, on: bool) -> None:
+        # 未连接的链路建连时会订阅 conn.subs 全量
+        for ws in conn.live():
+            asyncio.get_running_loop().create_task(self._send(conn, ws, args, on))
+
+    async def _send(self, conn: _Conn, ws: Any, args: list, on: bool) -> None:
+        try:
+            for i in range(0, len(args), self.chunk):
+                if i and self.chunk_gap:
+                    await asyncio.sleep(self.chunk_gap)
+                await ws.send(self._sub_msg(args[i:i + self.chunk], on))
+        except Exception as e:
+            self.log.warning("[%s#%d] (un)subscribe failed: %s", self.venue, conn.idx, e)
+
+    async def _resubscribe(self, conn: _Conn, ws: Any, key: str, arg: Any) -> None:
+        await self._send(conn, ws, [arg], False)
+        if ws in conn.ws and key in conn.subs:   # 期间重连过则建连时已全量订阅
+            await self._send(conn, ws, [arg], True)
+
+    async def _conn_loop(self, conn: _Conn, i: int) -> None:
+        import websockets
+        loop    = asyncio.get_running_loop()
+        name    = f"{self.venue}#{conn.idx}" + ("AB"[i] if self.replicas > 1 else "")
+        backoff = Backoff(self.backoff_base, self.backoff_max)
+        while True:
+            st = LinkState(name, loop.time())
+            try:
+                # 自带 keepalive 关闭，由 _watchdog 统一 ping 并记录 RTT
+                async with websockets.connect(self.url, ping_interval=None) as ws:
+                    conn.ws[i] = ws
+                    await self._send(conn, ws, list(conn.subs.values()), True)
+                    self.log.info("[%s] Connected, %d subs", name, len(conn.subs))
+                    dog = loop.create_task(self._watchdog(ws, st))
+                    try:
+                        async for msg in ws:
+                            if backoff.n:
+                                backoff.reset()
+                            st.last_msg = loop.time()
+                            await self._on_message(ws, msg)
+                    finally:
+                        dog.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                st.reason = "error"
+                self.log.exception("[%s] ws error", name)
+            finally:
+                conn.ws[i] = None
+            ws_reconnects_total.labels(self.venue, st.reason).inc()
+            delay = backoff.next()
+            self.log.warning("[%s] disconnected (%s), reconnecting in %.0f ms",
+                             name, st.reason, delay * 1000)
+            await asyncio.sleep(delay)
+
+    async def _watchdog(self, ws: Any, st: LinkState) -> None:
+        """静默检测 + 定时 ping；判定失联时关闭连接，由 _conn_loop 重连"""
+        loop  = asyncio.get_running_loop()
+        gauge = ws_msg_gap_seconds.labels(st.name)
+        tick  = min(self.max_gap, self.ping_interval) / 2
+        last_ping = loop.time()
+        while True:
+            await asyncio.sleep(tick)
+            now = loop.time()
+            gap = now - st.last_msg
+            gauge.set(gap)
+            if gap > self.stall_sec:
+                st.reason = "gap"
+                self.log.warning("[%s] no data for %.1f s", st.name, gap)
+                break
+            if gap > self.max_gap or now - last_ping >= self.ping_interval:
+                last_ping = now
+                try:
+                    pong = await ws.ping()
+                    await asyncio.wait_for(pong, self.ping_timeout)
+                except Exception:
+                    st.reason = "ping"
+                    self.log.warning("[%s] ping timeout (silent %.1f s)", st.name, gap)
+                    break
+                self._rtt.observe(loop.time() - now)
+        await ws.close()
+
+    def _route(self, tick: Tick) -> None:
+        if not self._dedup.fresh(tick):
+            self._dups.inc()
+            return
+        self._lag.observe(tick.recv_ts - tick.exchange_ts)
+        self.sink.submit(f"{self.venue}:{tick.symbol}", tick)
+
+    def _book(self, u: BookUpdate) -> bool:
+        self._lag.observe(u.recv_ts - u.ts)
+        return self.books.on_update(u)
+
+
+# ───────────────────────────────────────────────────────────────
+class OkxSubscriptions(_SubscriptionManager):
+    venue    = "OKX"
+    url      = OKX_PUBLIC_WS
+    max_args = 100
+    _PONG    = dumps({"op": "pong"})
+
+    def _arg(self, symbol: str, channel: str) -> tuple[str, Any]:
+        return f"{channel}:{symbol}", {"channel": channel, "instId": symbol}
+
+    def _sub_msg(self, args: list, on: bool) -> str:
+        return dumps({"op": "subscribe" if on else "unsubscribe", "args": args})
+
+    async def _on_message(self, ws: Any, raw: Any) -> None:
+        try:
+            ch, payload = decode_okx(raw)
+        except DECODE_ERRORS:
+            self.log.warning("[OKX] Invalid frame: %s", raw)
+            return
+        if not ch:
+            if payload.get("op") == "ping":
+                await ws.send(self._PONG)
+            elif payload.get("event") == "error":
+                self.log.warning("[OKX] %s", payload)
+            return
+        for item in payload:
+            if isinstance(item, Tick):
+                self._route(item)
+            elif isinstance(item, BookUpdate) and self.books is not None:
+                if not self._book(item):
+                    self.resync(item.symbol, item.channel)
+
+
+class BinanceSubscriptions(_SubscriptionManager):
+    venue     = "BINANCE"
+    url       = BINANCE_WS
+    max_args  = 200
+    chunk     = 100
+    chunk_gap = 0.25                        # 入站控制消息限 5 条/秒
+
+    def __init__(self, sink: Sink, **kw) -> None:
+        super().__init__(sink, **kw)
+        self._ids   = itertools.count(1)
+        self._inst: dict[str, str] = {}     # ETHUSDT → ETH-USDT-SWAP
+
+    def _arg(self, symbol: str, channel: str) -> tuple[str, Any]:
+        bn = binance_symbol(symbol)
+        self._inst[bn] = symbol
+        stream = f"{bn.lower()}@{channel}"
+        return stream, stream
+
+    def _sub_msg(self, args: list, on: bool) -> str:
+        return dumps({"method": "SUBSCRIBE" if on else "UNSUBSCRIBE",
+                      "params": args, "id": next(self._ids)})
+
+    async def _on_message(self, ws: Any, raw: Any) -> None:
+        try:
+            ev, payload = decode_binance(raw)
+        except DECODE_ERRORS:
+            self.log.warning("[Binance] Invalid frame: %s", raw)
+            return
+        if not ev:
+            if payload.get("error"):
+                self.log.warning("[Binance] %s", payload)
+            return
+        for item in payload:
+            if isinstance(item, Tick):
+                item.symbol = self._inst.get(item.symbol) or okx_inst_id(item.symbol)
+                self._route(item)
+            elif isinstance(item, BookUpdate) and self.books is not None:
+                item.symbol = self._inst.get(item.symbol) or okx_inst_id(item.symbol)
+                self._book(item)
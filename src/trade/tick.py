@@ -0,0 +1,58 @@
+"""
+紧凑行情记录
+
+• Tick  单笔 tick（__slots__，无 __dict__）；批量 / 落盘见 src/trade/recorder.py
+
+时间戳统一为 float 秒（与 time.time() 同口径），exchange_ts 来自交易所：
+  Binance aggTrade  T   (ms)
+  OKX tickers       ts  (ms)
+seq 为交易所成交 id（去重用，src/trade/health.py），tickers 频道没有 id，为 -1。
+"""
+import time
+
+VENUE_BINANCE, VENUE_OKX, VENUE_FUSED = 0, 1, 2
+VENUES = ("BINANCE", "OKX", "FUSED")          # FUSED = 跨交易所合成价（src/trade/consolidate.py）
+
+
+class Tick:
+    __slots__ = ("venue", "symbol", "price", "qty", "exchange_ts", "recv_ts", "seq")
+
+    def __init__(self, venue: int, symbol: str, price: float, qty: float,
+                 exchange_ts: float, recv_ts: float, seq: int = -1) -> None:
+        self.venue       = venue
+        self.symbol      = symbol
+        self.price       = price
+        self.qty         = qty
+        self.exchange_ts = exchange_ts
+        self.recv_ts     = recv_ts
+        self.seq         = seq          # 交易所成交 id（Binance a / OKX tradeId），无则 -1
+
+    @property
+    def src(self) -> str:
+        return VENUES[self.venue]
+
+    @property
+    def latency(self) -> float:
+        """交易所时间 → 本地接收（秒）"""
+        return self.recv_ts - self.exchange_ts
+
+    def __float__(self) -> float:
+        return self.price
+
+    def __repr__(self) -> str:
+        return (f"Tick({self.src} {self.symbol} {self.price} x {self.qty} "
+                f"lag={self.latency * 1000:.1f}ms)")
+
+    # ---------- 解析 ----------
+    @classmethod
+    def from_binance_agg(cls, msg: dict) -> "Tick":
+        """aggTrade: {"s","p","q","T",...}"""
+        return cls(VENUE_BINANCE, msg.get("s", ""), float(msg["p"]), float(msg["q"]),
+                   int(msg["T"]) / 1000, time.time(), int(msg.get("a", -1)))
+
+    @classmethod
+    def from_okx_ticker(cls, d: dict) -> "Tick":
+        """tickers data[0]: {"instId","last","lastSz","ts",...}"""
+        return cls(VENUE_OKX, d.get("instId", ""), float(d["last"]), float(d.get("lastSz") or 0),
+                   int(d["ts"]) / 1000, time.time())
+
@@ -0,0 +1,43 @@
+"""
+可注入时钟
+
+实盘默认 time.time；回放时 set_clock(ReplayClock()) 后由行情时间推进，
+SignalFilter / EventClassifier / PositionGuard / 余额缓存等统一读 clock.now()。
+"""
+import time
+
+
+class WallClock:
+    def now(self) -> float:
+        return time.time()
+
+
+class ReplayClock:
+    """手动推进；只进不退"""
+    def __init__(self, start: float = 0.0) -> None:
+        self.t = start
+
+    def now(self) -> float:
+        return self.t
+
+    def advance(self, ts: float) -> None:
+        if ts > self.t:
+            self.t = ts
+
+
+_clock: WallClock | ReplayClock = WallClock()
+
+
+def now() -> float:
+    return _clock.now()
+
+
+def get_clock() -> WallClock | ReplayClock:
+    return _clock
+
+
+def set_clock(c: WallClock | ReplayClock) -> WallClock | ReplayClock:
+    """替换全局时钟，返回旧时钟（便于恢复）"""
+    global _clock
+    prev, _clock = _clock, c
+    return prev
@@ -0,0 +1,56 @@
+"""
+滑动窗口增量统计
+
+RollingSum 维护前缀和环（长度 window + 1）：
+  push(x)      O(1)，返回最近 min(n, window) 个值之和
+  extend(xs)   NumPy 批量版，结果与逐个 push 逐位一致
+               （np.cumsum 顺序累加，与 Python 逐次 += 同一运算序列）
+窗口长度到上千也是常数开销；前缀和用 float64，长时间运行的相对误差远小于阈值判断所需精度。
+"""
+import numpy as np
+
+
+class RollingSum:
+    def __init__(self, window: int) -> None:
+        self.w = max(1, int(window))
+        self.n = 0
+        self._S = [0.0] * (self.w + 1)      # S_k（前 k 个值之和）存于 k % (w + 1)
+
+    @property
+    def count(self) -> int:
+        return min(self.n, self.w)
+
+    @property
+    def full(self) -> bool:
+        return self.n >= self.w
+
+    @property
+    def sum(self) -> float:
+        m, n = self.w + 1, self.n
+        return self._S[n % m] - self._S[(n - min(n, self.w)) % m]
+
+    def push(self, x: float) -> float:
+        S, m, n = self._S, self.w + 1, self.n
+        s = S[n % m] + x
+        n += 1
+        S[n % m] = s
+        self.n = n
+        return s - S[(n - min(n, self.w)) % m]
+
+    def extend(self, xs: np.ndarray) -> np.ndarray:
+        """批量 push；返回每次 push 后的窗口和"""
+        xs = np.asarray(xs, dtype=float)
+        k = len(xs)
+        if k == 0:
+            return np.zeros(0)
+        m, n0, w = self.w + 1, self.n, self.w
+        base = max(0, n0 - w)
+        hist = np.array([self._S[i % m] for i in range(base, n0 + 1)])
+        S = np.concatenate((hist, np.cumsum(np.concatenate((hist[-1:], xs)))[1:]))
+        cnt = np.arange(n0 + 1, n0 + k + 1)
+        lo  = cnt - np.minimum(cnt, w)
+        out = S[cnt - base] - S[lo - base]
+        for i in range(max(base, n0 + k - w), n0 + k + 1):
+            self._S[i % m] = float(S[i - base])
+        self.n = n0 + k
+        return out
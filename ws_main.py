@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-import warnings, asyncio, logging, os, time, json, signal
+import warnings, asyncio, logging, os, json, signal
 
 # ─── 全面屏蔽所有警告 ─────────────────────────────────────────────
 warnings.simplefilter("ignore")
@@ -16,186 +16,359 @@ except OSError:
 
 # ── 项目模块 ────────────────────────────────────────────────────
 from src.utils.config_loader import load as load_cfg
+from src.utils               import clock
 from src.trade.market       import get_instrument_spec
 from src.trade.order        import place_order
+from src.trade.okx_rest     import okx_rest
+from src.trade.okx_private_ws import order_gateway
+from src.trade.order_tracker  import order_tracker
 from src.agent.price_consumer import PriceConsumer
 from src.agent.signal_filter  import SignalFilter
 from src.agent.position_guard import PositionGuard
-from src.agent.agent_decide_and_execute import agent_decide_and_execute
+from src.agent.speculative    import LocalSpeculator
+from src.agent.router         import LLMRouter, rule_decide
+from src.agent.agent_decide_and_execute import agent_decide_and_execute, weaviate_journal
 from src.trade.market_ws     import run_ws_main
+from src.trade.tick          import Tick
+from src.trade.health        import Backoff
+from src.trade.book          import book_mgr
+from src.trade.bars          import bar_mgr
+from src.trade.features      import feature_mgr
+from src.risk.manager        import calc_size_atr
+from src.trade.recorder      import TickRecorder
+from src.trade.consolidate   import PriceConsolidator
 
 # L1 本地推理 + 显著事件
-from src.llm_local_client  import ask_local_llm
+from src.llm_local_client  import ask_local_llm, ollama
 from src.event_classifier  import EventClassifier
-from src.intent_cache      import hit_or_set
+from src.intent_cache      import hit_or_set, intent_cache
+from src.decision_cache    import DecisionCache, decision_cache
 
 # Trailing-SL
 from src.risk.trailing      import trailing_mgr
-from src.monitor.metrics    import trailing_stop_hits_total
-from src.storage.weaviate_client import get_client
+from src.monitor.metrics    import trailing_stop_hits_total, event_score
+
+# GPT 异步客户端
+from src.llm_openai_client import gpt_client
 
 # 监控指标
 from src.monitor.metrics import (
-    gpt_requests_total, gpt_latency_seconds,
     okx_fees_usdt_total, okx_orders_total,
     order_latency_seconds, equity_usdt
 )
 
-import openai, okx.Account as _acct
-
 # ── 全局配置 / 对象 ─────────────────────────────────────────────
 cfg        = load_cfg()
 event_cls  = EventClassifier(**cfg["event_cls"])
-openai.api_key = os.getenv("OPENAI_API_KEY")
+feature_mgr().configure(**cfg.get("features", {}))
+gpt_client().configure(**cfg.get("openai", {}))
+ollama().configure(**cfg.get("local_llm", {}))
+intent_cache().configure(**cfg.get("intent", {}))
 
-_gpt_lock  = asyncio.Lock()
 _BAL_CACHE = (0, 0.0)
+_bal_task: asyncio.Task | None = None
 
 
 # ───────────────────────────────────────────────────────────────
 # 账户余额缓存
 def _load_balance() -> float:
-    global _BAL_CACHE
+    """返回缓存余额，不阻塞；过期（30 s）时在后台异步刷新，下次调用即生效"""
+    global _bal_task
     ts, bal = _BAL_CACHE
-    if time.time() - ts < 30:
+    if clock.now() - ts < 30:
         return bal
-    cli = _acct.AccountAPI(
-        api_key        = os.getenv("OKX_API_KEY", ""),
-        api_secret_key = os.getenv("OKX_API_SECRET", ""),
-        passphrase     = os.getenv("OKX_API_PASSPHRASE", ""),
-        flag           = os.getenv("OKX_API_FLAG", "1"),
-    )
     try:
-        bal = float(cli.get_account_balance(ccy="USDT")["data"][0]["details"][0]["cashBal"])
+        loop = asyncio.get_running_loop()
+    except RuntimeError:                     # 无事件循环（脚本 / 启动期）→ 同步取
+        return asyncio.run(_refresh_balance())
+    if _bal_task is None or _bal_task.done():
+        _bal_task = loop.create_task(_refresh_balance())
+    return bal
+
+
+async def _refresh_balance() -> float:
+    global _BAL_CACHE
+    try:
+        res = await okx_rest().balance("USDT")
+        bal = float(res["data"][0]["details"][0]["cashBal"])
     except Exception:
         bal = 0.0
     equity_usdt.set(bal)
-    _BAL_CACHE = (time.time(), bal)
+    _BAL_CACHE = (clock.now(), bal)
     return bal
 
 
 # ───────────────────────────────────────────────────────────────
 # GPT-4o 调用
-async def llm_decide(price: float, pos: str | None, spec: dict):
-    async with _gpt_lock:
-        rh = spec.get("recent_high")   # 可能为 None
-        rl = spec.get("recent_low")
-        atr = float(rh.tail(14).mean() - rl.tail(14).mean()) if (rh is not None and rl is not None) else 0
-
-        payload = {
-            "price":    price,
-            "position": pos or "FLAT",
-            "balance":  _load_balance(),
-            "atr":      atr
-        }
-        prompt = "策略输入: " + json.dumps(payload, ensure_ascii=False) + \
-                 "\n输出 JSON: {\"side\":\"BUY|SELL|HOLD\",\"qty\":整数}"
-
-        t0 = time.time()
-        try:
-            resp = await asyncio.to_thread(lambda: openai.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.2,
-                response_format={"type": "json_object"},
-                timeout=6
-            ))
-            gpt_latency_seconds.observe(time.time() - t0)
-            gpt_requests_total.inc()
-            data = json.loads(resp.choices[0].message.content)
-            return data.get("side", "HOLD").upper(), prompt, data
-        except Exception as e:
-            logging.warning("GPT err %s", e)
-            return "HOLD", prompt, {"err": str(e)}
+async def llm_decide(price: float, pos: str | None, spec: dict, *, key: dict | None = None):
+    """
+    key（symbol / side / zone）相同的在途请求合并为一次调用；
+    并发上限、deadline 见 configs/config.yaml openai 段（src/llm_openai_client.py）
+    """
+    f = spec.get("features")           # src/trade/features.py 快照，可能为 None
+
+    payload = {
+        "price":    price,
+        "position": pos or "FLAT",
+        "balance":  _load_balance(),   # 缓存值，不在请求路径上访问 REST
+        "atr":      round(f.atr, 6) if f else 0,
+        "sigma":    round(f.sigma, 6) if f else 0,
+        "ema_fast": round(f.ema_fast, 4) if f else 0,
+        "ema_slow": round(f.ema_slow, 4) if f else 0,
+        "vwap":     round(f.vwap, 4) if f else 0,
+    }
+    prompt = "策略输入: " + json.dumps(payload, ensure_ascii=False) + \
+             "\n输出 JSON: {\"side\":\"BUY|SELL|HOLD\",\"qty\":整数}"
+
+    try:
+        data = await gpt_client().chat_json(prompt, key=key)
+        return data.get("side", "HOLD").upper(), prompt, data
+    except asyncio.TimeoutError:
+        logging.warning("GPT deadline exceeded – HOLD")
+        return "HOLD", prompt, {"err": "timeout"}
+    except Exception as e:
+        logging.warning("GPT err %s", e)
+        return "HOLD", prompt, {"err": str(e)}
 
 
 # ───────────────────────────────────────────────────────────────
 # Broker（极简版）
 class RealBroker:
-    def __init__(self):
-        self.symbol = cfg["trade"]["symbol"]
-        self.spec   = get_instrument_spec(self.symbol)
-        self.min_sz = self.spec["min_sz"]
-        self.lot_sz = self.spec["lot_sz"]
+    def __init__(self, gateway=None, tracker=None):
+        """gateway：下单通道（OrderGateway），None → REST；tracker：OrderTracker，None → 只看下单回执"""
+        self.symbol  = cfg["trade"]["symbol"]
+        self.gateway = gateway
+        self.tracker = tracker
+        spec        = get_instrument_spec(self.symbol)     # 首次调用：拉规格 + 回填 K 线
+        self.min_sz = spec["min_sz"]
+        self.lot_sz = spec["lot_sz"]
+
+    @property
+    def spec(self) -> dict:
+        """recent_prices / high / low 来自内存 K 线，每次取都是最新"""
+        return get_instrument_spec(self.symbol)
+
+    @property
+    def balance(self) -> float:
+        return _load_balance()
+
+    def _size(self, side: str, qty, price) -> float:
+        """显式 qty > 配置 trade.qty > 0 时按 ATR 止损 + 风险单位算张数（features 快照）"""
+        if qty:
+            return max(qty, self.min_sz)
+        if cfg["trade"].get("qty"):
+            return max(cfg["trade"]["qty"], self.min_sz)
+        spec, risk = self.spec, cfg.get("risk", {})
+        f = spec["features"]
+        return calc_size_atr(_load_balance(), risk.get("risk_pct", 0.01), price or f.price, side, f.atr,
+                             ct_val=spec["ct_val"], min_sz=self.min_sz, lot_sz=self.lot_sz,
+                             k_atr=risk.get("sl_atr_k", 1.5))
+
+    async def _open(self, side: str, qty, price):
+        size = self._size(side, qty, price)
+        if not size:
+            logging.warning("size < minSz，放弃本单")
+            return {"id": "", "status": "SIZE_TOO_SMALL"}
+        res = await place_order(self.symbol, side, size, min_sz=self.min_sz, lot_sz=self.lot_sz,
+                                gateway=self.gateway, tracker=self.tracker, ref_px=price)
+        if self.tracker is not None and res.get("cl_ord_id"):
+            # 回执即返回；成交在后台等待（延迟记 okx_fill_latency_seconds），不阻塞决策循环
+            res["fill_wait"] = asyncio.ensure_future(self.tracker.wait(res["cl_ord_id"]))
+        return res
 
     async def open_long(self, qty=None, price=None):
-        return await asyncio.to_thread(place_order,
-            self.symbol, "BUY", max(qty or 1, self.min_sz),
-            min_sz=self.min_sz, lot_sz=self.lot_sz)
+        return await self._open("BUY", qty, price)
 
     async def open_short(self, qty=None, price=None):
-        return await asyncio.to_thread(place_order,
-            self.symbol, "SELL", max(qty or 1, self.min_sz),
-            min_sz=self.min_sz, lot_sz=self.lot_sz)
+        return await self._open("SELL", qty, price)
 
     async def close_all(self):
         pass
 
 
-broker = RealBroker()
+def local_prompt(price: float, f=None) -> str:
+    """带上触发预取刷新的特征（EMA 快慢方向 / ATR），状态变化时 Gemma 才看到不同的输入"""
+    if f is None or f.bars < 2:
+        return f"eth price {price:.2f}, answer BUY SELL HOLD"
+    trend = "up" if f.ema_fast > f.ema_slow else "down" if f.ema_fast < f.ema_slow else "flat"
+    return f"eth price {price:.2f}, trend {trend}, atr {f.atr:.2f}, answer BUY SELL HOLD"
 
 
 # ───────────────────────────────────────────────────────────────
-async def price_feeder(q: asyncio.Queue[float]):
-    async def on_tick(*a, **k):
-        await q.put(float(a[0] if a else k["price"]))
-    while True:
-        try:
-            await run_ws_main(on_tick)
-        except Exception as e:
-            logging.warning("WS crash %s – reconnecting in 5 s", e)
-            await asyncio.sleep(5)
+async def price_feeder(consumer: PriceConsumer, events: EventClassifier = event_cls,
+                       speculate=None):
+    symbol   = cfg["trade"]["symbol"]
+    rec_cfg  = dict(cfg.get("recorder", {}))
+    recorder = TickRecorder(**rec_cfg) if rec_cfg.pop("enabled", False) else None
+    if recorder:
+        asyncio.create_task(recorder.run())
+    consol = PriceConsolidator(ct_val={symbol: get_instrument_spec(symbol)["ct_val"]},   # 规格已由 RealBroker 缓存
+                               **cfg.get("consolidate", {}))
+    bars   = bar_mgr()
+    feats  = feature_mgr()
+    books  = book_mgr()
+
+    async def on_tick(payload, src=""):
+        for t in (payload if isinstance(payload, list) else (payload,)):
+            if recorder:
+                recorder.append(t)
+            if t.symbol != symbol:
+                continue                     # 其它合约：由各自消费者处理
+            fused = consol.update(t)         # 跨交易所合成价，未变化不入队
+            if fused:
+                bars.on_tick(fused)          # 多周期 K 线
+                feats.on_tick(fused)         # ATR / σ / EMA / VWAP 增量更新
+                events.observe(fused, consol.trades, books.spread_bps(symbol))   # 逐笔特征，不随合并丢失
+                if speculate:
+                    speculate(fused)         # 后台预取 Gemma 意见（src/agent/speculative.py）
+                consumer.offer(fused)        # 只覆盖最新价，不等待决策
+    health  = cfg.get("ws_health", {})
+    backoff = Backoff(health.get("backoff_base", 0.05), health.get("backoff_max", 5.0))
+    try:
+        while True:
+            try:
+                await run_ws_main(on_tick, **cfg.get("ws", {}), health=health,
+                                  **cfg.get("ws_dispatch", {}))
+            except Exception as e:
+                delay = backoff.next()
+                logging.warning("WS crash %s – restarting in %.0f ms", e, delay * 1000)
+                await asyncio.sleep(delay)
+    finally:
+        if recorder:
+            recorder.close()                 # 退出 / SIGTERM：写完队列中的批次再返回
 
 
 # ───────────────────────────────────────────────────────────────
-async def main():
-    q     = asyncio.Queue(maxsize=1000)
-    last  = None
-
-    asyncio.create_task(price_feeder(q))
-    filt = SignalFilter(**cfg["signal"])
-
-    signal.signal(signal.SIGHUP, lambda *_: cfg.update(load_cfg()))
-
-    while True:
-        price = await q.get()
-        last  = last or price
-
-        if trailing_mgr().update(price):
+# 逐 tick 决策链
+class Pipeline:
+    """
+    trailing_mgr().update → SignalFilter.push → EventClassifier 得分
+      → DecisionCache → hit_or_set → LLMRouter（GPT / Gemma / 规则，按延迟预算；
+        非显著事件优先取后台预取的 Gemma 意见）→ agent_decide_and_execute
+
+    broker / LLM / 去重 / 决策缓存 / 日志均可注入：实盘用默认实现，回放（src/replay.py）注入桩对象
+    """
+    def __init__(self, broker, *, gpt=None, local=None, intent=None, journal=None,
+                 filt: SignalFilter | None = None, events: EventClassifier | None = None,
+                 decisions: DecisionCache | None = None,
+                 speculator: LocalSpeculator | None = None,
+                 router: LLMRouter | None = None):
+        self.broker  = broker
+        self.gpt     = gpt or llm_decide
+        self.local   = local or ask_local_llm
+        self.intent  = intent or hit_or_set
+        self.journal = journal or weaviate_journal
+        self.filt    = filt or SignalFilter(**cfg["signal"])
+        self.events  = events or event_cls
+        self.decisions = decisions or decision_cache(**cfg.get("decision_cache", {}))
+        # 实盘 Ollama 预热完成前不把决策发往本地模型（注入的桩对象视为常备）
+        ready = ollama().is_ready if self.local is ask_local_llm else None
+        self.speculator = speculator or LocalSpeculator(self.local, local_prompt, ready=ready,
+                                                        **cfg.get("speculative", {}))
+        self.router = router or LLMRouter(
+            {"openai": self._ask_gpt, "ollama": self._ask_local, "rules": rule_decide},
+            available={"ollama": ready} if ready else None, **cfg.get("router", {}))
+        self.last: float | None = None
+
+    # ── 路由后端：async (price, pos, spec, key) → (side, prompt, extra) ──
+    async def _ask_gpt(self, price, pos, spec, key=None):
+        return await self.gpt(price, pos, spec, key=key)
+
+    async def _ask_local(self, price, pos, spec, key=None):
+        raw, _ = await self.local(local_prompt(price, spec.get("features")), strict=True)
+        side = raw.strip().upper()[:4]
+        return side, "gemma quick", {"side": side, "gemma_raw": raw}
+
+    def speculate(self, tick: Tick) -> None:
+        """行情侧逐笔调用：状态变化时后台刷新 Gemma 意见"""
+        self.speculator.observe(tick, feature_mgr().get(tick.symbol).snapshot())
+
+    async def step(self, tick: Tick) -> None:
+        broker = self.broker
+        price  = tick.price
+        last   = self.last or price
+        self.last = price
+
+        # 有新鲜盘口时用 mid 判断回撤，避免被单笔成交价扫到
+        mid = book_mgr().mid(broker.symbol)
+        if trailing_mgr().update(mid or price):
             trailing_stop_hits_total.inc()
             await broker.close_all()
             await PositionGuard().reset()
-
+            await self.decisions.observe_position(broker.symbol, None)
             try:
-                cli = get_client()
-                col = cli.collections.get("TradeLog")
-                uuid = col.query.fetch_objects(limit=1)[0].uuid
-                col.data.update(uuid, {"trail_sl_hit": "true"})
+                self.journal.mark_trail_hit()
             except Exception:
                 pass
-            last = price
-            continue
+            return
 
         direction = "BUY" if price > last else "SELL" if price < last else "HOLD"
-        if filt.push(direction):
+        if self.filt.push(direction):
             pos = await PositionGuard().get()
+            await self.decisions.observe_position(broker.symbol, pos)
 
             cache_key = {"sym": broker.symbol, "side": direction,
                          "zone": round(price * 500) / 500}
-            significant = event_cls.push(price) and not hit_or_set(cache_key)
-
-            if significant:
-                sig, prompt, extra = await llm_decide(price, pos, broker.spec)
+            score = self.events.take_peak()  # 上次决策以来的最高显著性得分（特征由 price_feeder 逐笔更新）
+            event_score.observe(score)
+            spec = broker.spec
+
+            # 同一量化状态（区间 / 持仓 / ATR 档 / 余额档）已有 GPT 答案 → 直接复用
+            cached = dkey = None
+            if score >= self.events.min_score:
+                f    = spec.get("features")
+                dkey = self.decisions.key(broker.symbol, price, pos, f.atr if f else 0.0, broker.balance)
+                cached = await self.decisions.get(dkey)
+            significant = dkey is not None and cached is None and not await self.intent(cache_key)
+
+            if cached is not None:
+                sig, prompt, extra = cached.get("side", "HOLD").upper(), "decision cache", {**cached, "cached": True}
+            elif significant:
+                sig, prompt, extra = await self.router.decide("significant", price, pos, spec, key=cache_key)
+                if "err" not in extra and extra.get("backend") == "openai":   # 只缓存 GPT 的答案
+                    await self.decisions.put(dkey, extra)
+            elif (op := await self.speculator.get(broker.symbol, price)) is not None:
+                sig, age = op
+                sig, prompt, extra = sig, "gemma speculative", {"gemma_raw": sig, "age": round(age, 3)}
             else:
-                raw, _ = await ask_local_llm(f"eth price {price:.2f}, answer BUY SELL HOLD")
-                sig, prompt, extra = raw.strip().upper()[:4], "gemma quick", {"gemma_raw": raw}
+                sig, prompt, extra = await self.router.decide("quick", price, pos, spec)
+
+            await agent_decide_and_execute(sig, price, broker, prompt=prompt, extra=extra,
+                                           journal=self.journal, features=spec.get("features"))
+            await self.decisions.observe_position(broker.symbol, await PositionGuard().get())
+
 
-            await agent_decide_and_execute(sig, price, broker,
-                                           prompt=prompt, extra=extra)
-        last = price
+# ───────────────────────────────────────────────────────────────
+async def main():
+    await _refresh_balance()                     # 预热余额缓存，之后只在后台刷新
+    via_ws  = cfg["trade"].get("order_gateway", "rest") == "ws"
+    trk_cfg = dict(cfg.get("order_tracker", {}))
+    tracker = None
+    if via_ws or trk_cfg.get("enabled"):
+        private = order_gateway()                # 私有 ws：下单回执 + orders / fills 推送共用一条连接
+        private.configure(**cfg.get("order_ws", {}))
+        if trk_cfg.pop("enabled", False):
+            tracker = order_tracker()
+            tracker.configure(**trk_cfg)
+            tracker.attach(private)
+        asyncio.create_task(private.run())       # 未就绪时下单自动走 REST
+    pipe     = Pipeline(RealBroker(order_gateway() if via_ws else None, tracker))
+    consumer = PriceConsumer(pipe.step, **cfg.get("price_consumer", {}))
+
+    asyncio.create_task(ollama().run_lifecycle())    # 预加载 + keep_alive 保温
+    asyncio.create_task(price_feeder(consumer, pipe.events, pipe.speculate))
+
+    signal.signal(signal.SIGHUP, lambda *_: cfg.update(load_cfg()))
+    # SIGTERM → 取消主任务，asyncio.run 随后取消其余任务并执行各自 finally（录制落盘等）
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+
+    await consumer.run()
 
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO,
                         format="%(asctime)s [%(levelname)s] %(message)s")
-    asyncio.run(main())
+    try:
+        asyncio.run(main())
+    except asyncio.CancelledError:               # SIGTERM：正常退出
+        pass